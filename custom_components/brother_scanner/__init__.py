@@ -1,107 +1,613 @@
 import voluptuous as vol
+import aiohttp
 import asyncio
+import contextlib
+import dataclasses
 import logging
 import datetime
+import functools
+import hashlib
 import os
+import time
+import xml.etree.ElementTree as ET
+from homeassistant.core import SupportsResponse, callback
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import storage
-from .const import DOMAIN, STORAGE_VERSION, STORAGE_KEY_TEMPLATE, SCANS_DIR
-from .api import scan_jpeg
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.start import async_at_started
+from .const import (
+    DOMAIN,
+    MODEL,
+    CONF_CAPABILITIES,
+    STORAGE_VERSION,
+    STORAGE_KEY_TEMPLATE,
+    STORAGE_SAVE_DELAY,
+    SCANS_DIR,
+    STATUS_TTL,
+    QUEUE_MAX_DEPTH,
+    PREVIEW_SIZE,
+    CONF_LIVE_PREVIEW,
+    LIVE_PREVIEW_INTERVAL,
+    SIGNAL_SCAN_FRAME,
+    SIGNAL_SNAPSHOT_SAVED,
+    CONF_PRESET,
+    DEFAULT_PRESET,
+    PRESETS,
+    COLOR_MODES,
+    INPUT_SOURCES,
+    CONF_DEBUG_TIMINGS,
+    CONF_RETENTION_COUNT,
+    CONF_RETENTION_DAYS,
+    CONF_RETENTION_MB,
+    CONF_PROCESSING_STAGES,
+    CONF_PROCESSING_QUALITY,
+    CONF_PROCESSING_MAX_KB,
+    CONF_FSYNC,
+    CONF_DEDUPE,
+    DEDUPE_OFF,
+    DEDUPE_SKIP,
+    DEFAULT_DEDUPE,
+    DEDUPE_WINDOW,
+    TIMELAPSE_PREVIEW,
+    TIMELAPSE_IDLE_TIMEOUT,
+    ARCHIVE_ENFORCE_INTERVAL,
+    RECENT_SCANS_DEFAULT,
+    RECENT_SCANS_MAX,
+)
+from .api import BrotherScannerClient
+from .archive import ArchiveEntry, Retention, ScanArchive
+from .capabilities import ScannerCapabilities
+from .wsscan import DEFAULT_TICKET, ScanTicket, SoapFault
+from .coordinator import BrotherScannerCoordinator
+from .device import get_device_info
+from .eventing import BrotherScannerEventView, ScanAvailable, ScannerEventSubscriber
+from .media_source import BrotherScannerScanView
+from .files import commit_temp, discard_temp, file_matches, link_atomic, open_temp
+from .jobs import ScanJobQueue
+from .imaging import ProgressiveJpeg, image_fingerprint, render_jpeg
+from .pdf import StreamingPdfWriter, jpeg_info
+from .processing import (
+    DEFAULT_QUALITY,
+    STAGES,
+    PipelineSettings,
+    ProcessResult,
+    async_get_processor,
+)
+from .stats import ScanStats, ScanTrace
+from .timelapse import TimelapseScheduler
 
 _LOGGER = logging.getLogger(__name__)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+PLATFORMS = ["button", "camera", "sensor"]
+
+# Scan region in millimetres from the top left corner
+REGION_SCHEMA = vol.Schema(
+    {
+        vol.Optional("left", default=0): vol.Coerce(float),
+        vol.Optional("top", default=0): vol.Coerce(float),
+        vol.Required("width"): vol.Coerce(float),
+        vol.Required("height"): vol.Coerce(float),
+    }
+)
+
+
+def _import_scan_modules():
+    """Import what scanning needs but setup doesn't, Pillow mostly."""
+    from PIL import Image, ImageChops, ImageFile, ImageFilter, ImageStat  # noqa: F401
+    from . import pipeline  # noqa: F401
+
+
+async def _async_warm_up(hass):
+    await hass.async_add_import_executor_job(_import_scan_modules)
+
+
+async def async_setup(hass, config):
+    """Register the event endpoint and the archive file server."""
+    hass.http.register_view(BrotherScannerEventView(hass))
+    hass.http.register_view(BrotherScannerScanView(hass))
+
+    # Warm up the imports once Home Assistant has started, before the
+    # first scan needs them
+    async_at_started(hass, _async_warm_up)
+    return True
+
 
 async def async_setup_entry(hass, entry):
     """Set up Brother scanner from a config entry."""
     ip = entry.data["ip"]
     entry_id = entry.entry_id
+    client = BrotherScannerClient(ip)
+    coordinator = BrotherScannerCoordinator(hass, client)
+    archive = ScanArchive(hass, entry_id, hass.config.path("www", SCANS_DIR))
+    # One Store per entry for the last snapshot, written with a delay
+    store = storage.Store(
+        hass, STORAGE_VERSION, STORAGE_KEY_TEMPLATE.format(entry_id=entry_id)
+    )
+    # Only local files are waited for, a scanner that is off mustn't hold
+    # up setup. Entities show unknown until the first refresh completes.
+    _, stored = await asyncio.gather(archive.async_load(), store.async_load())
+    stored = stored or {}
+    capabilities = get_cached_capabilities(entry, client)
 
     # Store IP and per-device lock
-    hass.data.setdefault(DOMAIN, {})[entry_id] = {
+    device_data = hass.data.setdefault(DOMAIN, {})[entry_id] = {
         "ip": ip,
+        "entry": entry,
+        "client": client,
+        "coordinator": coordinator,
+        "capabilities": capabilities,
+        "model": capabilities.model if capabilities else MODEL,
         "lock": asyncio.Lock(),
+        "stats": ScanStats(),
+        "archive": archive,
+        "store": store,
+        "last_snapshot": stored.get("last_snapshot"),
         "entities": [],
         "entry_id": entry_id,
     }
 
+    # Scans for this device run one at a time from its own queue
+    queue = ScanJobQueue(
+        hass,
+        f"{DOMAIN} {ip}",
+        functools.partial(async_snapshot, hass, device_data),
+        QUEUE_MAX_DEPTH,
+    )
+    device_data["queue"] = queue
+    queue.start()
+
+    # Scheduled change detection scans, following option changes
+    timelapse = TimelapseScheduler(hass, entry, queue)
+    device_data["timelapse"] = timelapse
+    timelapse.async_schedule()
+    entry.async_on_unload(timelapse.async_stop)
+    entry.async_on_unload(entry.add_update_listener(async_options_updated))
+
+    # Let the device push status changes and scans started on its panel;
+    # the coordinator keeps polling until (and whenever) that isn't working
+    events = ScannerEventSubscriber(
+        hass,
+        entry_id,
+        client,
+        coordinator.async_set_pushed_status,
+        functools.partial(async_scan_available, device_data),
+        coordinator.async_set_push_active,
+    )
+    device_data["events"] = events
+    events.async_start()
+
+    entry.async_create_background_task(
+        hass, coordinator.async_refresh(), f"{DOMAIN} {ip} first refresh"
+    )
+    if capabilities is None:
+        entry.async_create_background_task(
+            hass,
+            async_fetch_capabilities(hass, device_data),
+            f"{DOMAIN} {ip} capabilities",
+        )
+
+    # Age limits also apply while no new scans come in
+    async def enforce_retention(_now):
+        await archive.async_enforce(get_retention(entry))
+
+    entry.async_on_unload(
+        async_track_time_interval(
+            hass,
+            enforce_retention,
+            datetime.timedelta(seconds=ARCHIVE_ENFORCE_INTERVAL),
+        )
+    )
+
     # Forward entities to HA
-    await hass.config_entries.async_forward_entry_setups(entry, ["button", "camera"])
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     # Register snapshot service once
     if not hass.services.has_service(DOMAIN, "snapshot"):
 
         async def snapshot_service_wrapper(call):
-            await snapshot_service(hass, call)
+            return await snapshot_service(hass, call)
 
         hass.services.async_register(
             DOMAIN,
             "snapshot",
             snapshot_service_wrapper,
             schema=vol.Schema(
-                {vol.Required("ip"): str, vol.Optional("filename"): str},
+                {
+                    vol.Required("ip"): str,
+                    vol.Optional("filename"): str,
+                    vol.Optional("priority", default=0): vol.Coerce(int),
+                    vol.Optional("batch", default=False): cv.boolean,
+                    vol.Optional("preset"): vol.In(list(PRESETS)),
+                    vol.Optional("resolution"): vol.All(
+                        vol.Coerce(int), vol.Range(min=1)
+                    ),
+                    vol.Optional("color_mode"): vol.In(COLOR_MODES),
+                    vol.Optional("input_source"): vol.In(INPUT_SOURCES),
+                    vol.Optional("region"): REGION_SCHEMA,
+                    vol.Optional("quality"): vol.All(
+                        vol.Coerce(int), vol.Range(min=0, max=100)
+                    ),
+                },
                 extra=vol.ALLOW_EXTRA,
             ),
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+
+    if not hass.services.has_service(DOMAIN, "recent_scans"):
+
+        async def recent_scans_service_wrapper(call):
+            return recent_scans_service(hass, call)
+
+        hass.services.async_register(
+            DOMAIN,
+            "recent_scans",
+            recent_scans_service_wrapper,
+            schema=vol.Schema(
+                {
+                    vol.Required("ip"): str,
+                    vol.Optional("count", default=RECENT_SCANS_DEFAULT): vol.All(
+                        vol.Coerce(int), vol.Range(min=1, max=RECENT_SCANS_MAX)
+                    ),
+                    vol.Optional("offset", default=0): vol.All(
+                        vol.Coerce(int), vol.Range(min=0)
+                    ),
+                }
+            ),
+            supports_response=SupportsResponse.ONLY,
         )
 
     return True
 
 
+def get_cached_capabilities(entry, client):
+    """Return the capabilities cached in the entry, None if there are none."""
+    if cached := entry.data.get(CONF_CAPABILITIES):
+        try:
+            capabilities = ScannerCapabilities.from_dict(cached)
+        except (KeyError, TypeError, ValueError) as e:
+            _LOGGER.debug("Discarding cached capabilities of %s: %s", client.ip, e)
+        else:
+            client.configuration = capabilities.configuration
+            return capabilities
+    return None
+
+
+async def async_fetch_capabilities(hass, device_data):
+    """Read the capabilities in the background and cache them in the entry.
+
+    Until they are known (or if the device can't be reached) validation
+    falls back to fetching the configuration when it is first needed.
+    """
+    client = device_data["client"]
+    entry = device_data["entry"]
+    try:
+        capabilities = await client.async_get_capabilities()
+    except (aiohttp.ClientError, asyncio.TimeoutError, SoapFault, ET.ParseError) as e:
+        _LOGGER.debug("Capabilities of %s unavailable: %s", client.ip, e)
+        return
+    device_data["capabilities"] = capabilities
+    hass.config_entries.async_update_entry(
+        entry, data={**entry.data, CONF_CAPABILITIES: capabilities.as_dict()}
+    )
+    if capabilities.model != device_data["model"]:
+        # Entities set up before the first fetch registered the generic model
+        device_data["model"] = capabilities.model
+        registry = dr.async_get(hass)
+        info = get_device_info(entry.entry_id, device_data["ip"], capabilities.model)
+        if device := registry.async_get_device(identifiers=info["identifiers"]):
+            registry.async_update_device(
+                device.id, model=info["model"], name=info["name"]
+            )
+
+
+async def async_options_updated(hass, entry):
+    """Apply option changes that need more than reading the option again."""
+    if device_data := hass.data[DOMAIN].get(entry.entry_id):
+        device_data["timelapse"].async_schedule()
+
+
 async def async_unload_entry(hass, entry):
     """Unload a config entry."""
-    await hass.config_entries.async_forward_entry_unload(entry, "button")
-    await hass.config_entries.async_forward_entry_unload(entry, "camera")
-    hass.data[DOMAIN].pop(entry.entry_id, None)
+    for platform in PLATFORMS:
+        await hass.config_entries.async_forward_entry_unload(entry, platform)
+    device_data = hass.data[DOMAIN].pop(entry.entry_id, None)
+    if device_data:
+        await device_data["events"].async_stop()
+        await device_data["queue"].async_stop()
+        await device_data["client"].async_close()
     return True
 
 
 async def snapshot_service(hass, call):
+    """Queue a scan and wait for it to finish.
+
+    Errors reach the caller. Non-blocking calls, like the button's, aren't
+    waited on by Home Assistant anyway.
+    """
     ip = call.data["ip"]
-    filename = call.data.get("filename")
+    device_data = _find_device(hass, ip)
+
+    ticket = await async_build_ticket(device_data, call.data)
+    job = device_data["queue"].enqueue(
+        {
+            "filename": call.data.get("filename"),
+            "batch": call.data["batch"],
+            "ticket": ticket,
+        },
+        call.data["priority"],
+    )
+    _LOGGER.debug("Queued snapshot job %s for %s", job.id, ip)
+
+    # Shielded: a caller that stops waiting doesn't cancel the scan
+    filename = await asyncio.shield(job.future)
+    if not call.return_response:
+        return None
+    return {"job_id": job.id, "filename": filename}
+
+
+async def async_scan_available(device_data, event: ScanAvailable, token):
+    """Fetch a scan that was started on the device with the default settings."""
+    try:
+        ticket = await async_build_ticket(device_data, {})
+        job = device_data["queue"].enqueue(
+            {
+                "filename": None,
+                "batch": False,
+                "ticket": ticket,
+                "scan_identifier": event.scan_identifier,
+                "destination_token": token,
+            }
+        )
+    except HomeAssistantError as e:
+        _LOGGER.warning("Dropped scan started on %s: %s", device_data["ip"], e)
+        return
+    _LOGGER.debug("Queued device initiated job %s for %s", job.id, device_data["ip"])
 
-    # Find device by IP
+
+def _find_device(hass, ip):
     device_data = next((d for d in hass.data[DOMAIN].values() if d["ip"] == ip), None)
     if not device_data:
         raise HomeAssistantError(f"Device {ip} not found")
+    return device_data
 
-    lock = device_data["lock"]
-    entry_id = device_data["entry_id"]
 
-    if lock.locked():
-        _LOGGER.warning("Snapshot already running for %s, skipping call", ip)
-        return
+def recent_scans_service(hass, call):
+    """Return the newest archived scans of a device, newest first."""
+    archive = _find_device(hass, call.data["ip"])["archive"]
+    return {
+        "total": len(archive),
+        "scans": [
+            e.as_dict() for e in archive.recent(call.data["count"], call.data["offset"])
+        ],
+    }
 
-    async with lock:
-        try:
-            jpeg_bytes = await scan_jpeg(ip)
 
-            if not filename:
-                now = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
-                filename = f"{SCANS_DIR}/{ip}_{now}.jpg"
+def get_retention(entry) -> Retention:
+    options = entry.options
+    return Retention(
+        max_count=options.get(CONF_RETENTION_COUNT, 0),
+        max_age=options.get(CONF_RETENTION_DAYS, 0) * 86400,
+        max_bytes=options.get(CONF_RETENTION_MB, 0) * 1024 * 1024,
+    )
 
-            # If filename is not absolute, save inside HA www
-            if not os.path.isabs(filename):
-                filename = hass.config.path("www", filename)
 
-            dir_path = os.path.dirname(filename)
-            os.makedirs(dir_path, exist_ok=True)
+def get_pipeline(entry) -> PipelineSettings | None:
+    """Return the processing pipeline of an entry, None if it has no stages."""
+    options = entry.options
+    stages = tuple(s for s in STAGES if s in options.get(CONF_PROCESSING_STAGES, ()))
+    if not stages:
+        return None
+    return PipelineSettings(
+        stages=stages,
+        quality=options.get(CONF_PROCESSING_QUALITY, DEFAULT_QUALITY),
+        max_bytes=options.get(CONF_PROCESSING_MAX_KB, 0) * 1024,
+    )
 
-            def write_file():
-                with open(filename, "wb") as f:
-                    f.write(jpeg_bytes)
 
-            # Save file in executor to avoid blocking event loop
-            await hass.async_add_executor_job(write_file)
+async def async_process_page(hass, ip, data, pipeline, trace) -> ProcessResult | None:
+    """Run the pipeline on one page; None keeps the page as scanned.
 
-            _LOGGER.info("Snapshot saved: %s", filename)
+    Processing is optional, so any failure only costs the processing.
+    """
+    try:
+        with trace.phase("process"):
+            result = await async_get_processor(hass).async_process(data, pipeline)
+    except Exception as e:
+        _LOGGER.warning("Processing a scan of %s failed, keeping it as is: %s", ip, e)
+        return None
+    for stage, seconds in result.timings.items():
+        trace.add(f"process_{stage}", seconds)
+    return result
 
-            # Save to HA storage for persistence
-            store = storage.Store(
-                hass, STORAGE_VERSION, STORAGE_KEY_TEMPLATE.format(entry_id=entry_id)
+
+def _save_chunk(f, received, progressive, chunk, render) -> bytes | None:
+    """Write a chunk and keep it; render a live frame if asked to."""
+    f.write(chunk)
+    received += chunk
+    if not progressive:
+        return None
+    progressive.feed(chunk)
+    return progressive.render(received) if render else None
+
+
+def _rewrite_file(f, data: bytes) -> None:
+    f.seek(0)
+    f.truncate()
+    f.write(data)
+
+
+async def async_commit_scan(hass, device_data, f, tmp, filename, digest, size):
+    """Move a finished scan from its temp file to filename.
+
+    A scan identical to one of the last archived ones is hardlinked to it,
+    or with dedupe set to skip not stored at all. Returns the archive entry
+    it duplicates, or None, and whether the scan was stored under filename.
+    """
+    options = device_data["entry"].options
+    fsync = options.get(CONF_FSYNC, False)
+    mode = options.get(CONF_DEDUPE, DEFAULT_DEDUPE)
+    if (
+        mode != DEDUPE_OFF
+        and (
+            duplicate := device_data["archive"].find_duplicate(
+                digest, size, DEDUPE_WINDOW
             )
-            await store.async_save({"last_snapshot": filename})
+        )
+        # The file may have been overwritten or removed since it was indexed
+        and await hass.async_add_executor_job(
+            file_matches, duplicate.path, size, digest
+        )
+    ):
+        try:
+            if mode != DEDUPE_SKIP:
+                await hass.async_add_executor_job(
+                    link_atomic, duplicate.path, filename, fsync
+                )
+        except OSError as e:
+            # A filesystem without hardlinks: store a copy
+            _LOGGER.debug("Storing duplicate of %s as a copy: %s", duplicate.path, e)
+        else:
+            await hass.async_add_executor_job(discard_temp, f, tmp)
+            return duplicate, mode != DEDUPE_SKIP
+    await hass.async_add_executor_job(commit_temp, f, tmp, filename, fsync)
+    return None, True
+
+
+@callback
+def async_set_last_snapshot(hass, device_data, filename):
+    """Remember the newest scan and tell the camera of this entry."""
+    device_data["last_snapshot"] = filename
+    device_data["store"].async_delay_save(
+        lambda: {"last_snapshot": device_data["last_snapshot"]}, STORAGE_SAVE_DELAY
+    )
+    async_dispatcher_send(
+        hass, SIGNAL_SNAPSHOT_SAVED.format(entry_id=device_data["entry_id"]), filename
+    )
+
+
+async def async_archive_scan(device_data, trace, **fields):
+    """Add a finished scan to the archive index and apply retention."""
+    await device_data["archive"].async_add(
+        ArchiveEntry(timestamp=time.time(), duration=round(trace.total, 3), **fields),
+        get_retention(device_data["entry"]),
+    )
+
+
+def _mm_to_inch_1000(value: float) -> int:
+    return round(value / 25.4 * 1000)
+
+
+async def async_build_ticket(device_data, data) -> ScanTicket:
+    """Build the scan ticket from a preset and explicit service fields.
+
+    The ticket is checked against the device configuration, which comes
+    from the capabilities cached in the entry.
+    """
+    entry = device_data["entry"]
+    preset = data.get("preset") or entry.options.get(CONF_PRESET, DEFAULT_PRESET)
+    preset_settings = PRESETS.get(preset, {})
+    if capabilities := device_data.get("capabilities"):
+        # Presets are generic; explicit fields are validated as given
+        source = data.get("input_source") or ("ADF" if data.get("batch") else None)
+        preset_settings = capabilities.adapt_preset(preset_settings, source)
+    settings = {**preset_settings, **data}
+
+    region = None
+    if r := settings.get("region"):
+        region = tuple(
+            _mm_to_inch_1000(r[k]) for k in ("left", "top", "width", "height")
+        )
+    ticket = ScanTicket(
+        input_source=settings.get("input_source"),
+        resolution=settings.get("resolution"),
+        color_mode=settings.get("color_mode"),
+        region=region,
+        compression_quality=settings.get("quality"),
+    )
+    if settings.get("batch") and not ticket.input_source:
+        ticket = dataclasses.replace(ticket, input_source="ADF")
+    if ticket == DEFAULT_TICKET:
+        return ticket
+
+    try:
+        config = await device_data["client"].async_get_scanner_configuration()
+    except (aiohttp.ClientError, asyncio.TimeoutError, SoapFault) as e:
+        # Let the device itself reject what it can't do
+        _LOGGER.debug("Scanner configuration unavailable for validation: %s", e)
+        return ticket
+    try:
+        config.validate(ticket)
+    except ValueError as e:
+        raise HomeAssistantError(f"Invalid scan settings: {e}") from e
+    return ticket
 
-            hass.bus.async_fire(
-                f"{DOMAIN}_snapshot_saved", {"ip": ip, "filename": filename}
+
+def record_trace(device_data, trace, filename):
+    """Add a finished scan to the device statistics and log its phases."""
+    trace.finish()
+    device_data["stats"].add(trace)
+    level = (
+        logging.INFO
+        if device_data["entry"].options.get(CONF_DEBUG_TIMINGS)
+        else logging.DEBUG
+    )
+    if _LOGGER.isEnabledFor(level):
+        timings = trace.as_dict()
+        _LOGGER.log(
+            level,
+            "Scan timings for %s: %s total=%.3fs bytes=%d throughput=%s B/s",
+            filename,
+            " ".join(f"{k}={v:.3f}s" for k, v in timings["phases"].items()),
+            timings["total"],
+            timings["bytes"],
+            timings["throughput"],
+        )
+
+
+async def async_prepare_filename(hass, ip, filename, ext):
+    """Return the absolute target path and make sure its directory exists."""
+    if not filename:
+        now = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        filename = f"{SCANS_DIR}/{ip}_{now}.{ext}"
+
+    # If filename is not absolute, save inside HA www
+    if not os.path.isabs(filename):
+        filename = hass.config.path("www", filename)
+
+    dir_path = os.path.dirname(filename)
+    await hass.async_add_executor_job(
+        functools.partial(os.makedirs, dir_path, exist_ok=True)
+    )
+    return filename
+
+
+async def async_snapshot(hass, device_data, job_data):
+    """Scan a page and save it, run by the device's queue worker."""
+    ip = device_data["ip"]
+    filename = job_data.get("filename")
+    lock = device_data["lock"]
+    ticket = job_data.get("ticket", DEFAULT_TICKET)
+    trace = ScanTrace()
+
+    async with lock:
+        try:
+            if job_data.get("batch"):
+                filename = await async_prepare_filename(hass, ip, filename, "pdf")
+                return await async_scan_document(
+                    hass, device_data, filename, ticket, trace
+                )
+
+            if job_data.get("timelapse"):
+                return await async_timelapse_scan(hass, device_data)
+
+            filename = await async_prepare_filename(hass, ip, filename, "jpg")
+            return await async_scan_page(
+                hass, device_data, filename, ticket, trace, job_data
             )
 
         except OSError as e:
@@ -110,3 +616,253 @@ async def snapshot_service(hass, call):
         except Exception as e:
             _LOGGER.error("Unexpected error during snapshot for %s: %s", ip, e)
             raise HomeAssistantError(f"Unexpected error: {e}")
+
+
+async def async_scan_page(
+    hass, device_data, filename, ticket, trace, job_data, event_extra=None
+):
+    """Scan a single page into filename, under the device lock.
+
+    Returns where the scan was stored, which is an earlier identical scan
+    when dedupe skipped it. event_extra is added to the saved event.
+    """
+    ip = device_data["ip"]
+    client = device_data["client"]
+    entry_id = device_data["entry_id"]
+
+    # Stream the image to a temp file chunk by chunk, file I/O in
+    # executor, hashing as it comes. The bytes are also kept so the
+    # camera can serve them directly, and while they come in the
+    # same pass renders the partial page for the camera.
+    received = bytearray()
+    sha256 = hashlib.sha256()
+    progressive = None
+    if device_data["entry"].options.get(CONF_LIVE_PREVIEW, True):
+        # Its parser imports Pillow
+        progressive = await hass.async_add_executor_job(
+            ProgressiveJpeg, *PREVIEW_SIZE
+        )
+    frame_signal = SIGNAL_SCAN_FRAME.format(entry_id=entry_id)
+    last_frame = 0.0
+    f, tmp = await hass.async_add_executor_job(open_temp, filename)
+    stream = client.scan_jpeg_stream(
+        STATUS_TTL,
+        ticket,
+        trace,
+        job_data.get("scan_identifier"),
+        job_data.get("destination_token"),
+    )
+    try:
+        # Closing the stream early cancels the job on the device
+        async with contextlib.aclosing(stream):
+            async for chunk in stream:
+                sha256.update(chunk)
+                render = time.monotonic() - last_frame >= LIVE_PREVIEW_INTERVAL
+                with trace.phase("save"):
+                    frame = await hass.async_add_executor_job(
+                        _save_chunk, f, received, progressive, chunk, render
+                    )
+                if frame:
+                    last_frame = time.monotonic()
+                    async_dispatcher_send(hass, frame_signal, frame)
+
+        jpeg_bytes = bytes(received)
+        del received
+        digest = sha256.hexdigest()
+        processed = None
+        if pipeline := get_pipeline(device_data["entry"]):
+            processed = await async_process_page(
+                hass, ip, jpeg_bytes, pipeline, trace
+            )
+        if processed and processed.data:
+            # The processed scan is saved instead of the raw one
+            jpeg_bytes = processed.data
+            digest = processed.sha256
+            with trace.phase("save"):
+                await hass.async_add_executor_job(
+                    _rewrite_file, f, jpeg_bytes
+                )
+
+        # Only now does the file appear under its name, complete
+        with trace.phase("save"):
+            duplicate, stored = await async_commit_scan(
+                hass, device_data, f, tmp, filename, digest, len(jpeg_bytes)
+            )
+    except BaseException:
+        await hass.async_add_executor_job(discard_temp, f, tmp)
+        # Take the partial page off the camera
+        if progressive and progressive.frames:
+            async_dispatcher_send(hass, frame_signal, None)
+        raise
+    if not stored:
+        filename = duplicate.path
+    try:
+        with trace.phase("save"):
+            preview = await hass.async_add_executor_job(
+                render_jpeg, jpeg_bytes, *PREVIEW_SIZE
+            )
+    except OSError as e:
+        _LOGGER.warning("Failed to render preview for %s: %s", ip, e)
+        preview = None
+    device_data["last_image"] = {
+        "filename": filename,
+        "image": jpeg_bytes,
+        "preview": preview,
+    }
+    # Pick up the device going back to idle
+    await device_data["coordinator"].async_request_refresh()
+
+    _LOGGER.info("Snapshot saved: %s", filename)
+    async_set_last_snapshot(hass, device_data, filename)
+
+    record_trace(device_data, trace, filename)
+    if stored:
+        try:
+            width, height, *_ = jpeg_info(jpeg_bytes)
+        except ValueError:
+            width = height = None
+        await async_archive_scan(
+            device_data,
+            trace,
+            path=filename,
+            size=len(jpeg_bytes),
+            sha256=digest,
+            width=width,
+            height=height,
+        )
+    event = {
+        "ip": ip,
+        "filename": filename,
+        "sha256": digest,
+        "timings": trace.as_dict(),
+    }
+    if duplicate:
+        event["duplicate_of"] = duplicate.path
+    if processed and processed.blank is not None:
+        event["blank"] = processed.blank
+    if event_extra:
+        event.update(event_extra)
+    hass.bus.async_fire(f"{DOMAIN}_snapshot_saved", event)
+    return filename
+
+
+async def async_timelapse_scan(hass, device_data):
+    """Preview the glass and do the full scan only if something changed.
+
+    Returns the stored filename, or None when the glass looked the same as
+    at the last stored scan.
+    """
+    ip = device_data["ip"]
+    timelapse = device_data["timelapse"]
+    preview = TIMELAPSE_PREVIEW
+    if capabilities := device_data.get("capabilities"):
+        preview = capabilities.adapt_preset(preview, None)
+    ticket = await async_build_ticket(
+        device_data, {"preset": DEFAULT_PRESET, **preview}
+    )
+    client = device_data["client"]
+    data = await client.scan_jpeg(STATUS_TTL, ticket)
+    fingerprint = await hass.async_add_executor_job(image_fingerprint, data)
+    changed, score = await hass.async_add_executor_job(timelapse.changed, fingerprint)
+    if not changed:
+        _LOGGER.debug("Timelapse of %s unchanged (similarity %s)", ip, score)
+        return None
+
+    # Still busy finishing the preview, the full scan would be refused.
+    # If it stays busy the scan fails and the next run sees the change.
+    await client.async_wait_idle(TIMELAPSE_IDLE_TIMEOUT)
+    filename = await async_prepare_filename(hass, ip, None, "jpg")
+    filename = await async_scan_page(
+        hass,
+        device_data,
+        filename,
+        await async_build_ticket(device_data, {}),
+        ScanTrace(),
+        {},
+        {"timelapse": True, "similarity": score},
+    )
+    timelapse.last_fingerprint = fingerprint
+    hass.bus.async_fire(
+        f"{DOMAIN}_timelapse_changed",
+        {"ip": ip, "filename": filename, "similarity": score},
+    )
+    return filename
+
+
+async def async_scan_document(hass, device_data, filename, ticket, trace):
+    """Scan every page in the feeder into one PDF, written page by page."""
+    ip = device_data["ip"]
+    client = device_data["client"]
+    pipeline = get_pipeline(device_data["entry"])
+    blank_pages = 0
+
+    f, tmp = await hass.async_add_executor_job(open_temp, filename)
+    try:
+        writer = await hass.async_add_executor_job(StreamingPdfWriter, f)
+        pages = client.scan_pages(STATUS_TTL, ticket, trace)
+        async with contextlib.aclosing(pages):
+            async for page in pages:
+                if pipeline and (
+                    processed := await async_process_page(
+                        hass, ip, page, pipeline, trace
+                    )
+                ):
+                    if processed.blank:
+                        # Blank pages, like the backs of one sided originals,
+                        # are left out of the document
+                        blank_pages += 1
+                        continue
+                    page = processed.data or page
+                with trace.phase("save"):
+                    await hass.async_add_executor_job(
+                        writer.add_jpeg_page, page, ticket.resolution
+                    )
+                del page
+                hass.bus.async_fire(
+                    f"{DOMAIN}_scan_progress",
+                    {"ip": ip, "filename": filename, "page": writer.page_count},
+                )
+        if not writer.page_count:
+            if blank_pages:
+                raise Exception(f"All {blank_pages} pages were blank")
+            raise Exception("No pages in the document feeder")
+        await hass.async_add_executor_job(writer.close)
+        duplicate, stored = await async_commit_scan(
+            hass, device_data, f, tmp, filename, writer.sha256, writer.size
+        )
+    except BaseException:
+        await hass.async_add_executor_job(discard_temp, f, tmp)
+        raise
+    if not stored:
+        filename = duplicate.path
+    # Pick up the device going back to idle
+    await device_data["coordinator"].async_request_refresh()
+
+    _LOGGER.info(
+        "Document saved: %s (%d pages, %d blank pages left out)",
+        filename,
+        writer.page_count,
+        blank_pages,
+    )
+    record_trace(device_data, trace, filename)
+    if stored:
+        await async_archive_scan(
+            device_data,
+            trace,
+            path=filename,
+            size=writer.size,
+            sha256=writer.sha256,
+            pages=writer.page_count,
+        )
+    event = {
+        "ip": ip,
+        "filename": filename,
+        "pages": writer.page_count,
+        "blank_pages": blank_pages,
+        "sha256": writer.sha256,
+        "timings": trace.as_dict(),
+    }
+    if duplicate:
+        event["duplicate_of"] = duplicate.path
+    hass.bus.async_fire(f"{DOMAIN}_document_saved", event)
+    return filename
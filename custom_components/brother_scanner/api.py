@@ -1,92 +1,64 @@
+import asyncio
+import contextlib
+import logging
+import random
 import uuid
 import aiohttp
 import re
+import time
+import dataclasses
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable
+from typing import TypeVar
+from .wsscan import (
+    GET_SCANNER_STATUS,
+    GET_SCANNER_CONFIGURATION,
+    GET_SCANNER_CAPABILITIES,
+    CREATE_SCAN_JOB,
+    RETRIEVE_IMAGE,
+    CANCEL_JOB,
+    DEFAULT_TICKET,
+    CreateScanJobResponse,
+    ScannerConfiguration,
+    ScannerStatus,
+    ScanTicket,
+    SoapFault,
+    parse_create_scan_job_response,
+    parse_fault,
+    parse_scanner_configuration,
+    parse_scanner_status,
+)
+from .capabilities import ScannerCapabilities
+from .stats import ScanTrace
 
+_LOGGER = logging.getLogger(__name__)
+_T = TypeVar("_T")
 
-# --- SOAP XML templates ---
-GET_SCANNER_STATUS_XML = """<?xml version="1.0" encoding="utf-8"?>
-<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"
-               xmlns:wsa="http://schemas.xmlsoap.org/ws/2004/08/addressing"
-               xmlns:sca="http://schemas.microsoft.com/windows/2006/08/wdp/scan">
-  <soap:Header>
-    <wsa:To>{url}</wsa:To>
-    <wsa:Action>http://schemas.microsoft.com/windows/2006/08/wdp/scan/GetScannerElements</wsa:Action>
-    <wsa:MessageID>urn:uuid:{msgid}</wsa:MessageID>
-    <wsa:ReplyTo>
-      <wsa:Address>http://schemas.xmlsoap.org/ws/2004/08/addressing/role/anonymous</wsa:Address>
-    </wsa:ReplyTo>
-    <wsa:From>
-      <wsa:Address>urn:uuid:{fromid}</wsa:Address>
-    </wsa:From>
-  </soap:Header>
-  <soap:Body>
-    <sca:GetScannerElementsRequest>
-      <sca:RequestedElements>
-        <sca:Name>sca:ScannerStatus</sca:Name>
-      </sca:RequestedElements>
-    </sca:GetScannerElementsRequest>
-  </soap:Body>
-</soap:Envelope>
-"""
-
-CREATE_SCAN_JOB_XML = """<?xml version="1.0" encoding="utf-8"?>
-<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"
-               xmlns:wsa="http://schemas.xmlsoap.org/ws/2004/08/addressing"
-               xmlns:sca="http://schemas.microsoft.com/windows/2006/08/wdp/scan">
-  <soap:Header>
-    <wsa:To>{url}</wsa:To>
-    <wsa:Action>http://schemas.microsoft.com/windows/2006/08/wdp/scan/CreateScanJob</wsa:Action>
-    <wsa:MessageID>urn:uuid:{msgid}</wsa:MessageID>
-    <wsa:ReplyTo>
-      <wsa:Address>http://schemas.xmlsoap.org/ws/2004/08/addressing/role/anonymous</wsa:Address>
-    </wsa:ReplyTo>
-    <wsa:From>
-      <wsa:Address>urn:uuid:python-client</wsa:Address>
-    </wsa:From>
-  </soap:Header>
-  <soap:Body>
-    <sca:CreateScanJobRequest>
-      <sca:ScanTicket>
-        <sca:JobDescription>
-          <sca:JobName>Python Scan Job</sca:JobName>
-          <sca:JobOriginatingUserName>Python Client</sca:JobOriginatingUserName>
-          <sca:JobInformation>Scanning in auto mode..</sca:JobInformation>
-        </sca:JobDescription>
-        <sca:DocumentParameters>
-          <sca:Format sca:MustHonor="true">exif</sca:Format>
-        </sca:DocumentParameters>
-      </sca:ScanTicket>
-    </sca:CreateScanJobRequest>
-  </soap:Body>
-</soap:Envelope>
-"""
-
-RETRIEVE_IMAGE_XML = """<?xml version="1.0" encoding="utf-8"?>
-<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"
-               xmlns:wsa="http://schemas.xmlsoap.org/ws/2004/08/addressing"
-               xmlns:sca="http://schemas.microsoft.com/windows/2006/08/wdp/scan">
-  <soap:Header>
-    <wsa:To>{url}</wsa:To>
-    <wsa:Action>http://schemas.microsoft.com/windows/2006/08/wdp/scan/RetrieveImage</wsa:Action>
-    <wsa:MessageID>urn:uuid:{msgid}</wsa:MessageID>
-    <wsa:ReplyTo>
-      <wsa:Address>http://schemas.xmlsoap.org/ws/2004/08/addressing/role/anonymous</wsa:Address>
-    </wsa:ReplyTo>
-    <wsa:From>
-      <wsa:Address>urn:uuid:python-client</wsa:Address>
-    </wsa:From>
-  </soap:Header>
-  <soap:Body>
-    <sca:RetrieveImageRequest>
-      <sca:JobId>{jobid}</sca:JobId>
-      <sca:JobToken>{jobtoken}</sca:JobToken>
-      <sca:DocumentDescription>
-        <sca:DocumentName>Python Scan</sca:DocumentName>
-      </sca:DocumentDescription>
-    </sca:RetrieveImageRequest>
-  </soap:Body>
-</soap:Envelope>
-"""
+BOUNDARY_RE = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+FIRST_BOUNDARY_RE = re.compile(rb"\n--([^\r\n]+)\r?\n")
+HEADERS_END_RE = re.compile(rb"\r?\n\r?\n")
+STREAM_CHUNK_SIZE = 64 * 1024
+KEEPALIVE_TIMEOUT = 60
+
+# Timeouts in seconds. Status, configuration and job creation answer
+# quickly; RetrieveImage gets a budget from the announced image size.
+REQUEST_TIMEOUT = 10
+RETRIEVE_BASE_TIMEOUT = 30
+RETRIEVE_MIN_THROUGHPUT = 256 * 1024
+# Longest silence while the device scans or streams
+RETRIEVE_READ_TIMEOUT = 60
+CANCEL_TIMEOUT = 5
+# Status polling while waiting for the device to become idle
+IDLE_POLL_INTERVAL = 0.5
+
+# Retries of idempotent requests (GetScannerElements)
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+
+# Consecutive transport failures before requests are refused, and for how long
+CIRCUIT_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 60
 
 
 # --- Helpers ---
@@ -95,56 +67,519 @@ def make_uuid() -> str:
 
 
 async def async_soap_request(
-    session: aiohttp.ClientSession, url: str, xml: str
+    session: aiohttp.ClientSession,
+    url: str,
+    xml: bytes,
+    timeout: float = REQUEST_TIMEOUT,
 ) -> bytes:
     headers = {"Content-Type": "application/soap+xml"}
-    async with session.post(url, data=xml.encode("utf-8"), headers=headers) as resp:
-        resp.raise_for_status()
+    async with session.post(
+        url, data=xml, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)
+    ) as resp:
+        await raise_for_fault(resp)
         return await resp.read()
 
 
-def extract_jpeg_from_mtom(response_bytes: bytes) -> bytes:
-    # Detect boundary from Content-Type
-    m = re.search(rb"^--([^\r\n]+)", response_bytes, re.MULTILINE)
-    if not m:
-        raise Exception("MIME boundary not found in response")
-    boundary = m.group(1)
-    parts = response_bytes.split(b"--" + boundary)
-    for part in parts:
-        if b"Content-Type: image/jpeg" in part:
-            split = re.split(rb"\r?\n\r?\n", part, maxsplit=1)
-            if len(split) == 2:
-                return split[1].strip().rstrip(b"--").strip()
+async def async_retry(
+    func: Callable[[], Awaitable[_T]],
+    attempts: int = RETRY_ATTEMPTS,
+    base_delay: float = RETRY_BASE_DELAY,
+) -> _T:
+    """Retry an idempotent request on transport errors, with jittered backoff."""
+    for attempt in range(attempts):
+        try:
+            return await func()
+        except CircuitOpenError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == attempts - 1:
+                raise
+            delay = base_delay * 2**attempt * random.uniform(0.5, 1.5)
+            _LOGGER.debug("Request failed (%s), retrying in %.2fs", e, delay)
+            await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def retrieve_timeout(job: "CreateScanJobResponse") -> aiohttp.ClientTimeout:
+    """Timeout for one RetrieveImage, scaled by the uncompressed image size."""
+    size = (job.bytes_per_line or 0) * (job.number_of_lines or 0)
+    return aiohttp.ClientTimeout(
+        total=RETRIEVE_BASE_TIMEOUT + size / RETRIEVE_MIN_THROUGHPUT,
+        sock_read=RETRIEVE_READ_TIMEOUT,
+    )
+
+
+async def raise_for_fault(resp: aiohttp.ClientResponse) -> None:
+    """Raise the SOAP fault in an error response, or its HTTP error."""
+    if resp.status < 400:
+        return
+    if fault := parse_fault(await resp.read()):
+        raise fault
+    resp.raise_for_status()
+
+
+def extract_boundary(content_type: str | None) -> bytes | None:
+    """Return the MIME boundary from a multipart Content-Type header."""
+    m = BOUNDARY_RE.search(content_type or "")
+    return m.group(1).encode() if m else None
+
+
+async def async_iter_mtom_jpeg(
+    chunks: AsyncIterator[bytes],
+    boundary: bytes | None = None,
+    content_type: bytes = b"image/jpeg",
+) -> AsyncIterator[bytes]:
+    """Yield the body of the first matching MTOM part as it arrives.
+
+    Only a tail of len(delimiter) bytes is held back between chunks, so the
+    image is never buffered as a whole. If no boundary is given it is taken
+    from the first "--" line of the body.
+    """
+    # Leading "\n" lets a boundary at the very start match the delimiter
+    buf = bytearray(b"\n")
+    delimiter = b"\n--" + boundary if boundary else None
+    in_body = False
+
+    async for chunk in chunks:
+        buf += chunk
+        while True:
+            if delimiter is None:
+                m = FIRST_BOUNDARY_RE.search(buf)
+                if not m:
+                    break
+                delimiter = b"\n--" + m.group(1)
+
+            if in_body:
+                idx = buf.find(delimiter)
+                if idx < 0:
+                    # Keep enough to match a delimiter (and its "\r") split
+                    # across chunks
+                    keep = len(delimiter)
+                    if len(buf) > keep:
+                        yield bytes(buf[:-keep])
+                        del buf[:-keep]
+                    break
+                end = idx - 1 if idx and buf[idx - 1] == 0x0D else idx
+                if end:
+                    yield bytes(buf[:end])
+                return
+
+            idx = buf.find(delimiter)
+            if idx < 0:
+                # Drop the preamble or skipped part, keeping a possible
+                # partial delimiter
+                if len(buf) > len(delimiter):
+                    del buf[: -len(delimiter)]
+                break
+            m = HEADERS_END_RE.search(buf, idx + len(delimiter))
+            if not m:
+                break
+            headers = bytes(buf[idx + len(delimiter) : m.start()])
+            if headers.startswith(b"--"):
+                # Closing delimiter, no more parts
+                break
+            del buf[: m.end()]
+            in_body = content_type in headers.lower()
+
     raise Exception("JPEG not found in MTOM response")
 
 
-# --- Main API function ---
-async def scan_jpeg(ip: str) -> bytes:
-    # return b"\xff\xd8\xff\xe0" + b"DUMMYJPEGDATA" + b"\xff\xd9"
-    url = f"http://{ip}/WebServices/ScannerService"
-    async with aiohttp.ClientSession() as session:
-        # 1. Ensure idle
-        state_xml = GET_SCANNER_STATUS_XML.format(
-            url=url, msgid=make_uuid(), fromid=make_uuid()
+# --- Circuit breaker ---
+class CircuitOpenError(aiohttp.ClientConnectionError):
+    """Requests are refused while the device keeps failing.
+
+    A connection error, so callers handle it like the device being down.
+    """
+
+
+class CircuitBreaker:
+    """Stop sending requests after repeated transport failures.
+
+    After reset_timeout one trial request is let through (half open); its
+    success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        threshold: int = CIRCUIT_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+    ):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def check(self, name: str) -> None:
+        if self.state == "open":
+            raise CircuitOpenError(
+                f"{name} unreachable, not retrying for "
+                f"{self.reset_timeout - (time.monotonic() - self.opened_at):.0f}s"
+            )
+        if self.opened_at is not None:
+            # Half open: this request is the trial, hold the others back
+            self.opened_at = time.monotonic()
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+    def as_dict(self) -> dict:
+        return {"state": self.state, "failures": self.failures}
+
+
+# --- Main API ---
+class BrotherScannerClient:
+    """WS-Scan client for one device, reusing a keep-alive connection."""
+
+    def __init__(self, ip: str, session: aiohttp.ClientSession | None = None):
+        self.ip = ip
+        self.url = f"http://{ip}/WebServices/ScannerService"
+        self._session = session
+        self._owns_session = session is None
+        self._closed = False
+        self._status_envelope = GET_SCANNER_STATUS.bind(url=self.url)
+        self._configuration_envelope = GET_SCANNER_CONFIGURATION.bind(url=self.url)
+        self._capabilities_envelope = GET_SCANNER_CAPABILITIES.bind(url=self.url)
+        self._create_envelope = CREATE_SCAN_JOB.bind(url=self.url)
+        self._retrieve_envelope = RETRIEVE_IMAGE.bind(url=self.url)
+        self._cancel_envelope = CANCEL_JOB.bind(url=self.url)
+        self.breaker = CircuitBreaker()
+        # Last known status and when it was fetched (monotonic)
+        self.status: ScannerStatus | None = None
+        self.status_time: float = 0.0
+        # Capabilities don't change, fetched once
+        self.configuration: ScannerConfiguration | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._closed:
+            # Don't open a new session for a task that outlived the entry
+            raise aiohttp.ClientConnectionError(f"Client for {self.ip} is closed")
+        if self._session is None or self._session.closed:
+            # Scans are serialized; the second connection is for status polls
+            connector = aiohttp.TCPConnector(
+                limit_per_host=2, keepalive_timeout=KEEPALIVE_TIMEOUT
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._owns_session = True
+        return self._session
+
+    async def async_close(self) -> None:
+        """Close the session if it was created by this client.
+
+        The client can't be used afterwards.
+        """
+        self._closed = True
+        if self._owns_session and self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self) -> "BrotherScannerClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.async_close()
+
+    async def async_soap(
+        self, xml: bytes, url: str | None = None, timeout: float = REQUEST_TIMEOUT
+    ) -> bytes:
+        """Send a request to the device through the circuit breaker."""
+        self.breaker.check(self.ip)
+        try:
+            resp_bytes = await async_soap_request(
+                self.session, url or self.url, xml, timeout
+            )
+        except SoapFault:
+            # The device answered, it is reachable
+            self.breaker.record_success()
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return resp_bytes
+
+    async def async_get_scanner_status(self) -> ScannerStatus:
+        async def request() -> bytes:
+            xml = self._status_envelope.render(msgid=make_uuid(), fromid=make_uuid())
+            return await self.async_soap(xml)
+
+        self.set_status(parse_scanner_status(await async_retry(request)))
+        return self.status
+
+    async def async_probe(self, timeout: float = REQUEST_TIMEOUT) -> bool:
+        """Return True if the device answers a WS-Scan status request."""
+        xml = self._status_envelope.render(msgid=make_uuid(), fromid=make_uuid())
+        try:
+            resp_bytes = await self.async_soap(xml, timeout=timeout)
+            self.set_status(parse_scanner_status(resp_bytes))
+        except (aiohttp.ClientError, asyncio.TimeoutError, SoapFault, ET.ParseError):
+            return False
+        return True
+
+    async def async_wait_idle(
+        self, timeout: float, interval: float = IDLE_POLL_INTERVAL
+    ) -> bool:
+        """Poll the status until the device is idle; False if it isn't in time."""
+        deadline = time.monotonic() + timeout
+        while not (await self.async_get_scanner_status()).is_idle:
+            if time.monotonic() + interval > deadline:
+                return False
+            await asyncio.sleep(interval)
+        return True
+
+    def set_status(self, status: ScannerStatus) -> None:
+        self.status = status
+        self.status_time = time.monotonic()
+
+    async def async_get_scanner_configuration(self) -> ScannerConfiguration:
+        if self.configuration is None:
+
+            async def request() -> bytes:
+                xml = self._configuration_envelope.render(
+                    msgid=make_uuid(), fromid=make_uuid()
+                )
+                return await self.async_soap(xml)
+
+            self.configuration = parse_scanner_configuration(
+                await async_retry(request)
+            )
+        return self.configuration
+
+    async def async_get_capabilities(
+        self, attempts: int = RETRY_ATTEMPTS, timeout: float = REQUEST_TIMEOUT
+    ) -> ScannerCapabilities:
+        """Read the description and configuration in one request."""
+
+        async def request() -> bytes:
+            xml = self._capabilities_envelope.render(
+                msgid=make_uuid(), fromid=make_uuid()
+            )
+            return await self.async_soap(xml, timeout=timeout)
+
+        capabilities = ScannerCapabilities.from_elements(
+            await async_retry(request, attempts)
+        )
+        self.configuration = capabilities.configuration
+        return capabilities
+
+    def cached_status(self, ttl: float) -> ScannerStatus | None:
+        """Return the last status if it was fetched less than ttl seconds ago."""
+        if self.status and time.monotonic() - self.status_time < ttl:
+            return self.status
+        return None
+
+    async def async_create_scan_job(
+        self,
+        ticket: ScanTicket = DEFAULT_TICKET,
+        scan_identifier: str | None = None,
+        destination_token: str | None = None,
+    ) -> CreateScanJobResponse:
+        """Create a job; the identifiers answer a ScanAvailableEvent."""
+        destination = ""
+        if scan_identifier:
+            destination = (
+                "\n      <sca:ScanIdentifier>"
+                f"{escape(scan_identifier)}</sca:ScanIdentifier>"
+                f"\n      <sca:DestinationToken>{escape(destination_token or '')}"
+                "</sca:DestinationToken>"
+            )
+        xml = self._create_envelope.render(
+            msgid=make_uuid(), parameters=ticket.to_xml(), destination=destination
+        )
+        # The device leaves idle from here on. Not retried: a lost reply may
+        # still have created the job.
+        self.status = None
+        resp_bytes = await self.async_soap(xml)
+        return parse_create_scan_job_response(resp_bytes)
+
+    async def async_cancel_job(self, job: CreateScanJobResponse) -> None:
+        """Cancel a job on the device, best effort, so it doesn't stay busy."""
+        xml = self._cancel_envelope.render(
+            msgid=make_uuid(), jobid=escape(job.job_id)
         )
-        resp_bytes = await async_soap_request(session, url, state_xml)
-        m = re.search(rb"<wscn:ScannerState>(.*?)</wscn:ScannerState>", resp_bytes)
-        state = m.group(1).decode() if m else "Unknown"
-        if state.lower() != "idle":
-            raise Exception(f"Scanner not idle (state={state})")
+        try:
+            await asyncio.shield(self.async_soap(xml, timeout=CANCEL_TIMEOUT))
+        except (aiohttp.ClientError, asyncio.TimeoutError, SoapFault) as e:
+            _LOGGER.debug("Cancelling job %s on %s failed: %s", job.job_id, self.ip, e)
+        else:
+            _LOGGER.debug("Cancelled job %s on %s", job.job_id, self.ip)
+
+    @contextlib.asynccontextmanager
+    async def _async_job_images(
+        self, job: CreateScanJobResponse, images: AsyncGenerator[_T, None]
+    ) -> AsyncIterator[AsyncGenerator[_T, None]]:
+        """Hand out the job's images, cancelling the job if we give up."""
+        try:
+            yield images
+        except BaseException:
+            # Covers timeouts, transport errors and the caller being cancelled
+            # or closing the iterator early
+            await images.aclose()
+            await self.async_cancel_job(job)
+            raise
+
+    async def async_retrieve_image(
+        self, job: CreateScanJobResponse, trace: ScanTrace | None = None
+    ) -> AsyncIterator[bytes]:
+        trace = trace or ScanTrace()
+        xml = self._retrieve_envelope.render(
+            msgid=make_uuid(),
+            jobid=escape(job.job_id),
+            jobtoken=escape(job.job_token),
+        )
+        headers = {"Content-Type": "application/soap+xml"}
+        self.breaker.check(self.ip)
+        start = time.monotonic()
+        try:
+            async with self.session.post(
+                self.url, data=xml, headers=headers, timeout=retrieve_timeout(job)
+            ) as resp:
+                # The reply starts once the device has begun scanning
+                trace.add("scan", time.monotonic() - start)
+                self.breaker.record_success()
+                await raise_for_fault(resp)
+                boundary = extract_boundary(resp.headers.get("Content-Type"))
+                start = time.monotonic()
+                try:
+                    async for chunk in async_iter_mtom_jpeg(
+                        resp.content.iter_chunked(STREAM_CHUNK_SIZE), boundary
+                    ):
+                        # Only count time spent waiting here, not in the
+                        # consumer
+                        trace.add("transfer", time.monotonic() - start)
+                        trace.bytes += len(chunk)
+                        yield chunk
+                        start = time.monotonic()
+                except BaseException:
+                    if resp.connection is None and resp.content.exception() is None:
+                        # Fully received, the connection is already back in
+                        # the pool; draining the buffer resumes reading on it
+                        # (flow control may have paused it)
+                        resp.content.read_nowait()
+                    # Otherwise don't hand a half read connection back
+                    resp.close()
+                    raise
+                trace.add("transfer", time.monotonic() - start)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.breaker.record_failure()
+            raise
+
+    async def async_iter_pages(
+        self, job: CreateScanJobResponse, trace: ScanTrace | None = None
+    ) -> AsyncIterator[bytes]:
+        """Yield each page of a job until the device has no images left.
+
+        Only the page being transferred is held in memory.
+        """
+        while True:
+            try:
+                page = b"".join(
+                    [chunk async for chunk in self.async_retrieve_image(job, trace)]
+                )
+            except SoapFault as fault:
+                if fault.no_images_available:
+                    return
+                raise
+            yield page
+
+    async def _async_ensure_idle(self, status_ttl: float, trace: ScanTrace) -> None:
+        status = self.cached_status(status_ttl)
+        if status is None:
+            with trace.phase("status"):
+                status = await self.async_get_scanner_status()
+        if not status.is_idle:
+            raise Exception(f"Scanner not idle (state={status.state})")
+
+    async def scan_jpeg(
+        self,
+        status_ttl: float = 0,
+        ticket: ScanTicket = DEFAULT_TICKET,
+        trace: ScanTrace | None = None,
+    ) -> bytes:
+        async with contextlib.aclosing(
+            self.scan_jpeg_stream(status_ttl, ticket, trace)
+        ) as chunks:
+            return b"".join([chunk async for chunk in chunks])
+
+    async def scan_jpeg_stream(
+        self,
+        status_ttl: float = 0,
+        ticket: ScanTicket = DEFAULT_TICKET,
+        trace: ScanTrace | None = None,
+        scan_identifier: str | None = None,
+        destination_token: str | None = None,
+    ) -> AsyncIterator[bytes]:
+        """Scan a page and yield the JPEG in chunks as the device sends it.
+
+        A status fetched less than status_ttl seconds ago is trusted instead
+        of asking the device again. Phase timings go to trace if given.
+        Pass the identifiers of a ScanAvailableEvent to fetch a scan started
+        on the device itself. Close the iterator (contextlib.aclosing) when
+        stopping early, so the job is cancelled on the device.
+        """
+        trace = trace or ScanTrace()
+
+        # 1. Ensure idle, unless the device is waiting for us to pick it up
+        if not scan_identifier:
+            await self._async_ensure_idle(status_ttl, trace)
 
         # 2. Create scan job
-        xml = CREATE_SCAN_JOB_XML.format(url=url, msgid=make_uuid())
-        resp_bytes = await async_soap_request(session, url, xml)
-        jid = re.search(rb"<wscn:JobId>(\d+)</wscn:JobId>", resp_bytes)
-        jtok = re.search(rb"<wscn:JobToken>(.*?)</wscn:JobToken>", resp_bytes)
-        if not jid or not jtok:
-            raise Exception("Failed to create scan job")
-        jobid, jobtoken = jid.group(1).decode(), jtok.group(1).decode()
+        with trace.phase("create_job"):
+            job = await self.async_create_scan_job(
+                ticket, scan_identifier, destination_token
+            )
 
         # 3. Retrieve image
-        xml = RETRIEVE_IMAGE_XML.format(
-            url=url, msgid=make_uuid(), jobid=jobid, jobtoken=jobtoken
+        async with self._async_job_images(
+            job, self.async_retrieve_image(job, trace)
+        ) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+    async def scan_pages(
+        self,
+        status_ttl: float = 0,
+        ticket: ScanTicket = DEFAULT_TICKET,
+        trace: ScanTrace | None = None,
+    ) -> AsyncIterator[bytes]:
+        """Scan every page in the document feeder, yielding one JPEG per page."""
+        trace = trace or ScanTrace()
+        ticket = dataclasses.replace(
+            ticket, input_source=ticket.input_source or "ADF", images_to_transfer=0
         )
-        resp_bytes = await async_soap_request(session, url, xml)
-        return extract_jpeg_from_mtom(resp_bytes)
+        await self._async_ensure_idle(status_ttl, trace)
+        with trace.phase("create_job"):
+            job = await self.async_create_scan_job(ticket)
+        async with self._async_job_images(
+            job, self.async_iter_pages(job, trace)
+        ) as pages:
+            async for page in pages:
+                yield page
+
+
+async def scan_jpeg(ip: str) -> bytes:
+    # return b"\xff\xd8\xff\xe0" + b"DUMMYJPEGDATA" + b"\xff\xd9"
+    async with BrotherScannerClient(ip) as client:
+        return await client.scan_jpeg()
+
+
+async def scan_jpeg_stream(ip: str) -> AsyncIterator[bytes]:
+    """Scan a page and yield the JPEG in chunks as the device sends it."""
+    async with BrotherScannerClient(ip) as client:
+        async with contextlib.aclosing(client.scan_jpeg_stream()) as chunks:
+            async for chunk in chunks:
+                yield chunk
@@ -0,0 +1,155 @@
+import bisect
+import dataclasses
+import logging
+import os
+import time
+from dataclasses import dataclass
+from homeassistant.helpers import storage
+from .const import ARCHIVE_KEY_TEMPLATE, ARCHIVE_SAVE_DELAY, STORAGE_VERSION
+from .imaging import thumbnail_path
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    path: str
+    size: int
+    # Epoch seconds when the scan was saved
+    timestamp: float
+    # Seconds from the queue worker starting the scan to the file being
+    # written, time spent waiting in the queue is not included
+    duration: float
+    sha256: str | None = None
+    width: int | None = None
+    height: int | None = None
+    pages: int = 1
+
+    def as_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+
+@dataclass(frozen=True)
+class Retention:
+    """Limits on the archive, 0 means no limit."""
+
+    max_count: int = 0
+    max_age: float = 0
+    max_bytes: int = 0
+
+
+class ScanArchive:
+    """Index of the scans of one device, oldest first.
+
+    Entries are appended in time order, so the newest scans are at the end
+    and retention only ever trims the front; nothing has to list the scans
+    directory. Each path is in the index once: a scan saved over an older
+    one replaces its entry. Persisted through a Store with a delayed save.
+    """
+
+    def __init__(self, hass, entry_id: str, managed_dir: str):
+        self._hass = hass
+        self._store = storage.Store(
+            hass, STORAGE_VERSION, ARCHIVE_KEY_TEMPLATE.format(entry_id=entry_id)
+        )
+        # Retention deletes files in here; scans saved elsewhere under a
+        # custom filename are only dropped from the index
+        self._managed_dir = os.path.join(managed_dir, "")
+        self.entries: list[ArchiveEntry] = []
+        self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    async def async_load(self) -> None:
+        data = await self._store.async_load() or {}
+        entries = [ArchiveEntry(**e) for e in data.get("entries", [])]
+        # Indexes saved before paths were unique may list a path repeatedly,
+        # only its newest entry describes the file
+        newest = {e.path: e for e in entries}
+        self.entries = [e for e in entries if newest[e.path] is e]
+        self.total_bytes = sum(e.size for e in self.entries)
+
+    def _data_to_save(self) -> dict:
+        return {"entries": [e.as_dict() for e in self.entries]}
+
+    def _schedule_save(self) -> None:
+        self._store.async_delay_save(self._data_to_save, ARCHIVE_SAVE_DELAY)
+
+    def recent(self, count: int, offset: int = 0) -> list[ArchiveEntry]:
+        """Return up to count entries, newest first, skipping offset."""
+        end = max(len(self.entries) - offset, 0)
+        return self.entries[max(end - count, 0) : end][::-1]
+
+    def get(self, timestamp: float) -> ArchiveEntry | None:
+        """Return the entry saved at exactly timestamp, the id of a scan."""
+        i = bisect.bisect_left(self.entries, timestamp, key=lambda e: e.timestamp)
+        if i < len(self.entries) and self.entries[i].timestamp == timestamp:
+            return self.entries[i]
+        return None
+
+    def find_duplicate(
+        self, sha256: str, size: int, window: int
+    ) -> ArchiveEntry | None:
+        """Return the newest of the last window entries with this content.
+
+        Only the newest entry of a path describes what the file holds now.
+        """
+        seen = set()
+        for entry in self.recent(window):
+            if entry.path in seen:
+                continue
+            seen.add(entry.path)
+            if entry.sha256 == sha256 and entry.size == size:
+                return entry
+        return None
+
+    async def async_add(self, entry: ArchiveEntry, retention: Retention) -> None:
+        # The file of an entry with the same path was just overwritten
+        if replaced := [e for e in self.entries if e.path == entry.path]:
+            self.entries = [e for e in self.entries if e.path != entry.path]
+            self.total_bytes -= sum(e.size for e in replaced)
+        self.entries.append(entry)
+        self.total_bytes += entry.size
+        await self.async_enforce(retention)
+        self._schedule_save()
+
+    async def async_enforce(self, retention: Retention) -> None:
+        """Drop the oldest entries until the archive is within its limits."""
+        now = time.time()
+        drop = 0
+        remaining_bytes = self.total_bytes
+        for entry in self.entries:
+            remaining = len(self.entries) - drop
+            if (
+                (retention.max_count and remaining > retention.max_count)
+                or (retention.max_age and now - entry.timestamp > retention.max_age)
+                or (retention.max_bytes and remaining_bytes > retention.max_bytes)
+            ):
+                drop += 1
+                remaining_bytes -= entry.size
+            else:
+                break
+        if not drop:
+            return
+
+        expired = self.entries[:drop]
+        del self.entries[:drop]
+        self.total_bytes = remaining_bytes
+        self._schedule_save()
+        _LOGGER.debug("Archive retention removes %d scans", drop)
+        live = {e.path for e in self.entries}
+        await self._hass.async_add_executor_job(self._remove_files, expired, live)
+
+    def _remove_files(self, entries: list[ArchiveEntry], live: set[str]) -> None:
+        # Never delete a file the index still refers to
+        for entry in entries:
+            if not entry.path.startswith(self._managed_dir) or entry.path in live:
+                continue
+            for path in (entry.path, thumbnail_path(entry.path)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    _LOGGER.warning("Failed to remove expired scan %s: %s", path, e)
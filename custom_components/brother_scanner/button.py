@@ -1,5 +1,5 @@
 from homeassistant.components.button import ButtonEntity
-from .device import get_device_info
+from .device import get_device_info, get_model
 from .const import DOMAIN
 
 
@@ -21,7 +21,9 @@ class BrotherScannerSnapshotButton(ButtonEntity):
         self._attr_icon = "mdi:scanner"
         self._attr_name = "Snapshot"
         self._attr_unique_id = f"{self._entry_id}_snapshot"
-        self._attr_device_info = get_device_info(self._entry_id, self._ip)
+        self._attr_device_info = get_device_info(
+            self._entry_id, self._ip, get_model(entry)
+        )
 
     async def async_press(self) -> None:
         await self._hass.services.async_call(
@@ -2,12 +2,19 @@ import logging
 import os
 import time
 import functools
-import io
-from PIL import Image
-from homeassistant.components.camera import Camera
-from homeassistant.helpers import storage
-from .device import get_device_info
-from .const import DOMAIN, STORAGE_VERSION, STORAGE_KEY_TEMPLATE
+from homeassistant.components.camera import Camera, async_get_still_stream
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from .device import get_device_info, get_model
+from .imaging import ImageCache, render_jpeg
+from .const import (
+    DOMAIN,
+    IMAGE_CACHE_BYTES,
+    PREVIEW_SIZE,
+    LIVE_PREVIEW_INTERVAL,
+    SIGNAL_SCAN_FRAME,
+    SIGNAL_SNAPSHOT_SAVED,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -15,13 +22,16 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up the Brother scanner camera entity."""
     camera = BrotherScannerLastSnapshot(hass, entry)
-    async_add_entities([camera], update_before_add=True)
+    # Nothing to poll, the state is restored from data loaded with the entry
+    async_add_entities([camera])
 
 
 class BrotherScannerLastSnapshot(Camera):
     """Camera entity showing the last snapshot from the Brother scanner."""
 
     _attr_has_entity_name = True
+    # The MJPEG stream polls for live frames this often
+    _attr_frame_interval = LIVE_PREVIEW_INTERVAL
 
     def __init__(self, hass, entry):
         super().__init__()
@@ -29,78 +39,137 @@ class BrotherScannerLastSnapshot(Camera):
         self._ip = entry.data["ip"]
         self._hostname = entry.data.get("hostname", self._ip)
         self._entry_id = entry.entry_id
+        self._device_data = hass.data[DOMAIN][entry.entry_id]
         self._attr_name = "Last Snapshot"
         self._attr_unique_id = f"{self._entry_id}_last_snapshot"
-        self._attr_device_info = get_device_info(self._entry_id, self._ip)
+        self._attr_device_info = get_device_info(
+            self._entry_id, self._ip, get_model(entry)
+        )
 
         # Path to last snapshot file
         self._file_path: str | None = None
         # Timestamp of last snapshot, used for cache-busting
         self._last_update_ts: float | None = None
-
-        # Listen for snapshot events → refresh camera immediately
-        hass.bus.async_listen(f"{DOMAIN}_snapshot_saved", self._handle_snapshot_saved)
+        # Resized variants, keyed by (path, timestamp, width, height)
+        self._image_cache = ImageCache(IMAGE_CACHE_BYTES)
+        # Low resolution frame of the page being transferred
+        self._live_frame: bytes | None = None
 
     async def async_added_to_hass(self):
-        """Restore last snapshot path from storage."""
-        store = storage.Store(
-            self._hass,
-            STORAGE_VERSION,
-            STORAGE_KEY_TEMPLATE.format(entry_id=self._entry_id),
-        )
+        """Follow this entry's scans and restore the last snapshot."""
+        # Only this entry's signals, dropped when the entity goes away
+        for signal, handler in (
+            (SIGNAL_SCAN_FRAME, self._handle_frame),
+            (SIGNAL_SNAPSHOT_SAVED, self._handle_snapshot_saved),
+        ):
+            self.async_on_remove(
+                async_dispatcher_connect(
+                    self._hass, signal.format(entry_id=self._entry_id), handler
+                )
+            )
 
-        data = await store.async_load()
-        if data and (last_snapshot := data.get("last_snapshot")):
+        # Loaded with the entry; the state is written once we return
+        if last_snapshot := self._device_data.get("last_snapshot"):
             self._file_path = last_snapshot
-            if os.path.exists(last_snapshot):
-                self._last_update_ts = os.path.getctime(last_snapshot)
+            # The archive usually knows when it was saved, without any I/O
+            newest = self._device_data["archive"].recent(1)
+            if newest and newest[0].path == last_snapshot:
+                self._last_update_ts = newest[0].timestamp
+            else:
+                self._hass.async_create_background_task(
+                    self._async_restore_timestamp(last_snapshot),
+                    f"{DOMAIN} {self._ip} restore snapshot time",
+                )
             _LOGGER.debug(
                 "Restored last snapshot for %s: %s", self._ip, self._file_path
             )
-            self.async_write_ha_state()
         else:
             _LOGGER.debug("No snapshot found for %s yet", self._ip)
 
+    async def _async_restore_timestamp(self, path: str) -> None:
+        try:
+            ts = await self._hass.async_add_executor_job(os.path.getctime, path)
+        except OSError:
+            return
+        # Unless a new scan came in meanwhile
+        if self._file_path == path and self._last_update_ts is None:
+            self._last_update_ts = ts
+            self.async_write_ha_state()
+
     async def async_camera_image(self, width=None, height=None):
         """Return the latest snapshot image bytes (non-blocking)."""
-        if not self._file_path or not os.path.exists(self._file_path):
-            _LOGGER.warning("Camera image file missing for %s", self._ip)
+        # A scan in progress wins, at whatever size it was rendered
+        if self._live_frame:
+            return self._live_frame
+        if not self._file_path:
             return None
 
+        resize = bool(width and height and width > 0 and height > 0)
+        key = (self._file_path, self._last_update_ts, width, height)
+        if resize and (cached := self._image_cache.get(key)):
+            return cached
+
+        # Serve the scan kept in memory; the file is only read after a restart
+        live = self._device_data.get("last_image")
+        if live and live["filename"] == self._file_path:
+            if not resize:
+                return live["image"]
+            # The preview is plenty for anything up to its own size
+            fits = width <= PREVIEW_SIZE[0] and height <= PREVIEW_SIZE[1]
+            source = live["preview"] if fits and live["preview"] else live["image"]
+            try:
+                data = await self._hass.async_add_executor_job(
+                    render_jpeg, source, width, height
+                )
+            except Exception as e:
+                _LOGGER.error("Failed to render snapshot image: %s", e)
+                return None
+            self._image_cache.put(key, data)
+            return data
+
         def read_file(p):
             with open(p, "rb") as f:
                 data = f.read()
-            if width and height and width > 0 and height > 0:
-                img = Image.open(io.BytesIO(data))
-                img = img.resize((width, height))
-                buf = io.BytesIO()
-                img.save(buf, format="PNG")
-                return buf.getvalue()
+            if resize:
+                return render_jpeg(data, width, height)
             return data
 
         try:
-            return await self._hass.async_add_executor_job(
+            data = await self._hass.async_add_executor_job(
                 functools.partial(read_file, self._file_path)
             )
+        except FileNotFoundError:
+            _LOGGER.warning("Camera image file missing for %s", self._ip)
+            return None
         except Exception as e:
             _LOGGER.error("Failed to read snapshot image: %s", e)
             return None
+        if resize:
+            self._image_cache.put(key, data)
+        return data
+
+    async def handle_async_mjpeg_stream(self, request):
+        """Stream the page filling in while scanning, the preview otherwise.
+
+        Frames are only sent when they change, so an idle stream costs
+        next to nothing.
+        """
+        return await async_get_still_stream(
+            request, self._async_stream_image, self.content_type, self.frame_interval
+        )
 
-    @property
-    def available(self):
-        """Camera is available if a snapshot exists."""
-        return self._file_path and os.path.exists(self._file_path)
+    async def _async_stream_image(self):
+        return self._live_frame or await self.async_camera_image(*PREVIEW_SIZE)
+
+    @callback
+    def _handle_frame(self, frame: bytes | None):
+        """Keep the latest partial frame, None when the scan failed."""
+        self._live_frame = frame
 
     @property
-    def entity_picture(self):
-        """Return the entity picture URL for sidebar/picture-entity, with cache-busting."""
-        if self._file_path and os.path.exists(self._file_path):
-            ts = int(self._last_update_ts) if self._last_update_ts else int(time.time())
-            local_path = self._file_path.replace(
-                f"{self._hass.config.path('www')}", "/local"
-            )
-            return f"{local_path}?t={ts}"
-        return None
+    def available(self):
+        """Camera is available once a snapshot has been taken."""
+        return self._file_path is not None
 
     @property
     def extra_state_attributes(self):
@@ -111,23 +180,14 @@ class BrotherScannerLastSnapshot(Camera):
             )
         }
 
-    async def _handle_snapshot_saved(self, event):
+    @callback
+    def _handle_snapshot_saved(self, filename: str):
         """Update camera when a new snapshot is saved."""
-        data = event.data
-        if data.get("ip") != self._ip or not (filename := data.get("filename")):
-            return
-
+        self._live_frame = None
+        if self._file_path:
+            self._image_cache.invalidate(self._file_path)
+        self._image_cache.invalidate(filename)
         self._file_path = filename
         self._last_update_ts = time.time()
         _LOGGER.debug("Refreshing camera entity for %s: %s", self._ip, self._file_path)
         self.async_write_ha_state()
-
-        # Save the last snapshot path to storage
-        store = storage.Store(
-            self._hass,
-            STORAGE_VERSION,
-            STORAGE_KEY_TEMPLATE.format(entry_id=self._entry_id),
-        )
-        await store.async_save({"last_snapshot": self._file_path})
-
-        self.async_write_ha_state()
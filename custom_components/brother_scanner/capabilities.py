@@ -0,0 +1,120 @@
+import dataclasses
+import re
+from dataclasses import dataclass
+from .const import MANUFACTURER, MODEL
+from .wsscan import (
+    InputSourceCaps,
+    ScannerConfiguration,
+    ScannerDescription,
+    parse_scanner_configuration,
+    parse_scanner_description,
+)
+
+_MODEL_RE = re.compile(
+    rf"^(?:{MANUFACTURER}\s+)?(.*?)(?:\s+series)?$", re.IGNORECASE
+)
+
+
+def model_from_name(name: str) -> str:
+    """'Brother DCP-1610W series' -> 'DCP-1610W'."""
+    m = _MODEL_RE.match(name.strip())
+    return m.group(1) if m and m.group(1) else name.strip()
+
+
+def _nearest(value: int, supported: tuple[int, ...]) -> int:
+    return min(supported, key=lambda r: (abs(r - value), -r))
+
+
+@dataclass(frozen=True)
+class ScannerCapabilities:
+    """What one scanner can do, read once from GetScannerElements.
+
+    Stored in the config entry data (as_dict/from_dict), so setting up an
+    entry doesn't ask the device again.
+    """
+
+    model: str
+    description: ScannerDescription
+    configuration: ScannerConfiguration
+
+    @classmethod
+    def from_elements(cls, data: bytes) -> "ScannerCapabilities":
+        """Parse a ScannerDescription + ScannerConfiguration response."""
+        description = parse_scanner_description(data)
+        return cls(
+            model=model_from_name(description.name) or MODEL,
+            description=description,
+            configuration=parse_scanner_configuration(data),
+        )
+
+    def as_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScannerCapabilities":
+        config = data["configuration"]
+
+        def caps(source: dict | None) -> InputSourceCaps | None:
+            if source is None:
+                return None
+            return InputSourceCaps(
+                resolutions=tuple(source["resolutions"]),
+                color_modes=tuple(source["color_modes"]),
+                max_width=source["max_width"],
+                max_height=source["max_height"],
+            )
+
+        quality = config["compression_quality"]
+        return cls(
+            model=data["model"],
+            description=ScannerDescription(**data["description"]),
+            configuration=ScannerConfiguration(
+                formats=tuple(config["formats"]),
+                compression_quality=tuple(quality) if quality else None,
+                platen=caps(config["platen"]),
+                adf=caps(config["adf"]),
+                adf_duplex=config["adf_duplex"],
+            ),
+        )
+
+    @property
+    def has_adf(self) -> bool:
+        return self.configuration.adf is not None
+
+    @property
+    def duplex(self) -> bool:
+        return self.has_adf and self.configuration.adf_duplex
+
+    @property
+    def input_sources(self) -> list[str]:
+        sources = ["Platen"] if self.configuration.platen else []
+        if self.has_adf:
+            sources.append("ADF")
+        if self.duplex:
+            sources.append("ADFDuplex")
+        return sources
+
+    def source_caps(self, input_source: str | None) -> InputSourceCaps | None:
+        if input_source and input_source.startswith("ADF"):
+            return self.configuration.adf
+        return self.configuration.platen or self.configuration.adf
+
+    def adapt_preset(self, settings: dict, input_source: str | None) -> dict:
+        """Fit preset values to what the device supports.
+
+        Resolutions snap to the nearest supported one, unsupported color
+        modes fall back to the device default and quality is clamped.
+        """
+        caps = self.source_caps(input_source)
+        if caps is None:
+            return settings
+        settings = dict(settings)
+        if (res := settings.get("resolution")) and caps.resolutions:
+            settings["resolution"] = _nearest(res, caps.resolutions)
+        mode = settings.get("color_mode")
+        if mode and caps.color_modes and mode not in caps.color_modes:
+            del settings["color_mode"]
+        quality = settings.get("quality")
+        if quality is not None and (bounds := self.configuration.compression_quality):
+            settings["quality"] = min(max(quality, bounds[0]), bounds[1])
+        return settings
@@ -1,16 +1,64 @@
 import voluptuous as vol
+import aiohttp
 import asyncio
 import ipaddress
+import xml.etree.ElementTree as ET
 import re
 import socket
 import logging
 from homeassistant import config_entries
-from homeassistant.components import zeroconf as ha_zeroconf
-from zeroconf import ServiceBrowser
-from .const import DOMAIN, MODEL, MANUFACTURER
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.selector import (
+    SelectOptionDict,
+    SelectSelector,
+    SelectSelectorConfig,
+    SelectSelectorMode,
+    TimeSelector,
+)
+from .const import (
+    DOMAIN,
+    MODEL,
+    MANUFACTURER,
+    CONF_CAPABILITIES,
+    PROBE_TIMEOUT,
+    CONF_PRESET,
+    DEFAULT_PRESET,
+    PRESETS,
+    CONF_DEBUG_TIMINGS,
+    CONF_LIVE_PREVIEW,
+    CONF_RETENTION_COUNT,
+    CONF_RETENTION_DAYS,
+    CONF_RETENTION_MB,
+    CONF_PROCESSING_STAGES,
+    CONF_PROCESSING_QUALITY,
+    CONF_PROCESSING_MAX_KB,
+    CONF_FSYNC,
+    CONF_DEDUPE,
+    DEDUPE_MODES,
+    DEFAULT_DEDUPE,
+    CONF_TIMELAPSE_INTERVAL,
+    CONF_TIMELAPSE_THRESHOLD,
+    CONF_TIMELAPSE_QUIET_START,
+    CONF_TIMELAPSE_QUIET_END,
+    DEFAULT_TIMELAPSE_THRESHOLD,
+    DEFAULT_QUIET_TIME,
+)
+from .api import BrotherScannerClient
+from .capabilities import model_from_name
+from .processing import DEFAULT_QUALITY, STAGES
+from .wsscan import SoapFault
 
 _LOGGER = logging.getLogger(__name__)
 
+STAGE_LABELS = {
+    "blank": "Detect blank pages (left out of documents)",
+    "deskew": "Straighten skewed pages",
+    "crop": "Crop to content",
+    "grayscale": "Convert to grayscale",
+    "recompress": "Recompress to the quality and size below",
+}
+
 
 def normalize_address(value: bytes | str) -> str:
     """Normalize an IP or hostname (from user input or zeroconf)."""
@@ -49,33 +97,19 @@ def extract_ip_from_addresses(addresses: list[bytes | str]) -> str | None:
     return None
 
 
-async def find_brother_printer(hass, model_name: str, timeout: int = 10) -> str | None:
-    """Use Home Assistant's zeroconf instance to find a Brother printer by model name."""
-    ip: str | None = None
-    stop_event = asyncio.Event()
-
-    def _on_service_add(zeroconf, service_type: str, name: str, *args, **kwargs):
-        nonlocal ip
-        if model_name not in name:
-            return
-        info = zeroconf.get_service_info(service_type, name)
-        if info and info.addresses:
-            ip = extract_ip_from_addresses(info.addresses)
-            if ip:
-                hass.loop.call_soon_threadsafe(stop_event.set)
-
-    # Use HA’s shared Zeroconf instance
-    zc = await ha_zeroconf.async_get_instance(hass)
-    browser = ServiceBrowser(zc, "_printer._tcp.local.", handlers=[_on_service_add])
-
+async def async_resolve_address(hass, host: str) -> str:
+    """Resolve a hostname to its first IPv4 address like gethostbyname."""
     try:
-        await asyncio.wait_for(stop_event.wait(), timeout)
-    except asyncio.TimeoutError:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
         pass
-    finally:
-        browser.cancel()  # Clean up the browser
-
-    return ip
+    infos = await hass.loop.getaddrinfo(
+        host, None, family=socket.AF_INET, type=socket.SOCK_STREAM
+    )
+    if not infos:
+        raise OSError(f"Could not resolve {host}")
+    return infos[0][4][0]
 
 
 class BrotherScannerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -83,14 +117,21 @@ class BrotherScannerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    _discovery = None
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        return BrotherScannerOptionsFlow(config_entry)
+
     async def _async_create_entry_for_ip(self, user_input_ip: str):
         """Resolve IP and create config entry."""
         # Normalize user input (IP or hostname)
         normalized = normalize_address(user_input_ip)
 
-        # Resolve to IP if hostname
+        # Resolve to IP if hostname, without blocking the event loop
         try:
-            ip = str(socket.gethostbyname(normalized))
+            ip = await async_resolve_address(self.hass, normalized)
         except OSError:
             ip = normalized  # Already an IP, fallback
 
@@ -98,11 +139,33 @@ class BrotherScannerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         await self.async_set_unique_id(ip)
         self._abort_if_unique_id_configured()
 
+        data = {"ip": ip, "hostname": user_input_ip}
+        title = f"{MANUFACTURER} Scanner ({user_input_ip})"
+
+        # Read the capabilities now so setup doesn't have to. One short try,
+        # the form waits on it; if the device doesn't answer, setup retries
+        client = BrotherScannerClient(ip, async_get_clientsession(self.hass))
+        try:
+            capabilities = await client.async_get_capabilities(1, PROBE_TIMEOUT)
+        except (
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+            SoapFault,
+            ET.ParseError,
+        ) as e:
+            _LOGGER.debug("Capabilities of %s unavailable: %s", ip, e)
+        else:
+            data[CONF_CAPABILITIES] = capabilities.as_dict()
+            title = f"{MANUFACTURER} {capabilities.model} Scanner ({user_input_ip})"
+
         # Store user input (hostname or IP) for display, but IP remains unique ID
-        return self.async_create_entry(
-            title=f"{MANUFACTURER} {MODEL} Scanner ({user_input_ip})",
-            data={"ip": ip, "hostname": user_input_ip},
-        )
+        return self.async_create_entry(title=title, data=data)
+
+    @callback
+    def async_remove(self) -> None:
+        if self._discovery is not None:
+            self._discovery.release()
+            self._discovery = None
 
     def is_already_configured(self, ip: str | None) -> bool:
         """Return True if a printer with IP is already configured."""
@@ -112,38 +175,84 @@ class BrotherScannerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         return False
 
     async def async_step_user(self, user_input=None):
-        """Manual configuration or auto-detection."""
+        """Pick a discovered scanner or enter an address."""
         if user_input is not None:
             return await self._async_create_entry_for_ip(user_input["ip"])
 
-        ip = await find_brother_printer(self.hass, MODEL)
-        if ip:
-            _LOGGER.info("Auto-detected Brother printer at %s", ip)
+        # The form shows what the cache holds right away: printers from
+        # zeroconf discovery flows and earlier browsing. It keeps browsing
+        # and probing in the background while flows use it. zeroconf is
+        # only imported once somebody adds a scanner
+        from .discovery import async_get_discovery
+
+        if self._discovery is None:
+            self._discovery = await async_get_discovery(self.hass)
+        discovery = self._discovery
+        self.hass.async_create_background_task(
+            discovery.async_refresh(), f"{DOMAIN} discovery refresh"
+        )
+        scanners = [
+            s for s in discovery.scanners if not self.is_already_configured(s.ip)
+        ]
+        _LOGGER.debug("Offering discovered scanners: %s", scanners)
+
+        if scanners:
+            field = SelectSelector(
+                SelectSelectorConfig(
+                    options=[
+                        SelectOptionDict(value=s.ip, label=s.label) for s in scanners
+                    ],
+                    custom_value=True,
+                    mode=SelectSelectorMode.DROPDOWN,
+                )
+            )
+            default = scanners[0].ip
         else:
-            _LOGGER.warning("No Brother printer found, leaving IP empty")
-
-        self._discovered_ip = ip
+            field, default = str, ""
 
-        return await self._show_confirm_form(step_id="user")
+        return self.async_show_form(
+            step_id="user",
+            data_schema=vol.Schema({vol.Required("ip", default=default): field}),
+            description_placeholders={"manufacturer": MANUFACTURER},
+        )
 
     async def async_step_zeroconf(self, discovery_info):
-        """Handle zeroconf discovery of Brother DCP-1610W."""
+        """Handle zeroconf discovery of a Brother printer that can scan."""
         model = discovery_info.properties.get("ty", "")
 
-        if MODEL not in model:
+        if MANUFACTURER.lower() not in model.lower():
             return self.async_abort(reason="not_supported")
 
-        # Extract first valid IP (IPv4 or IPv6)
-        ip = extract_ip_from_addresses(discovery_info.addresses)
+        # Extract first valid IP, IPv4 before IPv6
+        ip = extract_ip_from_addresses(
+            [
+                str(a)
+                for a in sorted(discovery_info.ip_addresses, key=lambda a: a.version)
+            ]
+        )
         if ip is None:
-            ip = discovery_info.host  # fallback
+            ip = discovery_info.hostname.rstrip(".")  # fallback
 
         if self.is_already_configured(ip):
             _LOGGER.info("Printer %s already configured, skipping discovery", ip)
             return self.async_abort(reason="already_configured")
 
+        # Any model will do as long as it speaks WS-Scan
+        client = BrotherScannerClient(ip, async_get_clientsession(self.hass))
+        scanner = await client.async_probe(PROBE_TIMEOUT)
+
+        # Keep the result for the user form, without browsing for it
+        from .discovery import DiscoveredPrinter, get_discovery
+
+        get_discovery(self.hass).async_record(
+            DiscoveredPrinter(discovery_info.name, ip, model.strip("()"), scanner)
+        )
+        if not scanner:
+            return self.async_abort(reason="not_supported")
+
         # Save for the confirm step
         self._discovered_ip = ip
+        self._discovered_model = model_from_name(model)
 
         # Forward to zeroconf_confirm step
         return await self.async_step_zeroconf_confirm()
@@ -165,6 +274,98 @@ class BrotherScannerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             description_placeholders={
                 "host": ip,
                 "manufacturer": MANUFACTURER,
-                "model": MODEL,
+                "model": getattr(self, "_discovered_model", None) or MODEL,
             },
         )
+
+
+class BrotherScannerOptionsFlow(config_entries.OptionsFlowWithConfigEntry):
+    """Per-scanner scan settings."""
+
+    async def async_step_init(self, user_input=None):
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_PRESET,
+                        default=options.get(CONF_PRESET, DEFAULT_PRESET),
+                    ): vol.In(list(PRESETS)),
+                    vol.Required(
+                        CONF_LIVE_PREVIEW,
+                        default=options.get(CONF_LIVE_PREVIEW, True),
+                    ): bool,
+                    vol.Required(
+                        CONF_DEBUG_TIMINGS,
+                        default=options.get(CONF_DEBUG_TIMINGS, False),
+                    ): bool,
+                    vol.Required(
+                        CONF_RETENTION_COUNT,
+                        default=options.get(CONF_RETENTION_COUNT, 0),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_RETENTION_DAYS,
+                        default=options.get(CONF_RETENTION_DAYS, 0),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_RETENTION_MB,
+                        default=options.get(CONF_RETENTION_MB, 0),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_DEDUPE,
+                        default=options.get(CONF_DEDUPE, DEFAULT_DEDUPE),
+                    ): vol.In(DEDUPE_MODES),
+                    vol.Required(
+                        CONF_FSYNC,
+                        default=options.get(CONF_FSYNC, False),
+                    ): bool,
+                    vol.Required(
+                        CONF_PROCESSING_STAGES,
+                        default=options.get(CONF_PROCESSING_STAGES, []),
+                    ): SelectSelector(
+                        SelectSelectorConfig(
+                            options=[
+                                SelectOptionDict(value=s, label=STAGE_LABELS[s])
+                                for s in STAGES
+                            ],
+                            multiple=True,
+                            mode=SelectSelectorMode.LIST,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_PROCESSING_QUALITY,
+                        default=options.get(CONF_PROCESSING_QUALITY, DEFAULT_QUALITY),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+                    vol.Required(
+                        CONF_PROCESSING_MAX_KB,
+                        default=options.get(CONF_PROCESSING_MAX_KB, 0),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_TIMELAPSE_INTERVAL,
+                        default=options.get(CONF_TIMELAPSE_INTERVAL, 0),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_TIMELAPSE_THRESHOLD,
+                        default=options.get(
+                            CONF_TIMELAPSE_THRESHOLD, DEFAULT_TIMELAPSE_THRESHOLD
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+                    vol.Required(
+                        CONF_TIMELAPSE_QUIET_START,
+                        default=options.get(
+                            CONF_TIMELAPSE_QUIET_START, DEFAULT_QUIET_TIME
+                        ),
+                    ): TimeSelector(),
+                    vol.Required(
+                        CONF_TIMELAPSE_QUIET_END,
+                        default=options.get(
+                            CONF_TIMELAPSE_QUIET_END, DEFAULT_QUIET_TIME
+                        ),
+                    ): TimeSelector(),
+                }
+            ),
+        )
@@ -1,6 +1,106 @@
 DOMAIN = "brother_scanner"
 MANUFACTURER = "Brother"
+# Model assumed for entries created before capabilities were read
 MODEL = "DCP-1610W"
 STORAGE_VERSION = 1
 STORAGE_KEY_TEMPLATE = f"{DOMAIN}_{{entry_id}}"
+# Seconds a last snapshot update waits, so bursts of scans write once
+STORAGE_SAVE_DELAY = 10
+ARCHIVE_KEY_TEMPLATE = f"{DOMAIN}_{{entry_id}}_archive"
 SCANS_DIR = "scans"
+# Config entry data key of the cached ScannerCapabilities
+CONF_CAPABILITIES = "capabilities"
+# Seconds a discovered printer gets to answer a WS-Scan request
+PROBE_TIMEOUT = 3
+
+# Status polling
+STATUS_ACTIVE_INTERVAL = 3
+STATUS_IDLE_INTERVAL = 30
+STATUS_MAX_INTERVAL = 600
+STATUS_TTL = 30
+
+# Scan queue
+QUEUE_MAX_DEPTH = 20
+
+# Rendered camera image cache, per camera
+IMAGE_CACHE_BYTES = 8 * 1024 * 1024
+# Bounding box of the preview rendered right after a scan
+PREVIEW_SIZE = (640, 640)
+# Show the page filling in on the camera while it is transferred, with
+# at most one frame per this many seconds
+CONF_LIVE_PREVIEW = "live_preview"
+LIVE_PREVIEW_INTERVAL = 0.3
+SIGNAL_SCAN_FRAME = f"{DOMAIN}_scan_frame_{{entry_id}}"
+# Tells the camera of one entry about its new snapshot
+SIGNAL_SNAPSHOT_SAVED = f"{DOMAIN}_snapshot_saved_{{entry_id}}"
+
+# Scan settings, keys match the snapshot service fields
+CONF_PRESET = "preset"
+DEFAULT_PRESET = "device-default"
+PRESETS = {
+    DEFAULT_PRESET: {},
+    "fast-preview": {"resolution": 150, "color_mode": "Grayscale8", "quality": 50},
+    "archive": {"resolution": 300, "color_mode": "RGB24", "quality": 90},
+}
+COLOR_MODES = ["BlackAndWhite1", "Grayscale8", "RGB24"]
+INPUT_SOURCES = ["Platen", "ADF", "ADFDuplex"]
+# Log per-phase scan timings at info level
+CONF_DEBUG_TIMINGS = "debug_timings"
+
+# Scan archive. Retention options, 0 means unlimited.
+CONF_RETENTION_COUNT = "retention_count"
+CONF_RETENTION_DAYS = "retention_days"
+CONF_RETENTION_MB = "retention_mb"
+# Seconds between index writes and between age checks
+ARCHIVE_SAVE_DELAY = 10
+ARCHIVE_ENFORCE_INTERVAL = 3600
+RECENT_SCANS_DEFAULT = 10
+RECENT_SCANS_MAX = 100
+# Media browser: scans per page, thumbnail bounding box, signed URL lifetime
+MEDIA_PAGE_SIZE = 100
+THUMBNAIL_SIZE = (256, 256)
+MEDIA_URL_EXPIRATION = 3600
+
+# Post-scan processing. Stages are names from processing.STAGES, the
+# target size is in kB with 0 meaning no limit.
+CONF_PROCESSING_STAGES = "processing_stages"
+CONF_PROCESSING_QUALITY = "processing_quality"
+CONF_PROCESSING_MAX_KB = "processing_max_kb"
+# Worker threads shared by all scanners, seconds allowed per page
+PROCESSING_WORKERS = 2
+PROCESSING_TIMEOUT = 120
+
+# Writing scans. With fsync a saved scan survives a power cut. Scans
+# identical to one of the last DEDUPE_WINDOW are hardlinked to it, or not
+# saved again at all.
+CONF_FSYNC = "fsync"
+CONF_DEDUPE = "dedupe"
+DEDUPE_OFF = "off"
+DEDUPE_HARDLINK = "hardlink"
+DEDUPE_SKIP = "skip"
+DEDUPE_MODES = [DEDUPE_OFF, DEDUPE_HARDLINK, DEDUPE_SKIP]
+DEFAULT_DEDUPE = DEDUPE_HARDLINK
+DEDUPE_WINDOW = 10
+
+# Timelapse: every interval minutes (0 is off) a low resolution preview
+# of the glass is compared with the one of the last stored scan. Only if
+# it differs by at least threshold percent is the full scan done. No
+# scans between quiet start and end, equal times mean no quiet hours.
+CONF_TIMELAPSE_INTERVAL = "timelapse_interval"
+CONF_TIMELAPSE_THRESHOLD = "timelapse_threshold"
+CONF_TIMELAPSE_QUIET_START = "timelapse_quiet_start"
+CONF_TIMELAPSE_QUIET_END = "timelapse_quiet_end"
+DEFAULT_TIMELAPSE_THRESHOLD = 2
+DEFAULT_QUIET_TIME = "00:00:00"
+TIMELAPSE_PREVIEW = {"resolution": 100, "color_mode": "Grayscale8", "quality": 50}
+# Below the default priority, requested scans go first
+TIMELAPSE_PRIORITY = -1
+# The device needs a moment after the preview before it takes the next job
+TIMELAPSE_IDLE_TIMEOUT = 10
+
+# WS-Eventing, seconds
+EVENT_SUBSCRIPTION_DURATION = 3600
+EVENT_RENEW_MARGIN = 300
+# Whatever expiry the device grants, don't renew more often than this
+EVENT_MIN_RENEW_DELAY = 30
+EVENT_RETRY_INTERVAL = 300
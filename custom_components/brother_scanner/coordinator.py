@@ -0,0 +1,74 @@
+import asyncio
+import datetime
+import logging
+import aiohttp
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from .api import BrotherScannerClient
+from .wsscan import ScannerStatus
+from .const import (
+    DOMAIN,
+    STATUS_ACTIVE_INTERVAL,
+    STATUS_IDLE_INTERVAL,
+    STATUS_MAX_INTERVAL,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class BrotherScannerCoordinator(DataUpdateCoordinator[ScannerStatus]):
+    """Poll the scanner status, fast while busy and slow while idle.
+
+    Polling stops while the device pushes its status over WS-Eventing.
+    """
+
+    def __init__(self, hass, client: BrotherScannerClient):
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {client.ip}",
+            update_interval=datetime.timedelta(seconds=STATUS_IDLE_INTERVAL),
+        )
+        self.client = client
+        self._failures = 0
+        self.push_active = False
+
+    @callback
+    def async_set_push_active(self, active: bool) -> None:
+        self.push_active = active
+        if active:
+            self.update_interval = None
+        else:
+            # Resume polling right away, the last pushed state may be stale
+            self.update_interval = datetime.timedelta(seconds=STATUS_IDLE_INTERVAL)
+            self.hass.async_create_task(self.async_request_refresh())
+
+    @callback
+    def async_set_pushed_status(self, status: ScannerStatus) -> None:
+        self.client.set_status(status)
+        self.async_set_updated_data(status)
+
+    async def _async_update_data(self) -> ScannerStatus:
+        try:
+            status = await self.client.async_get_scanner_status()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Back off exponentially while the device is unreachable
+            self._failures += 1
+            self.update_interval = datetime.timedelta(
+                seconds=min(
+                    STATUS_IDLE_INTERVAL * 2 ** (self._failures - 1),
+                    STATUS_MAX_INTERVAL,
+                )
+            )
+            raise UpdateFailed(f"Scanner {self.client.ip} unreachable: {e}") from e
+
+        self._failures = 0
+        if self.push_active:
+            self.update_interval = None
+        else:
+            self.update_interval = datetime.timedelta(
+                seconds=(
+                    STATUS_IDLE_INTERVAL if status.is_idle else STATUS_ACTIVE_INTERVAL
+                )
+            )
+        return status
@@ -1,14 +1,19 @@
 from homeassistant.helpers.entity import DeviceInfo
-from .const import DOMAIN, MANUFACTURER, MODEL
+from .const import DOMAIN, MANUFACTURER, MODEL, CONF_CAPABILITIES
 import re
 
 
-def get_device_info(entry_id: str, ip: str) -> DeviceInfo:
+def get_model(entry) -> str:
+    """Return the model from the capabilities cached in the entry."""
+    return entry.data.get(CONF_CAPABILITIES, {}).get("model") or MODEL
+
+
+def get_device_info(entry_id: str, ip: str, model: str = MODEL) -> DeviceInfo:
     """Return shared DeviceInfo for a Brother scanner."""
     return DeviceInfo(
         identifiers={(DOMAIN, entry_id)},
-        name=f"{MODEL} {ip}",
+        name=f"{model} {ip}",
         manufacturer=MANUFACTURER,
-        model=MODEL,
+        model=model,
         configuration_url=f"http://{ip}",
     )
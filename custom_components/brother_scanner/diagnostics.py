@@ -0,0 +1,32 @@
+import dataclasses
+from homeassistant.components.diagnostics import async_redact_data
+from .const import DOMAIN
+
+TO_REDACT = {"ip", "hostname"}
+
+
+async def async_get_config_entry_diagnostics(hass, entry):
+    """Return diagnostics for a config entry."""
+    device_data = hass.data[DOMAIN][entry.entry_id]
+    client = device_data["client"]
+    queue = device_data["queue"]
+    status = device_data["coordinator"].data
+
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": async_redact_data(entry.options, TO_REDACT),
+        },
+        "status": dataclasses.asdict(status) if status else None,
+        "configuration": (
+            dataclasses.asdict(client.configuration) if client.configuration else None
+        ),
+        "queue": {
+            "depth": queue.depth,
+            "processed": queue.processed,
+            "last_wait": queue.last_wait,
+            "avg_wait": queue.avg_wait,
+        },
+        "circuit": client.breaker.as_dict(),
+        "timings": device_data["stats"].as_dict(),
+    }
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+from dataclasses import dataclass, replace
+from homeassistant.components import zeroconf as ha_zeroconf
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_call_later
+from zeroconf import IPVersion, ServiceStateChange
+from zeroconf.asyncio import AsyncServiceBrowser, AsyncServiceInfo
+from .api import BrotherScannerClient
+from .const import DOMAIN, MANUFACTURER, PROBE_TIMEOUT
+
+_LOGGER = logging.getLogger(__name__)
+
+# Not under hass.data[DOMAIN], which only holds config entries
+DATA_DISCOVERY = f"{DOMAIN}_discovery"
+SERVICE_TYPE = "_printer._tcp.local."
+RESOLVE_TIMEOUT_MS = 3000
+# Keep browsing for a while after the last flow, forms are often reopened
+IDLE_TIMEOUT = 300
+
+
+@dataclass(frozen=True)
+class DiscoveredPrinter:
+    name: str
+    ip: str
+    model: str
+    # None until the WS-Scan probe has answered
+    scanner: bool | None = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.model} ({self.ip})"
+
+
+@callback
+def get_discovery(hass) -> "BrotherDiscovery":
+    """Return the shared discovery cache, creating it if needed.
+
+    Zeroconf discovery flows record the printers they probe here, so the
+    cache has them before anybody opens the form.
+    """
+    if (discovery := hass.data.get(DATA_DISCOVERY)) is None:
+        discovery = hass.data[DATA_DISCOVERY] = BrotherDiscovery(hass)
+    return discovery
+
+
+async def async_get_discovery(hass) -> "BrotherDiscovery":
+    """Return the shared discovery cache with its browser running.
+
+    Callers release it when done; browsing stops some time after the last
+    release, the printers found are kept.
+    """
+    discovery = get_discovery(hass)
+    await discovery.async_start()
+    discovery.acquire()
+    return discovery
+
+
+class BrotherDiscovery:
+    """Brother printers seen on the network, kept current in the background.
+
+    Zeroconf discovery flows and, while config flows use the cache, an
+    AsyncServiceBrowser on Home Assistant's shared zeroconf instance feed
+    it. Each new printer is resolved with AsyncServiceInfo and probed for
+    WS-Scan support, so config flows list the results immediately instead
+    of browsing themselves.
+    """
+
+    def __init__(self, hass):
+        self._hass = hass
+        self._browser: AsyncServiceBrowser | None = None
+        self._zeroconf = None
+        # Resolve and probe tasks still running
+        self._pending: set[asyncio.Task] = set()
+        self._users = 0
+        self._unsub_idle = None
+        self._unsub_stop = None
+        self.printers: dict[str, DiscoveredPrinter] = {}
+
+    @property
+    def scanners(self) -> list[DiscoveredPrinter]:
+        """Printers confirmed to speak WS-Scan, sorted by label."""
+        return sorted(
+            (p for p in self.printers.values() if p.scanner),
+            key=lambda p: p.label,
+        )
+
+    async def async_start(self) -> None:
+        """Start browsing, unless already browsing."""
+        if self._browser is not None:
+            return
+        aiozc = await ha_zeroconf.async_get_async_instance(self._hass)
+        if self._browser is not None:
+            return
+        self._zeroconf = aiozc.zeroconf
+        self._browser = AsyncServiceBrowser(
+            self._zeroconf, SERVICE_TYPE, handlers=[self._on_service_state_change]
+        )
+        self._unsub_stop = self._hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, self._async_stop
+        )
+
+    @callback
+    def async_record(self, printer: DiscoveredPrinter) -> None:
+        """Add a printer found and probed elsewhere."""
+        self.printers[printer.name] = printer
+
+    def acquire(self) -> None:
+        self._users += 1
+        if self._unsub_idle:
+            self._unsub_idle()
+            self._unsub_idle = None
+
+    def release(self) -> None:
+        self._users -= 1
+        if self._users == 0:
+            self._unsub_idle = async_call_later(
+                self._hass, IDLE_TIMEOUT, self._async_idle
+            )
+
+    async def _async_idle(self, _now=None) -> None:
+        # Stop browsing but keep what was found for the next form
+        self._unsub_idle = None
+        if self._unsub_stop:
+            self._unsub_stop()
+        await self._async_stop()
+
+    async def _async_stop(self, _event=None) -> None:
+        self._unsub_stop = None
+        for task in self._pending:
+            task.cancel()
+        if self._browser:
+            await self._browser.async_cancel()
+            self._browser = None
+
+    def _on_service_state_change(
+        self, zeroconf, service_type: str, name: str, state_change
+    ) -> None:
+        # Called from the event loop by AsyncServiceBrowser
+        if state_change is ServiceStateChange.Removed:
+            self.printers.pop(name, None)
+            return
+        if MANUFACTURER.lower() not in name.lower():
+            return
+        task = self._hass.async_create_background_task(
+            self._async_resolve(service_type, name), f"{DOMAIN} resolve {name}"
+        )
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _async_resolve(self, service_type: str, name: str) -> None:
+        info = AsyncServiceInfo(service_type, name)
+        if not await info.async_request(self._zeroconf, RESOLVE_TIMEOUT_MS):
+            return
+        addresses = info.parsed_addresses(IPVersion.V4Only)
+        if not addresses:
+            return
+        properties = info.decoded_properties
+        model = properties.get("ty") or properties.get("product") or name
+        model = model.strip("()")
+        known = self.printers.get(name)
+        if known and known.ip == addresses[0] and known.scanner is not None:
+            return
+        printer = DiscoveredPrinter(name, addresses[0], model)
+        self.printers[name] = printer
+        await self._async_probe(printer)
+
+    async def _async_probe(self, printer: DiscoveredPrinter) -> None:
+        client = BrotherScannerClient(
+            printer.ip, async_get_clientsession(self._hass)
+        )
+        scanner = await client.async_probe(PROBE_TIMEOUT)
+        _LOGGER.debug(
+            "Discovered %s at %s, WS-Scan %s",
+            printer.model,
+            printer.ip,
+            "supported" if scanner else "not answering",
+        )
+        # Only update if the printer hasn't moved meanwhile
+        if self.printers.get(printer.name) == printer:
+            self.printers[printer.name] = replace(printer, scanner=scanner)
+
+    async def async_refresh(self) -> None:
+        """Probe again every printer whose scan support isn't confirmed."""
+        await asyncio.gather(
+            *(
+                self._async_probe(p)
+                for p in list(self.printers.values())
+                if not p.scanner
+            )
+        )
@@ -0,0 +1,425 @@
+import asyncio
+import logging
+import re
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+import aiohttp
+from aiohttp import web
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.network import NoURLAvailableError, get_url
+from homeassistant.util import dt as dt_util
+from .api import BrotherScannerClient, make_uuid
+from .const import (
+    DOMAIN,
+    EVENT_SUBSCRIPTION_DURATION,
+    EVENT_MIN_RENEW_DELAY,
+    EVENT_RENEW_MARGIN,
+    EVENT_RETRY_INTERVAL,
+)
+from .wsscan import (
+    SCAN_NS,
+    WSA_NS,
+    Envelope,
+    ScannerStatus,
+    SoapFault,
+    iter_elements,
+    parse_scanner_status,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+WSE_NS = "http://schemas.xmlsoap.org/ws/2004/08/eventing"
+DISPLAY_NAME = "Home Assistant"
+# Don't hold up unloading for an unreachable device
+UNSUBSCRIBE_TIMEOUT = 5
+
+# --- WS-Eventing envelopes ---
+SUBSCRIBE = Envelope("""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"
+               xmlns:wsa="http://schemas.xmlsoap.org/ws/2004/08/addressing"
+               xmlns:wse="http://schemas.xmlsoap.org/ws/2004/08/eventing"
+               xmlns:sca="http://schemas.microsoft.com/windows/2006/08/wdp/scan">
+  <soap:Header>
+    <wsa:To>{url}</wsa:To>
+    <wsa:Action>http://schemas.xmlsoap.org/ws/2004/08/eventing/Subscribe</wsa:Action>
+    <wsa:MessageID>urn:uuid:{msgid}</wsa:MessageID>
+    <wsa:ReplyTo>
+      <wsa:Address>http://schemas.xmlsoap.org/ws/2004/08/addressing/role/anonymous</wsa:Address>
+    </wsa:ReplyTo>
+  </soap:Header>
+  <soap:Body>
+    <wse:Subscribe>
+      <wse:EndTo>
+        <wsa:Address>{notify_to}</wsa:Address>
+        <wsa:ReferenceParameters>
+          <wse:Identifier>{identifier}</wse:Identifier>
+        </wsa:ReferenceParameters>
+      </wse:EndTo>
+      <wse:Delivery Mode="http://schemas.xmlsoap.org/ws/2004/08/eventing/DeliveryModes/Push">
+        <wse:NotifyTo>
+          <wsa:Address>{notify_to}</wsa:Address>
+          <wsa:ReferenceParameters>
+            <wse:Identifier>{identifier}</wse:Identifier>
+          </wsa:ReferenceParameters>
+        </wse:NotifyTo>
+      </wse:Delivery>
+      <wse:Expires>{expires}</wse:Expires>
+      <wse:Filter Dialect="http://schemas.xmlsoap.org/ws/2006/02/devprof/Action">http://schemas.microsoft.com/windows/2006/08/wdp/scan/ScannerStatusSummaryEvent http://schemas.microsoft.com/windows/2006/08/wdp/scan/ScanAvailableEvent</wse:Filter>
+      <sca:ScanDestinations>
+        <sca:ScanDestination>
+          <sca:ClientDisplayName>{display_name}</sca:ClientDisplayName>
+          <sca:ClientContext>{context}</sca:ClientContext>
+        </sca:ScanDestination>
+      </sca:ScanDestinations>
+    </wse:Subscribe>
+  </soap:Body>
+</soap:Envelope>
+""")
+
+RENEW = Envelope("""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"
+               xmlns:wsa="http://schemas.xmlsoap.org/ws/2004/08/addressing"
+               xmlns:wse="http://schemas.xmlsoap.org/ws/2004/08/eventing">
+  <soap:Header>
+    <wsa:To>{url}</wsa:To>
+    <wsa:Action>http://schemas.xmlsoap.org/ws/2004/08/eventing/Renew</wsa:Action>
+    <wsa:MessageID>urn:uuid:{msgid}</wsa:MessageID>
+    <wsa:ReplyTo>
+      <wsa:Address>http://schemas.xmlsoap.org/ws/2004/08/addressing/role/anonymous</wsa:Address>
+    </wsa:ReplyTo>
+    <wse:Identifier>{manager_id}</wse:Identifier>
+  </soap:Header>
+  <soap:Body>
+    <wse:Renew>
+      <wse:Expires>{expires}</wse:Expires>
+    </wse:Renew>
+  </soap:Body>
+</soap:Envelope>
+""")
+
+UNSUBSCRIBE = Envelope("""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"
+               xmlns:wsa="http://schemas.xmlsoap.org/ws/2004/08/addressing"
+               xmlns:wse="http://schemas.xmlsoap.org/ws/2004/08/eventing">
+  <soap:Header>
+    <wsa:To>{url}</wsa:To>
+    <wsa:Action>http://schemas.xmlsoap.org/ws/2004/08/eventing/Unsubscribe</wsa:Action>
+    <wsa:MessageID>urn:uuid:{msgid}</wsa:MessageID>
+    <wsa:ReplyTo>
+      <wsa:Address>http://schemas.xmlsoap.org/ws/2004/08/addressing/role/anonymous</wsa:Address>
+    </wsa:ReplyTo>
+    <wse:Identifier>{manager_id}</wse:Identifier>
+  </soap:Header>
+  <soap:Body>
+    <wse:Unsubscribe/>
+  </soap:Body>
+</soap:Envelope>
+""")
+
+
+# --- Messages ---
+@dataclass(frozen=True)
+class Subscription:
+    manager_url: str
+    manager_id: str
+    # Seconds until the device drops the subscription
+    expires: float
+    destination_token: str | None = None
+
+
+@dataclass(frozen=True)
+class ScanAvailable:
+    """A scan was started on the device for one of our destinations."""
+
+    client_context: str
+    scan_identifier: str
+
+
+_DURATION_RE = re.compile(
+    r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?)?$"
+)
+
+SUBSCRIPTION_MANAGER = f"{{{WSE_NS}}}SubscriptionManager"
+ADDRESS = f"{{{WSA_NS}}}Address"
+IDENTIFIER = f"{{{WSE_NS}}}Identifier"
+EXPIRES = f"{{{WSE_NS}}}Expires"
+DESTINATION_TOKEN = f"{{{SCAN_NS}}}DestinationToken"
+STATUS_SUMMARY_EVENT = f"{{{SCAN_NS}}}ScannerStatusSummaryEvent"
+SCAN_AVAILABLE_EVENT = f"{{{SCAN_NS}}}ScanAvailableEvent"
+CLIENT_CONTEXT = f"{{{SCAN_NS}}}ClientContext"
+SCAN_IDENTIFIER = f"{{{SCAN_NS}}}ScanIdentifier"
+
+
+def format_duration(seconds: int) -> str:
+    return f"PT{seconds}S"
+
+
+def parse_expires(text: str, default: float) -> float:
+    """Return seconds from an xs:duration or an absolute xs:dateTime."""
+    if m := _DURATION_RE.match(text):
+        days, hours, minutes, seconds = (float(g or 0) for g in m.groups())
+        return days * 86400 + hours * 3600 + minutes * 60 + seconds
+    if when := dt_util.parse_datetime(text):
+        return max((when - dt_util.utcnow()).total_seconds(), 0)
+    return default
+
+
+def parse_subscribe_response(data: bytes, default_expires: float) -> Subscription:
+    manager_url = manager_id = token = None
+    expires = default_expires
+    for tag, text, elem in iter_elements(data):
+        if tag == SUBSCRIPTION_MANAGER:
+            manager_url = (elem.findtext(ADDRESS) or "").strip()
+            manager_id = (elem.findtext(f".//{IDENTIFIER}") or "").strip()
+        elif tag == EXPIRES:
+            expires = parse_expires(text, default_expires)
+        elif tag == DESTINATION_TOKEN:
+            token = text
+    if not manager_url:
+        raise ValueError("No subscription manager in SubscribeResponse")
+    return Subscription(manager_url, manager_id or "", expires, token)
+
+
+def parse_notification(
+    data: bytes,
+) -> tuple[str | None, ScannerStatus | ScanAvailable | None]:
+    """Return the subscription identifier and the event of a notification."""
+    identifier = None
+    event = None
+    for tag, text, elem in iter_elements(data):
+        if tag == IDENTIFIER:
+            identifier = text
+        elif tag == STATUS_SUMMARY_EVENT:
+            event = parse_scanner_status(data)
+        elif tag == SCAN_AVAILABLE_EVENT:
+            event = ScanAvailable(
+                (elem.findtext(CLIENT_CONTEXT) or "").strip(),
+                (elem.findtext(SCAN_IDENTIFIER) or "").strip(),
+            )
+    return identifier, event
+
+
+# --- Subscriber ---
+class ScannerEventSubscriber:
+    """Keep a WS-Eventing subscription alive and dispatch its events.
+
+    Falls back to polling (push_active False) whenever the device can't be
+    subscribed to, and keeps retrying in the background.
+    """
+
+    def __init__(
+        self,
+        hass,
+        entry_id: str,
+        client: BrotherScannerClient,
+        on_status: Callable[[ScannerStatus], None],
+        on_scan_available: Callable[[ScanAvailable, str | None], Awaitable[None]],
+        on_active: Callable[[bool], None],
+    ):
+        self._hass = hass
+        self._entry_id = entry_id
+        self._client = client
+        self._on_status = on_status
+        self._on_scan_available = on_scan_available
+        self._on_active = on_active
+        # Echoed back by the device in every notification
+        self._identifier = f"urn:uuid:{make_uuid()}"
+        self._context = make_uuid()
+        self.subscription: Subscription | None = None
+        self._unsub_timer: Callable[[], None] | None = None
+        self._start_task: asyncio.Task | None = None
+        self._stopped = False
+
+    @property
+    def active(self) -> bool:
+        return self.subscription is not None
+
+    def _cancel_timer(self) -> None:
+        if self._unsub_timer:
+            self._unsub_timer()
+            self._unsub_timer = None
+
+    def _schedule(self, delay: float, action) -> None:
+        self._cancel_timer()
+        self._unsub_timer = async_call_later(self._hass, delay, action)
+
+    def _set_subscription(self, subscription: Subscription | None) -> None:
+        if subscription is not None and subscription.expires <= 0:
+            # Granted for no time at all or already expired: start over after
+            # the retry interval rather than renewing back to back
+            _LOGGER.debug(
+                "%s granted a subscription that already expired", self._client.ip
+            )
+            subscription = None
+        was_active = self.active
+        self.subscription = subscription
+        if self.active != was_active:
+            self._on_active(self.active)
+        if subscription:
+            # Renew well before the device forgets about us
+            expires = subscription.expires
+            delay = max(
+                expires - EVENT_RENEW_MARGIN, expires / 2, EVENT_MIN_RENEW_DELAY
+            )
+            self._schedule(delay, self._async_renew)
+        elif not self._stopped:
+            self._schedule(EVENT_RETRY_INTERVAL, self._async_subscribe)
+
+    @callback
+    def async_start(self) -> None:
+        """Subscribe in the background; the caller keeps polling meanwhile."""
+        self._start_task = self._hass.async_create_background_task(
+            self._async_subscribe(), f"{DOMAIN} {self._client.ip} event subscription"
+        )
+
+    async def _async_subscribe(self, _now=None) -> None:
+        self._unsub_timer = None
+        try:
+            notify_to = get_url(
+                self._hass, allow_cloud=False, prefer_external=False
+            ) + BrotherScannerEventView.url.format(entry_id=self._entry_id)
+            xml = SUBSCRIBE.render(
+                url=self._client.url,
+                msgid=make_uuid(),
+                notify_to=escape(notify_to),
+                identifier=self._identifier,
+                expires=format_duration(EVENT_SUBSCRIPTION_DURATION),
+                display_name=DISPLAY_NAME,
+                context=self._context,
+            )
+            resp_bytes = await self._client.async_soap(xml)
+            subscription = parse_subscribe_response(
+                resp_bytes, EVENT_SUBSCRIPTION_DURATION
+            )
+        except (
+            NoURLAvailableError,
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+            SoapFault,
+            ValueError,
+            ET.ParseError,
+        ) as e:
+            _LOGGER.debug(
+                "Event subscription to %s failed, polling instead: %s",
+                self._client.ip,
+                e,
+            )
+            if not self._stopped:
+                self._set_subscription(None)
+            return
+        if self._stopped:
+            # Unloaded while subscribing, don't leave the device pushing to us
+            await self._async_unsubscribe(subscription)
+            return
+        _LOGGER.debug(
+            "Subscribed to %s events for %.0fs", self._client.ip, subscription.expires
+        )
+        self._set_subscription(subscription)
+
+    async def _async_renew(self, _now=None) -> None:
+        self._unsub_timer = None
+        subscription = self.subscription
+        if subscription is None:
+            return
+        xml = RENEW.render(
+            url=subscription.manager_url,
+            msgid=make_uuid(),
+            manager_id=subscription.manager_id,
+            expires=format_duration(EVENT_SUBSCRIPTION_DURATION),
+        )
+        try:
+            resp_bytes = await self._client.async_soap(xml, subscription.manager_url)
+        except (aiohttp.ClientError, asyncio.TimeoutError, SoapFault) as e:
+            if self._stopped:
+                return
+            _LOGGER.debug("Renewing %s subscription failed: %s", self._client.ip, e)
+            # Start over with a fresh subscription, going back to polling
+            # until it succeeds
+            self._set_subscription(None)
+            self._cancel_timer()
+            await self._async_subscribe()
+            return
+        if self._stopped:
+            return
+        expires = EVENT_SUBSCRIPTION_DURATION
+        for tag, text, _ in iter_elements(resp_bytes):
+            if tag == EXPIRES:
+                expires = parse_expires(text, EVENT_SUBSCRIPTION_DURATION)
+        self._set_subscription(
+            Subscription(
+                subscription.manager_url,
+                subscription.manager_id,
+                expires,
+                subscription.destination_token,
+            )
+        )
+
+    async def async_stop(self) -> None:
+        """Cancel renewals and unsubscribe, best effort."""
+        self._stopped = True
+        self._cancel_timer()
+        if self._start_task and not self._start_task.done():
+            self._start_task.cancel()
+        self._start_task = None
+        subscription, self.subscription = self.subscription, None
+        if subscription is not None:
+            await self._async_unsubscribe(subscription)
+
+    async def _async_unsubscribe(self, subscription: Subscription) -> None:
+        xml = UNSUBSCRIBE.render(
+            url=subscription.manager_url,
+            msgid=make_uuid(),
+            manager_id=subscription.manager_id,
+        )
+        try:
+            await self._client.async_soap(
+                xml, subscription.manager_url, UNSUBSCRIBE_TIMEOUT
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError, SoapFault) as e:
+            _LOGGER.debug("Unsubscribing from %s failed: %s", self._client.ip, e)
+
+    async def async_handle_notification(self, data: bytes) -> bool:
+        """Dispatch a notification; False if it is not for this subscription."""
+        try:
+            identifier, event = parse_notification(data)
+        except ET.ParseError:
+            return False
+        if identifier != self._identifier:
+            return False
+        if isinstance(event, ScannerStatus):
+            self._on_status(event)
+        elif isinstance(event, ScanAvailable):
+            if event.client_context != self._context:
+                return False
+            token = self.subscription.destination_token if self.subscription else None
+            await self._on_scan_available(event, token)
+        return True
+
+
+class BrotherScannerEventView(HomeAssistantView):
+    """Receive WS-Eventing notifications pushed by the scanners.
+
+    The device can't authenticate, so a notification is only accepted if
+    it carries the identifier of the entry's current subscription.
+    """
+
+    url = "/api/brother_scanner/events/{entry_id}"
+    name = "api:brother_scanner:events"
+    requires_auth = False
+
+    def __init__(self, hass):
+        self._hass = hass
+
+    async def post(self, request: web.Request, entry_id: str) -> web.Response:
+        device_data = self._hass.data.get(DOMAIN, {}).get(entry_id)
+        subscriber = device_data and device_data.get("events")
+        if not subscriber:
+            return web.Response(status=404)
+        data = await request.read()
+        if not await subscriber.async_handle_notification(data):
+            return web.Response(status=400)
+        return web.Response(status=202)
@@ -0,0 +1,95 @@
+import hashlib
+import os
+import tempfile
+
+# Blocking helpers, run them in an executor. Files are written to a temp
+# file in the target directory and renamed over the target, so readers
+# see either the old file or the complete new one, never a partial one.
+
+# mkstemp creates files 0600 and the rename keeps that; give scans the mode
+# open() would. The umask can only be read by setting it, so read it once
+# here rather than racing other threads later.
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+
+def open_temp(path: str):
+    """Open a temp file next to path for writing, return (file, temp path)."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+    os.fchmod(fd, FILE_MODE)
+    return os.fdopen(fd, "wb"), tmp
+
+
+def _fsync_dir(directory: str) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def commit_temp(f, tmp: str, path: str, fsync: bool = False) -> None:
+    """Close a temp file from open_temp and move it to path.
+
+    With fsync the data and the rename are on disk when this returns.
+    """
+    if fsync:
+        f.flush()
+        os.fsync(f.fileno())
+    f.close()
+    os.replace(tmp, path)
+    if fsync:
+        _fsync_dir(os.path.dirname(path))
+
+
+def discard_temp(f, tmp: str) -> None:
+    f.close()
+    try:
+        os.remove(tmp)
+    except FileNotFoundError:
+        pass
+
+
+def write_atomic(path: str, data: bytes, fsync: bool = False) -> None:
+    f, tmp = open_temp(path)
+    try:
+        f.write(data)
+        commit_temp(f, tmp, path, fsync)
+    except BaseException:
+        discard_temp(f, tmp)
+        raise
+
+
+def file_matches(path: str, size: int, sha256: str) -> bool:
+    """Whether path still holds the content with this size and hash."""
+    digest = hashlib.sha256()
+    try:
+        if os.path.getsize(path) != size:
+            return False
+        with open(path, "rb") as f:
+            while block := f.read(1024 * 1024):
+                digest.update(block)
+    except OSError:
+        return False
+    return digest.hexdigest() == sha256
+
+
+def link_atomic(source: str, path: str, fsync: bool = False) -> None:
+    """Make path a hardlink of source, replacing whatever path was.
+
+    Raises OSError if source is gone or the filesystem can't link.
+    """
+    if os.path.exists(path) and os.path.samefile(source, path):
+        return
+    directory = os.path.dirname(path)
+    # Link under a temporary name first, os.link doesn't overwrite
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.link")
+    os.link(source, tmp)
+    try:
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    if fsync:
+        _fsync_dir(directory)
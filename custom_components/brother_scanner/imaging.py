@@ -0,0 +1,170 @@
+import io
+import os
+from collections import OrderedDict
+from .files import write_atomic
+
+# Pillow is imported where it is used, so loading the integration doesn't
+# pay for it; __init__ warms it up in the background after setup.
+
+JPEG_QUALITY = 80
+# Thumbnails are cached on disk in this directory next to the scans
+THUMBS_DIR = ".thumbs"
+# JPEG end of image marker, lets the decoder finish a partial image
+JPEG_EOI = b"\xff\xd9"
+# Side of the grayscale thumbnail scans are compared by
+FINGERPRINT_SIZE = 32
+
+
+class ImageCache:
+    """LRU cache of rendered images, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: OrderedDict[tuple, bytes] = OrderedDict()
+
+    def get(self, key: tuple) -> bytes | None:
+        data = self._items.get(key)
+        if data is not None:
+            self._items.move_to_end(key)
+        return data
+
+    def put(self, key: tuple, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        self._pop(key)
+        self._items[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, old = self._items.popitem(last=False)
+            self.size -= len(old)
+
+    def invalidate(self, path: str) -> None:
+        """Drop every variant rendered from path (keys start with the path)."""
+        for key in [k for k in self._items if k[0] == path]:
+            self._pop(key)
+
+    def _pop(self, key: tuple) -> None:
+        if (old := self._items.pop(key, None)) is not None:
+            self.size -= len(old)
+
+
+def render_jpeg(data: bytes, width: int, height: int) -> bytes:
+    """Downscale a JPEG to fit in width x height, keeping the aspect ratio."""
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(data))
+    # Let the JPEG decoder skip detail we would throw away anyway
+    img.draft("RGB", (width, height))
+    img.thumbnail((width, height))
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=JPEG_QUALITY)
+    return buf.getvalue()
+
+
+class ProgressiveJpeg:
+    """Low resolution frames of a JPEG that is still being received.
+
+    ImageFile.Parser takes the chunks until the header is complete, which
+    tells when there is something to draw. Pillow doesn't decode JPEG
+    incrementally, so each frame decodes everything received so far with
+    an end marker appended; libjpeg fills in the missing rows with gray.
+    Draft mode makes the decoder scale down in the DCT, which keeps a frame
+    to a few tens of milliseconds even for a full page. Blocking, run it in
+    an executor.
+    """
+
+    def __init__(self, width: int, height: int):
+        from PIL import ImageFile
+
+        self._size = (width, height)
+        self._parser: ImageFile.Parser | None = ImageFile.Parser()
+        self.frames = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._parser is None
+
+    def feed(self, chunk: bytes) -> None:
+        if self._parser is None:
+            return
+        self._parser.feed(chunk)
+        if self._parser.image is not None:
+            # The parser would only buffer the rest, the caller has it
+            self._parser = None
+
+    def render(self, data: bytes | bytearray) -> bytes | None:
+        """Render the received part of the image, None if it can't be yet."""
+        from PIL import Image
+
+        if not self.ready:
+            return None
+        try:
+            img = Image.open(io.BytesIO(data + JPEG_EOI))
+            img.draft("RGB", self._size)
+            img.load()
+        except (OSError, SyntaxError, ValueError):
+            # Cut inside a marker, the next chunk will do
+            return None
+        img.thumbnail(self._size)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=JPEG_QUALITY)
+        self.frames += 1
+        return buf.getvalue()
+
+
+def image_fingerprint(data: bytes) -> bytes:
+    """Downsample a JPEG to a small grayscale square to compare scans by.
+
+    Averaging over large blocks hides scanner noise and small offsets in
+    the scan head position, while anything placed on the glass still
+    changes many pixels.
+    """
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(data))
+    img.draft("L", (FINGERPRINT_SIZE, FINGERPRINT_SIZE))
+    img = img.convert("L").resize((FINGERPRINT_SIZE, FINGERPRINT_SIZE), Image.BOX)
+    return img.tobytes()
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """1.0 for identical fingerprints, 0.0 for black against white."""
+    from PIL import Image, ImageChops, ImageStat
+
+    size = (FINGERPRINT_SIZE, FINGERPRINT_SIZE)
+    diff = ImageChops.difference(
+        Image.frombytes("L", size, a), Image.frombytes("L", size, b)
+    )
+    return round(1 - ImageStat.Stat(diff).mean[0] / 255, 4)
+
+
+def thumbnail_path(path: str) -> str:
+    directory, name = os.path.split(path)
+    return os.path.join(directory, THUMBS_DIR, name)
+
+
+def ensure_thumbnail(path: str, width: int, height: int) -> str:
+    """Return the path of the thumbnail of a JPEG scan, rendering it once.
+
+    Blocking, run it in an executor. A thumbnail older than its scan is
+    rendered again.
+    """
+    thumb = thumbnail_path(path)
+    scan_mtime = os.stat(path).st_mtime
+    try:
+        if os.stat(thumb).st_mtime >= scan_mtime:
+            return thumb
+    except FileNotFoundError:
+        pass
+
+    with open(path, "rb") as f:
+        data = render_jpeg(f.read(), width, height)
+    os.makedirs(os.path.dirname(thumb), exist_ok=True)
+    # Concurrent requests may render the same thumbnail, never serve half of it
+    write_atomic(thumb, data)
+    return thumb
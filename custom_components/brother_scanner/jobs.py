@@ -0,0 +1,142 @@
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(order=True)
+class ScanJob:
+    # Sort key: higher priority first, FIFO within a priority
+    sort_priority: int
+    seq: int
+    id: str = field(compare=False)
+    key: tuple = field(compare=False)
+    data: dict[str, Any] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued: float = field(compare=False)
+
+
+class ScanJobQueue:
+    """Bounded priority queue of scan jobs with one worker per device."""
+
+    def __init__(
+        self,
+        hass,
+        name: str,
+        handler: Callable[[dict[str, Any]], Awaitable[Any]],
+        maxsize: int,
+    ):
+        self._hass = hass
+        self._name = name
+        self._handler = handler
+        self._queue: asyncio.PriorityQueue[ScanJob] = asyncio.PriorityQueue(maxsize)
+        self._pending: dict[tuple, ScanJob] = {}
+        self._seq = itertools.count()
+        self._worker: asyncio.Task | None = None
+        self._listeners: list[Callable[[], None]] = []
+        self.current: ScanJob | None = None
+        self.processed = 0
+        self.last_wait: float | None = None
+        self.avg_wait: float | None = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        self._worker = self._hass.async_create_background_task(
+            self._async_run(), f"{self._name} worker"
+        )
+
+    async def async_stop(self) -> None:
+        """Stop the worker and fail jobs that never ran."""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for job in self._pending.values():
+            if not job.future.done():
+                job.future.set_exception(HomeAssistantError("Scan queue stopped"))
+        self._pending.clear()
+
+    @callback
+    def async_add_listener(self, update: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(update)
+        return lambda: self._listeners.remove(update)
+
+    @callback
+    def _notify(self) -> None:
+        for update in self._listeners:
+            update()
+
+    @callback
+    def enqueue(self, data: dict[str, Any], priority: int = 0) -> ScanJob:
+        """Queue a job, or return the pending one with identical data."""
+        key = tuple(sorted(data.items()))
+        if job := self._pending.get(key):
+            _LOGGER.debug(
+                "%s: merged duplicate request into job %s", self._name, job.id
+            )
+            return job
+
+        job = ScanJob(
+            sort_priority=-priority,
+            seq=next(self._seq),
+            id=uuid.uuid4().hex,
+            key=key,
+            data=data,
+            future=self._hass.loop.create_future(),
+            enqueued=time.monotonic(),
+        )
+        # Fire-and-forget callers never await the result; errors are logged
+        # by the handler already
+        job.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise HomeAssistantError(
+                f"Scan queue for {self._name} is full ({self._queue.maxsize} jobs)"
+            ) from None
+        self._pending[key] = job
+        self._notify()
+        return job
+
+    async def _async_run(self) -> None:
+        while True:
+            job = await self._queue.get()
+            self._pending.pop(job.key, None)
+            self.current = job
+            self.last_wait = time.monotonic() - job.enqueued
+            self.avg_wait = (
+                self.last_wait
+                if self.avg_wait is None
+                else 0.8 * self.avg_wait + 0.2 * self.last_wait
+            )
+            self._notify()
+            try:
+                result = await self._handler(job.data)
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                self.current = None
+                self.processed += 1
+                self._queue.task_done()
+                self._notify()
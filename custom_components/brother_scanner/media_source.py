@@ -0,0 +1,213 @@
+import datetime
+import mimetypes
+import os
+from aiohttp import hdrs, web
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.components.http.auth import async_sign_path
+from homeassistant.components.media_player import MediaClass, MediaType
+from homeassistant.components.media_source import (
+    BrowseMediaSource,
+    MediaSource,
+    MediaSourceItem,
+    PlayMedia,
+    Unresolvable,
+)
+from homeassistant.util import dt as dt_util
+from .archive import ArchiveEntry
+from .const import (
+    DOMAIN,
+    MANUFACTURER,
+    MEDIA_PAGE_SIZE,
+    MEDIA_URL_EXPIRATION,
+    THUMBNAIL_SIZE,
+)
+from .imaging import ensure_thumbnail
+
+# Identifiers: "<entry_id>[/page/<n>]" for folders, "<entry_id>/scan/<id>"
+# for scans, where id is the archive timestamp of the scan
+
+
+async def async_get_media_source(hass) -> "BrotherScannerMediaSource":
+    return BrotherScannerMediaSource(hass)
+
+
+def _scan_id(entry: ArchiveEntry) -> str:
+    return repr(entry.timestamp)
+
+
+def _mime_type(entry: ArchiveEntry) -> str:
+    return mimetypes.guess_type(entry.path)[0] or "application/octet-stream"
+
+
+def _is_image(entry: ArchiveEntry) -> bool:
+    return _mime_type(entry) == "image/jpeg"
+
+
+def _signed_url(hass, kind: str, entry_id: str, entry: ArchiveEntry) -> str:
+    return async_sign_path(
+        hass,
+        f"/api/{DOMAIN}/{kind}/{entry_id}/{_scan_id(entry)}",
+        datetime.timedelta(seconds=MEDIA_URL_EXPIRATION),
+    )
+
+
+def _find_scan(hass, entry_id: str, scan_id: str) -> ArchiveEntry | None:
+    device_data = hass.data.get(DOMAIN, {}).get(entry_id)
+    if not device_data:
+        return None
+    try:
+        timestamp = float(scan_id)
+    except ValueError:
+        return None
+    return device_data["archive"].get(timestamp)
+
+
+class BrotherScannerMediaSource(MediaSource):
+    """Browse the scan archive of each scanner, newest first."""
+
+    name = f"{MANUFACTURER} Scanner"
+
+    def __init__(self, hass):
+        super().__init__(DOMAIN)
+        self.hass = hass
+
+    async def async_resolve_media(self, item: MediaSourceItem) -> PlayMedia:
+        entry_id, _, scan_id = (item.identifier or "").partition("/scan/")
+        if not (scan := _find_scan(self.hass, entry_id, scan_id)):
+            raise Unresolvable(f"Unknown scan {item.identifier}")
+        return PlayMedia(
+            _signed_url(self.hass, "scans", entry_id, scan), _mime_type(scan)
+        )
+
+    async def async_browse_media(self, item: MediaSourceItem) -> BrowseMediaSource:
+        if not item.identifier:
+            return self._browse_root()
+
+        entry_id, _, page = item.identifier.partition("/page/")
+        device_data = self.hass.data.get(DOMAIN, {}).get(entry_id)
+        if not device_data or (page and not page.isdigit()):
+            raise Unresolvable(f"Unknown folder {item.identifier}")
+        return self._browse_device(entry_id, device_data, int(page or 0))
+
+    def _browse_root(self) -> BrowseMediaSource:
+        return BrowseMediaSource(
+            domain=DOMAIN,
+            identifier=None,
+            media_class=MediaClass.DIRECTORY,
+            media_content_type=MediaType.IMAGE,
+            title=self.name,
+            can_play=False,
+            can_expand=True,
+            children_media_class=MediaClass.DIRECTORY,
+            children=[
+                BrowseMediaSource(
+                    domain=DOMAIN,
+                    identifier=entry_id,
+                    media_class=MediaClass.DIRECTORY,
+                    media_content_type=MediaType.IMAGE,
+                    title=device_data["entry"].title,
+                    can_play=False,
+                    can_expand=True,
+                )
+                for entry_id, device_data in self.hass.data.get(DOMAIN, {}).items()
+            ],
+        )
+
+    def _browse_device(self, entry_id, device_data, page: int) -> BrowseMediaSource:
+        archive = device_data["archive"]
+        offset = page * MEDIA_PAGE_SIZE
+        children = [
+            self._browse_scan(entry_id, scan)
+            for scan in archive.recent(MEDIA_PAGE_SIZE, offset)
+        ]
+        if offset + MEDIA_PAGE_SIZE < len(archive):
+            children.append(
+                BrowseMediaSource(
+                    domain=DOMAIN,
+                    identifier=f"{entry_id}/page/{page + 1}",
+                    media_class=MediaClass.DIRECTORY,
+                    media_content_type=MediaType.IMAGE,
+                    title="Older scans",
+                    can_play=False,
+                    can_expand=True,
+                )
+            )
+        title = device_data["entry"].title
+        return BrowseMediaSource(
+            domain=DOMAIN,
+            identifier=f"{entry_id}/page/{page}" if page else entry_id,
+            media_class=MediaClass.DIRECTORY,
+            media_content_type=MediaType.IMAGE,
+            title=f"{title} (page {page + 1})" if page else title,
+            can_play=False,
+            can_expand=True,
+            children_media_class=MediaClass.IMAGE,
+            children=children,
+        )
+
+    def _browse_scan(self, entry_id: str, scan: ArchiveEntry) -> BrowseMediaSource:
+        saved = dt_util.as_local(dt_util.utc_from_timestamp(scan.timestamp))
+        title = saved.strftime("%Y-%m-%d %H:%M:%S")
+        if scan.pages > 1:
+            title += f" ({scan.pages} pages)"
+        image = _is_image(scan)
+        return BrowseMediaSource(
+            domain=DOMAIN,
+            identifier=f"{entry_id}/scan/{_scan_id(scan)}",
+            media_class=MediaClass.IMAGE if image else MediaClass.APP,
+            media_content_type=_mime_type(scan),
+            title=title,
+            can_play=True,
+            can_expand=False,
+            thumbnail=(
+                _signed_url(self.hass, "thumbnails", entry_id, scan) if image else None
+            ),
+        )
+
+
+class BrotherScannerScanView(HomeAssistantView):
+    """Serve archived scans and their thumbnails to authenticated users.
+
+    Files are sent with FileResponse, which handles ETag, Last-Modified and
+    Range requests. Thumbnails are rendered on first request and then
+    served from disk.
+    """
+
+    url = "/api/brother_scanner/{kind:scans|thumbnails}/{entry_id}/{scan_id}"
+    name = "api:brother_scanner:scans"
+
+    def __init__(self, hass):
+        self._hass = hass
+
+    async def get(
+        self, request: web.Request, kind: str, entry_id: str, scan_id: str
+    ) -> web.StreamResponse:
+        scan = _find_scan(self._hass, entry_id, scan_id)
+        if not scan:
+            raise web.HTTPNotFound()
+
+        path = scan.path
+        if kind == "thumbnails":
+            if not _is_image(scan):
+                raise web.HTTPNotFound()
+            try:
+                path = await self._hass.async_add_executor_job(
+                    ensure_thumbnail, scan.path, *THUMBNAIL_SIZE
+                )
+            except FileNotFoundError:
+                raise web.HTTPNotFound() from None
+            except OSError as e:
+                raise web.HTTPInternalServerError(
+                    reason=f"Failed to render thumbnail: {e}"
+                ) from None
+        elif not await self._hass.async_add_executor_job(os.path.isfile, path):
+            raise web.HTTPNotFound()
+
+        return web.FileResponse(
+            path,
+            headers={
+                hdrs.CONTENT_TYPE: _mime_type(scan),
+                # Signed URLs change, the files behind them don't
+                hdrs.CACHE_CONTROL: f"private, max-age={MEDIA_URL_EXPIRATION}",
+            },
+        )
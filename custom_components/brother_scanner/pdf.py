@@ -0,0 +1,183 @@
+import hashlib
+from typing import BinaryIO
+
+DEFAULT_DPI = 300
+
+# SOFn markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) do not
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB}
+_SOF_MARKERS |= {0xCD, 0xCE, 0xCF}
+_COLOR_SPACES = {1: b"/DeviceGray", 3: b"/DeviceRGB", 4: b"/DeviceCMYK"}
+
+
+def _exif_dpi(tiff: bytes) -> int | None:
+    """XResolution in dots per inch from the TIFF block of an Exif segment."""
+    order = {b"II": "little", b"MM": "big"}.get(tiff[:2])
+    if order is None:
+        return None
+
+    def num(pos: int, size: int) -> int:
+        return int.from_bytes(tiff[pos : pos + size], order)
+
+    ifd = num(4, 4)
+    resolution = None
+    unit = 2
+    for i in range(num(ifd, 2)):
+        entry = ifd + 2 + 12 * i
+        if entry + 12 > len(tiff):
+            break
+        tag = num(entry, 2)
+        if tag == 0x011A:
+            # A RATIONAL, stored at the offset in the value field
+            offset = num(entry + 8, 4)
+            numerator, denominator = num(offset, 4), num(offset + 4, 4)
+            if denominator:
+                resolution = numerator / denominator
+        elif tag == 0x0128:
+            unit = num(entry + 8, 2)
+    if not resolution:
+        return None
+    if unit == 3:
+        return round(resolution * 2.54)
+    return round(resolution)
+
+
+def jpeg_info(
+    data: bytes, default_dpi: int = DEFAULT_DPI
+) -> tuple[int, int, int, int]:
+    """Return (width, height, components, dpi) from the JPEG headers.
+
+    The resolution comes from a JFIF or Exif segment, default_dpi if there
+    is neither.
+    """
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("Not a JPEG image")
+    dpi = None
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            raise ValueError("Corrupt JPEG marker")
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        length = int.from_bytes(data[pos + 2 : pos + 4], "big")
+        segment = data[pos + 4 : pos + 2 + length]
+        if marker == 0xE0 and segment[:5] == b"JFIF\x00":
+            units = segment[7]
+            xdensity = int.from_bytes(segment[8:10], "big")
+            if units == 1 and xdensity:
+                dpi = xdensity
+            elif units == 2 and xdensity:
+                dpi = round(xdensity * 2.54)
+        elif marker == 0xE1 and segment[:6] == b"Exif\x00\x00" and dpi is None:
+            dpi = _exif_dpi(segment[6:])
+        elif marker in _SOF_MARKERS:
+            height = int.from_bytes(segment[1:3], "big")
+            width = int.from_bytes(segment[3:5], "big")
+            return width, height, segment[5], dpi or default_dpi
+        pos += 2 + length
+    raise ValueError("JPEG frame header not found")
+
+
+class StreamingPdfWriter:
+    """Write a PDF one JPEG page at a time.
+
+    Each page is embedded as-is (DCTDecode) and written out immediately;
+    only the object offsets are kept until close() writes the page tree,
+    cross-reference table and trailer. Blocking, run it in an executor.
+    """
+
+    # Objects 1 and 2 are the catalog and the page tree, written last
+    _CATALOG = 1
+    _PAGES = 2
+
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        self._offsets: dict[int, int] = {}
+        self._pages: list[int] = []
+        self._next_obj = 3
+        self._pos = 0
+        self._sha256 = hashlib.sha256()
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pages)
+
+    @property
+    def size(self) -> int:
+        return self._pos
+
+    @property
+    def sha256(self) -> str:
+        """Hex digest of everything written so far."""
+        return self._sha256.hexdigest()
+
+    def _write(self, data: bytes) -> None:
+        self._f.write(data)
+        self._sha256.update(data)
+        self._pos += len(data)
+
+    def _object(self, num: int, body: bytes, stream: bytes | None = None) -> None:
+        self._offsets[num] = self._pos
+        self._write(b"%d 0 obj\n" % num + body)
+        if stream is not None:
+            self._write(b"\nstream\n")
+            self._write(stream)
+            self._write(b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def _alloc(self) -> int:
+        num = self._next_obj
+        self._next_obj += 1
+        return num
+
+    def add_jpeg_page(self, data: bytes, dpi: int | None = None) -> None:
+        """Add a page; dpi is the resolution if the JPEG doesn't say."""
+        width, height, components, dpi = jpeg_info(data, dpi or DEFAULT_DPI)
+        color_space = _COLOR_SPACES.get(components, b"/DeviceRGB")
+        # Page size in points from the scan resolution
+        page_w = width * 72 / dpi
+        page_h = height * 72 / dpi
+
+        image, content, page = self._alloc(), self._alloc(), self._alloc()
+        self._object(
+            image,
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+            b"/ColorSpace %s /BitsPerComponent 8 /Filter /DCTDecode "
+            b"/Length %d >>" % (width, height, color_space, len(data)),
+            data,
+        )
+        draw = b"q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q" % (page_w, page_h)
+        self._object(content, b"<< /Length %d >>" % len(draw), draw)
+        self._object(
+            page,
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] "
+            b"/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>"
+            % (self._PAGES, page_w, page_h, image, content),
+        )
+        self._pages.append(page)
+        self._f.flush()
+
+    def close(self) -> None:
+        """Write the page tree, xref and trailer. Does not close the file."""
+        kids = b" ".join(b"%d 0 R" % p for p in self._pages)
+        self._object(
+            self._PAGES,
+            b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._pages)),
+        )
+        self._object(
+            self._CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % self._PAGES
+        )
+
+        xref = self._pos
+        size = self._next_obj
+        lines = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        for num in range(1, size):
+            lines.append(b"%010d 00000 n \n" % self._offsets[num])
+        self._write(b"".join(lines))
+        self._write(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (size, self._CATALOG, xref)
+        )
+        self._f.flush()
@@ -0,0 +1,171 @@
+import hashlib
+import io
+import time
+from PIL import Image, ImageFilter, ImageStat
+from .processing import DEFAULT_QUALITY, PipelineSettings, ProcessResult
+
+# The stages of the processing pipeline. Imported in the background once
+# Home Assistant has started, so Pillow stays out of setup.
+
+# Pixels darker than this count as ink
+INK_THRESHOLD = 160
+# Analysis runs on a copy downscaled to fit in this many pixels
+ANALYSIS_SIZE = 800
+# A page with less ink than this (fraction of pixels) is blank
+BLANK_INK_RATIO = 0.003
+# Deskew search range and steps in degrees
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_COARSE_STEP = 0.5
+DESKEW_FINE_STEP = 0.1
+# Crop margin around the content, fraction of the longer side
+CROP_MARGIN = 0.01
+# Lowest JPEG quality tried to reach the target size
+MIN_QUALITY = 20
+
+
+def _analysis_copy(gray: Image.Image) -> Image.Image:
+    small = gray.copy()
+    small.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+    # Drop dust and scanner noise so single pixels don't count as content
+    return small.filter(ImageFilter.MedianFilter(3))
+
+
+def _ink(small: Image.Image) -> Image.Image:
+    """Ink as white on black, so rotating fills the corners with "no ink"."""
+    return small.point(lambda p: 255 if p < INK_THRESHOLD else 0)
+
+
+def is_blank(small: Image.Image) -> bool:
+    histogram = small.histogram()
+    ink = sum(histogram[:INK_THRESHOLD])
+    return ink / (small.width * small.height) < BLANK_INK_RATIO
+
+
+def skew_angle(small: Image.Image) -> float:
+    """Estimate the rotation that makes the text lines horizontal.
+
+    Projection profile: rows of a straight page alternate between text and
+    gap, so the variance of the row averages peaks at the right angle.
+    Resizing to one column with a box filter gives those averages.
+    """
+    ink = _ink(small)
+
+    def score(angle: float) -> float:
+        rotated = ink.rotate(angle, resample=Image.BILINEAR)
+        rows = rotated.resize((1, rotated.height), Image.BOX)
+        return ImageStat.Stat(rows).var[0]
+
+    def search(center: float, span: float, step: float) -> float:
+        count = round(span / step)
+        angles = [center + i * step for i in range(-count, count + 1)]
+        return max(angles, key=lambda a: (score(a), -abs(a)))
+
+    angle = search(0.0, DESKEW_MAX_ANGLE, DESKEW_COARSE_STEP)
+    angle = search(angle, DESKEW_COARSE_STEP, DESKEW_FINE_STEP)
+    return round(angle, 2)
+
+
+def content_box(small: Image.Image, size: tuple[int, int]) -> tuple | None:
+    """Bounding box of the content in a full size image, with a margin."""
+    box = _ink(small).getbbox()
+    if not box:
+        return None
+    scale = size[0] / small.width
+    margin = round(CROP_MARGIN * max(size))
+    left, top, right, bottom = (round(v * scale) for v in box)
+    return (
+        max(left - margin, 0),
+        max(top - margin, 0),
+        min(right + margin, size[0]),
+        min(bottom + margin, size[1]),
+    )
+
+
+def _save(img: Image.Image, quality: int, dpi) -> bytes:
+    buf = io.BytesIO()
+    options = {"dpi": dpi} if dpi else {}
+    img.save(buf, format="JPEG", quality=quality, optimize=True, **options)
+    return buf.getvalue()
+
+
+def encode_jpeg(
+    img: Image.Image, quality: int, max_bytes: int = 0, dpi=None
+) -> bytes:
+    """Encode at quality, lowering it as little as needed to fit max_bytes."""
+    data = _save(img, quality, dpi)
+    if not max_bytes or len(data) <= max_bytes:
+        return data
+    # Binary search the highest quality that fits; if none does, the
+    # smallest attempt is the best there is
+    lo, hi = MIN_QUALITY, quality - 1
+    best = None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        attempt = _save(img, mid, dpi)
+        if len(attempt) <= max_bytes:
+            best, lo = attempt, mid + 1
+        else:
+            hi = mid - 1
+    return best or _save(img, MIN_QUALITY, dpi)
+
+
+def process_jpeg(data: bytes, settings: PipelineSettings) -> ProcessResult:
+    """Run the enabled stages on one scanned page.
+
+    Runs in a processing thread. The image is decoded and encoded once
+    however many stages are enabled.
+    """
+    timings = {}
+    stages = set(settings.stages)
+    start = time.perf_counter()
+
+    def stage(name):
+        nonlocal start
+        now = time.perf_counter()
+        timings[name] = now - start
+        start = now
+
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    dpi = img.info.get("dpi")
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    small = _analysis_copy(img if img.mode == "L" else img.convert("L"))
+    stage("decode")
+    changed = False
+    blank = None
+
+    if "blank" in stages:
+        blank = is_blank(small)
+        stage("blank")
+    if "deskew" in stages and not blank:
+        if angle := skew_angle(small):
+            fill = 255 if img.mode == "L" else (255, 255, 255)
+            img = img.rotate(
+                angle, resample=Image.BICUBIC, expand=True, fillcolor=fill
+            )
+            small = _analysis_copy(img if img.mode == "L" else img.convert("L"))
+            changed = True
+        stage("deskew")
+    if "crop" in stages and not blank:
+        box = content_box(small, img.size)
+        if box and box != (0, 0, *img.size):
+            img = img.crop(box)
+            changed = True
+        stage("crop")
+    if "grayscale" in stages and img.mode != "L":
+        img = img.convert("L")
+        changed = True
+        stage("grayscale")
+
+    recompress = "recompress" in stages
+    if not (changed or recompress):
+        return ProcessResult(None, None, blank, *img.size, timings)
+    if recompress:
+        output = encode_jpeg(img, settings.quality, settings.max_bytes, dpi)
+    else:
+        output = encode_jpeg(img, DEFAULT_QUALITY, dpi=dpi)
+    stage("recompress" if recompress else "encode")
+    return ProcessResult(
+        output, hashlib.sha256(output).hexdigest(), blank, *img.size, timings
+    )
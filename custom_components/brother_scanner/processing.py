@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from .const import DOMAIN, PROCESSING_TIMEOUT, PROCESSING_WORKERS
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_PROCESSOR = f"{DOMAIN}_processor"
+
+# Pipeline stages, always run in this order. Blank detection looks at the
+# page as scanned, cropping comes after deskewing so it also removes the
+# corners the rotation fills in.
+STAGES = ("blank", "deskew", "crop", "grayscale", "recompress")
+
+DEFAULT_QUALITY = 85
+
+
+@dataclass(frozen=True)
+class PipelineSettings:
+    stages: tuple[str, ...]
+    quality: int = DEFAULT_QUALITY
+    # 0 means no size limit
+    max_bytes: int = 0
+
+
+@dataclass(frozen=True)
+class ProcessResult:
+    # None if no stage changed the image, the scan is kept as it came
+    data: bytes | None
+    sha256: str | None
+    # None unless the blank stage ran
+    blank: bool | None
+    width: int
+    height: int
+    # Seconds per stage, plus decode and encode
+    timings: dict[str, float]
+
+
+def _process_jpeg(data: bytes, settings: PipelineSettings) -> ProcessResult:
+    # The pipeline imports Pillow at module level, so it is imported here in
+    # the worker and never on the event loop; after the warm up this is only
+    # a lookup
+    from .pipeline import process_jpeg
+
+    return process_jpeg(data, settings)
+
+
+def async_get_processor(hass) -> "ScanProcessor":
+    """Return the processor shared by every entry."""
+    if (processor := hass.data.get(DATA_PROCESSOR)) is None:
+        processor = hass.data[DATA_PROCESSOR] = ScanProcessor(hass)
+    return processor
+
+
+class ScanProcessor:
+    """Runs processing pipelines in a small thread pool of its own.
+
+    Pillow releases the GIL while it decodes, resizes and rotates, which
+    is most of a page's time, so threads run the stages alongside the
+    event loop. Encoding a JPEG holds it, one output block at a time.
+    Worker processes would have to import Home Assistant again, through
+    this package's __init__, to unpickle the pipeline. The pool is
+    bounded to PROCESSING_WORKERS threads for all scanners together and
+    kept apart from Home Assistant's executor, which long scans would
+    otherwise tie up.
+    """
+
+    def __init__(self, hass):
+        self._hass = hass
+        self._pool: ThreadPoolExecutor | None = None
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_stop)
+
+    async def _async_stop(self, _event=None) -> None:
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                PROCESSING_WORKERS, thread_name_prefix=f"{DOMAIN}_processing"
+            )
+        return self._pool
+
+    async def async_process(
+        self, data: bytes, settings: PipelineSettings
+    ) -> ProcessResult:
+        """Process one page; raises if the pipeline fails or times out.
+
+        A timed out page can't be interrupted and finishes in the
+        background.
+        """
+        future = self._hass.loop.run_in_executor(
+            self._get_pool(), _process_jpeg, data, settings
+        )
+        return await asyncio.wait_for(future, PROCESSING_TIMEOUT)
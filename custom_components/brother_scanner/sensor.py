@@ -0,0 +1,183 @@
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from .device import get_device_info, get_model
+from .const import DOMAIN
+from .stats import PHASES
+
+
+async def async_setup_entry(hass, entry, async_add_entities):
+    device_data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = device_data["coordinator"]
+    async_add_entities(
+        [
+            BrotherScannerStateSensor(coordinator, entry),
+            BrotherScannerConditionSensor(coordinator, entry),
+            BrotherScannerQueueSensor(device_data["queue"], entry),
+            BrotherScannerThroughputSensor(device_data["stats"], entry),
+            *(
+                BrotherScannerTimingSensor(device_data["stats"], entry, key)
+                for key in (*PHASES, "total")
+            ),
+        ]
+    )
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 2) if value is not None else None
+
+
+class BrotherScannerSensor(CoordinatorEntity, SensorEntity):
+
+    _attr_has_entity_name = True
+
+    def __init__(self, coordinator, entry, key: str, name: str, icon: str):
+        super().__init__(coordinator)
+        self._ip = entry.data["ip"]
+        self._entry_id = entry.entry_id
+        self._attr_icon = icon
+        self._attr_name = name
+        self._attr_unique_id = f"{self._entry_id}_{key}"
+        self._attr_device_info = get_device_info(
+            self._entry_id, self._ip, get_model(entry)
+        )
+
+
+class BrotherScannerStateSensor(BrotherScannerSensor):
+    """Scanner state as reported by GetScannerElements."""
+
+    def __init__(self, coordinator, entry):
+        super().__init__(coordinator, entry, "state", "State", "mdi:scanner")
+
+    @property
+    def native_value(self):
+        return self.coordinator.data.state if self.coordinator.data else None
+
+    @property
+    def extra_state_attributes(self):
+        if not self.coordinator.data:
+            return None
+        return {"state_reasons": list(self.coordinator.data.state_reasons)}
+
+
+class BrotherScannerConditionSensor(BrotherScannerSensor):
+    """Active device conditions, e.g. a cover left open."""
+
+    def __init__(self, coordinator, entry):
+        super().__init__(
+            coordinator, entry, "condition", "Condition", "mdi:alert-circle-outline"
+        )
+
+    @property
+    def native_value(self):
+        if not self.coordinator.data:
+            return None
+        conditions = self.coordinator.data.active_conditions
+        return conditions[0] if conditions else "None"
+
+    @property
+    def extra_state_attributes(self):
+        if not self.coordinator.data:
+            return None
+        return {"active_conditions": list(self.coordinator.data.active_conditions)}
+
+
+class BrotherScannerQueueSensor(SensorEntity):
+    """Number of scan jobs waiting for this device."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(self, queue, entry):
+        self._queue = queue
+        self._ip = entry.data["ip"]
+        self._entry_id = entry.entry_id
+        self._attr_icon = "mdi:tray-full"
+        self._attr_name = "Queue"
+        self._attr_native_unit_of_measurement = "jobs"
+        self._attr_unique_id = f"{self._entry_id}_queue"
+        self._attr_device_info = get_device_info(
+            self._entry_id, self._ip, get_model(entry)
+        )
+
+    async def async_added_to_hass(self):
+        self.async_on_remove(self._queue.async_add_listener(self._handle_update))
+
+    @callback
+    def _handle_update(self):
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self):
+        return self._queue.depth
+
+    @property
+    def extra_state_attributes(self):
+        queue = self._queue
+        return {
+            "running_job": queue.current.id if queue.current else None,
+            "processed": queue.processed,
+            "last_wait": _round(queue.last_wait),
+            "avg_wait": _round(queue.avg_wait),
+        }
+
+
+class BrotherScannerStatsSensor(SensorEntity):
+    """Last value of a scan statistic, with avg/p95 as attributes."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, stats, entry, key: str, name: str):
+        self._stats = stats
+        self._key = key
+        self._ip = entry.data["ip"]
+        self._entry_id = entry.entry_id
+        self._attr_icon = "mdi:timer-outline"
+        self._attr_name = name
+        self._attr_unique_id = f"{self._entry_id}_timing_{key}"
+        self._attr_device_info = get_device_info(
+            self._entry_id, self._ip, get_model(entry)
+        )
+
+    async def async_added_to_hass(self):
+        self.async_on_remove(self._stats.async_add_listener(self._handle_update))
+
+    @callback
+    def _handle_update(self):
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self):
+        summary = self._stats.summary(self._key)
+        return summary["last"] if summary else None
+
+    @property
+    def extra_state_attributes(self):
+        return self._stats.summary(self._key)
+
+
+class BrotherScannerTimingSensor(BrotherScannerStatsSensor):
+    """Duration of one scan phase, or of the whole scan for "total"."""
+
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+
+    def __init__(self, stats, entry, key: str):
+        name = "Scan time" if key == "total" else f"Scan {key.replace('_', ' ')} time"
+        super().__init__(stats, entry, key, name)
+        # Only the overall time is interesting day to day
+        self._attr_entity_registry_enabled_default = key == "total"
+
+
+class BrotherScannerThroughputSensor(BrotherScannerStatsSensor):
+    """Transfer rate of the image data."""
+
+    _attr_native_unit_of_measurement = "B/s"
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, stats, entry):
+        super().__init__(stats, entry, "throughput", "Scan throughput")
+        self._attr_icon = "mdi:speedometer"
@@ -0,0 +1,103 @@
+import time
+from collections import deque
+from collections.abc import Callable
+from contextlib import contextmanager
+
+# Phases of one scan, in order:
+#   status      GetScannerElements idle check (absent when the cache was used)
+#   create_job  CreateScanJob round trip
+#   scan        RetrieveImage request until the device starts answering
+#   transfer    receiving and parsing the MTOM reply
+#   process     the post-scan pipeline, per stage as process_<stage>
+#   save        writing the file and rendering the preview
+PHASES = ("status", "create_job", "scan", "transfer", "process", "save")
+STATS_HISTORY = 50
+
+
+class ScanTrace:
+    """Per-phase timings and byte count of a single scan job."""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.end: float | None = None
+        self.phases: dict[str, float] = {}
+        self.bytes = 0
+
+    def add(self, phase: str, seconds: float) -> None:
+        # Phases repeat for multi-page jobs, so durations accumulate
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, phase: str):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(phase, time.monotonic() - start)
+
+    def finish(self) -> None:
+        self.end = time.monotonic()
+
+    @property
+    def total(self) -> float:
+        return (self.end or time.monotonic()) - self.start
+
+    @property
+    def throughput(self) -> float | None:
+        """Bytes per second while transferring."""
+        transfer = self.phases.get("transfer")
+        return self.bytes / transfer if transfer else None
+
+    def as_dict(self) -> dict:
+        throughput = self.throughput
+        return {
+            "phases": {k: round(v, 4) for k, v in self.phases.items()},
+            "total": round(self.total, 4),
+            "bytes": self.bytes,
+            "throughput": round(throughput) if throughput is not None else None,
+        }
+
+
+def _p95(values: list[float]) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+
+class ScanStats:
+    """Rolling statistics over the last finished scans of a device."""
+
+    def __init__(self, maxlen: int = STATS_HISTORY):
+        self.traces: deque[dict] = deque(maxlen=maxlen)
+        self._listeners: list[Callable[[], None]] = []
+
+    def async_add_listener(self, update: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(update)
+        return lambda: self._listeners.remove(update)
+
+    def add(self, trace: ScanTrace) -> None:
+        self.traces.append(trace.as_dict())
+        for update in self._listeners:
+            update()
+
+    def summary(self, key: str) -> dict | None:
+        """Return last/avg/p95 of a phase, "total" or "throughput"."""
+        values = []
+        for trace in self.traces:
+            value = trace["phases"].get(key) if key in PHASES else trace.get(key)
+            if value is not None:
+                values.append(value)
+        if not values:
+            return None
+        return {
+            "last": values[-1],
+            "avg": round(sum(values) / len(values), 4),
+            "p95": _p95(values),
+            "count": len(values),
+        }
+
+    def as_dict(self) -> dict:
+        keys = (*PHASES, "total", "throughput")
+        return {
+            "summary": {key: self.summary(key) for key in keys},
+            "recent": list(self.traces),
+        }
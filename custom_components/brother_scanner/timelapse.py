@@ -0,0 +1,95 @@
+import datetime
+import logging
+from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+from .const import (
+    CONF_TIMELAPSE_INTERVAL,
+    CONF_TIMELAPSE_THRESHOLD,
+    CONF_TIMELAPSE_QUIET_START,
+    CONF_TIMELAPSE_QUIET_END,
+    DEFAULT_TIMELAPSE_THRESHOLD,
+    DEFAULT_QUIET_TIME,
+    TIMELAPSE_PRIORITY,
+)
+from .imaging import similarity
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def in_quiet_hours(
+    now: datetime.time, start: datetime.time, end: datetime.time
+) -> bool:
+    if start == end:
+        return False
+    if start < end:
+        return start <= now < end
+    # Quiet over midnight
+    return now >= start or now < end
+
+
+class TimelapseScheduler:
+    """Queue a change detection scan of one device at a fixed interval.
+
+    Only the queueing happens here; the queue worker runs the preview and
+    decides on the full scan. The fingerprint of the preview behind the
+    last stored scan is only kept in memory, so the first scan after a
+    restart is always stored.
+    """
+
+    def __init__(self, hass, entry, queue):
+        self._hass = hass
+        self._entry = entry
+        self._queue = queue
+        self._unsub = None
+        self.last_fingerprint: bytes | None = None
+
+    @property
+    def threshold(self) -> float:
+        """Least difference, as a fraction, that counts as a change."""
+        options = self._entry.options
+        return options.get(CONF_TIMELAPSE_THRESHOLD, DEFAULT_TIMELAPSE_THRESHOLD) / 100
+
+    @callback
+    def async_schedule(self) -> None:
+        """(Re)start the timer from the current options."""
+        self.async_stop()
+        if minutes := self._entry.options.get(CONF_TIMELAPSE_INTERVAL, 0):
+            self._unsub = async_track_time_interval(
+                self._hass, self._async_tick, datetime.timedelta(minutes=minutes)
+            )
+
+    @callback
+    def async_stop(self) -> None:
+        if self._unsub:
+            self._unsub()
+            self._unsub = None
+
+    def _quiet(self) -> bool:
+        options = self._entry.options
+        start, end = (
+            dt_util.parse_time(options.get(key, DEFAULT_QUIET_TIME))
+            for key in (CONF_TIMELAPSE_QUIET_START, CONF_TIMELAPSE_QUIET_END)
+        )
+        return in_quiet_hours(dt_util.now().time(), start, end)
+
+    @callback
+    def _async_tick(self, _now) -> None:
+        if self._quiet():
+            return
+        # A tick still waiting in the queue is merged with this one
+        try:
+            self._queue.enqueue({"timelapse": True}, TIMELAPSE_PRIORITY)
+        except HomeAssistantError as e:
+            _LOGGER.warning("Skipped timelapse scan: %s", e)
+
+    def changed(self, fingerprint: bytes) -> tuple[bool, float | None]:
+        """Compare a preview with the last stored one, return (changed, score).
+
+        Blocking, run it in an executor.
+        """
+        if self.last_fingerprint is None:
+            return True, None
+        score = similarity(self.last_fingerprint, fingerprint)
+        return 1 - score >= self.threshold, score
@@ -0,0 +1,533 @@
+from dataclasses import dataclass
+import re
+import xml.etree.ElementTree as ET
+
+SOAP_NS = "http://www.w3.org/2003/05/soap-envelope"
+WSA_NS = "http://schemas.xmlsoap.org/ws/2004/08/addressing"
+SCAN_NS = "http://schemas.microsoft.com/windows/2006/08/wdp/scan"
+
+_FIELD_RE = re.compile(r"\{(\w+)\}")
+# Bytes handed to the XML parser at a time
+PARSE_CHUNK_SIZE = 16 * 1024
+
+
+class Envelope:
+    """SOAP envelope pre-encoded to UTF-8 byte segments.
+
+    The template is split once at its {placeholders}; rendering only joins
+    the constant segments with the encoded values.
+    """
+
+    def __init__(self, template: str, **fixed: str):
+        parts = _FIELD_RE.split(template)
+        self._segments = [p.encode("utf-8") for p in parts[0::2]]
+        self._fields = parts[1::2]
+        self._fixed = fixed
+        if fixed:
+            self._bake()
+
+    def _bake(self) -> None:
+        # Merge fixed values into the neighbouring constant segments
+        segments = [self._segments[0]]
+        fields = []
+        for name, segment in zip(self._fields, self._segments[1:]):
+            if name in self._fixed:
+                segments[-1] += self._fixed[name].encode("utf-8") + segment
+            else:
+                fields.append(name)
+                segments.append(segment)
+        self._segments = segments
+        self._fields = fields
+
+    def bind(self, **fixed: str) -> "Envelope":
+        """Return a copy with some placeholders filled in for good."""
+        env = Envelope.__new__(Envelope)
+        env._segments = list(self._segments)
+        env._fields = list(self._fields)
+        env._fixed = fixed
+        env._bake()
+        return env
+
+    def render(self, **values: str) -> bytes:
+        out = [self._segments[0]]
+        for name, segment in zip(self._fields, self._segments[1:]):
+            out.append(values[name].encode("utf-8"))
+            out.append(segment)
+        return b"".join(out)
+
+
+# --- Scan ticket ---
+@dataclass(frozen=True)
+class ScanTicket:
+    """DocumentParameters of a CreateScanJob request.
+
+    Fields left at None are not sent, so the device picks its default.
+    Lengths are in thousandths of an inch, as in WS-Scan.
+    """
+
+    format: str = "exif"
+    # "Platen", "ADF" or "ADFDuplex"
+    input_source: str | None = None
+    # 0 means every page in the feeder
+    images_to_transfer: int | None = None
+    # Dots per inch, same in both directions
+    resolution: int | None = None
+    # "BlackAndWhite1", "Grayscale8" or "RGB24"
+    color_mode: str | None = None
+    # (x offset, y offset, width, height)
+    region: tuple[int, int, int, int] | None = None
+    # 0-100, higher is better quality
+    compression_quality: int | None = None
+
+    def to_xml(self) -> str:
+        indent = " " * 10
+        lines = [
+            f'{indent}<sca:Format sca:MustHonor="true">{self.format}</sca:Format>'
+        ]
+        if self.compression_quality is not None:
+            lines.append(
+                f"{indent}<sca:CompressionQualityFactor sca:MustHonor=\"true\">"
+                f"{self.compression_quality}</sca:CompressionQualityFactor>"
+            )
+        if self.images_to_transfer is not None:
+            lines.append(
+                f"{indent}<sca:ImagesToTransfer>{self.images_to_transfer}"
+                "</sca:ImagesToTransfer>"
+            )
+        if self.input_source:
+            lines.append(
+                f'{indent}<sca:InputSource sca:MustHonor="true">{self.input_source}'
+                "</sca:InputSource>"
+            )
+        front = []
+        if self.region:
+            x, y, width, height = self.region
+            front += [
+                "<sca:ScanRegion>",
+                f"  <sca:ScanRegionXOffset>{x}</sca:ScanRegionXOffset>",
+                f"  <sca:ScanRegionYOffset>{y}</sca:ScanRegionYOffset>",
+                f"  <sca:ScanRegionWidth>{width}</sca:ScanRegionWidth>",
+                f"  <sca:ScanRegionHeight>{height}</sca:ScanRegionHeight>",
+                "</sca:ScanRegion>",
+            ]
+        if self.color_mode:
+            front.append(
+                f'<sca:ColorProcessing sca:MustHonor="true">{self.color_mode}'
+                "</sca:ColorProcessing>"
+            )
+        if self.resolution:
+            front += [
+                '<sca:Resolution sca:MustHonor="true">',
+                f"  <sca:Width>{self.resolution}</sca:Width>",
+                f"  <sca:Height>{self.resolution}</sca:Height>",
+                "</sca:Resolution>",
+            ]
+        if front:
+            inner = f"\n{indent}    ".join(front)
+            lines += [
+                f"{indent}<sca:MediaSides>",
+                f"{indent}  <sca:MediaFront>",
+                f"{indent}    {inner}",
+                f"{indent}  </sca:MediaFront>",
+                f"{indent}</sca:MediaSides>",
+            ]
+        return "\n".join(lines)
+
+
+DEFAULT_TICKET = ScanTicket()
+
+
+@dataclass(frozen=True)
+class InputSourceCaps:
+    """What one input source (platen or feeder) can do."""
+
+    resolutions: tuple[int, ...] = ()
+    color_modes: tuple[str, ...] = ()
+    # Thousandths of an inch
+    max_width: int | None = None
+    max_height: int | None = None
+
+
+@dataclass(frozen=True)
+class ScannerConfiguration:
+    """Capabilities from the device's ScannerConfiguration element."""
+
+    formats: tuple[str, ...] = ()
+    compression_quality: tuple[int, int] | None = None
+    platen: InputSourceCaps | None = None
+    adf: InputSourceCaps | None = None
+    adf_duplex: bool = False
+
+    def validate(self, ticket: ScanTicket) -> None:
+        """Raise ValueError if the device cannot honor the ticket."""
+        source = ticket.input_source or "Platen"
+        caps = self.adf if source.startswith("ADF") else self.platen
+        if caps is None:
+            raise ValueError(f"Input source {source} is not available")
+        if source == "ADFDuplex" and not self.adf_duplex:
+            raise ValueError("The document feeder does not support duplex")
+        if self.formats and ticket.format not in self.formats:
+            raise ValueError(
+                f"Format {ticket.format} not supported ({', '.join(self.formats)})"
+            )
+        if ticket.resolution and caps.resolutions:
+            if ticket.resolution not in caps.resolutions:
+                supported = ", ".join(str(r) for r in caps.resolutions)
+                raise ValueError(
+                    f"Resolution {ticket.resolution} not supported ({supported})"
+                )
+        if ticket.color_mode and caps.color_modes:
+            if ticket.color_mode not in caps.color_modes:
+                raise ValueError(
+                    f"Color mode {ticket.color_mode} not supported "
+                    f"({', '.join(caps.color_modes)})"
+                )
+        if ticket.region:
+            x, y, width, height = ticket.region
+            if (caps.max_width and x + width > caps.max_width) or (
+                caps.max_height and y + height > caps.max_height
+            ):
+                raise ValueError(
+                    f"Scan region exceeds the maximum area "
+                    f"({caps.max_width}x{caps.max_height} thousandths of an inch)"
+                )
+        if ticket.compression_quality is not None and self.compression_quality:
+            low, high = self.compression_quality
+            if not low <= ticket.compression_quality <= high:
+                raise ValueError(f"Compression quality must be {low}-{high}")
+
+
+# --- SOAP envelopes ---
+GET_SCANNER_ELEMENTS = Envelope("""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"
+               xmlns:wsa="http://schemas.xmlsoap.org/ws/2004/08/addressing"
+               xmlns:sca="http://schemas.microsoft.com/windows/2006/08/wdp/scan">
+  <soap:Header>
+    <wsa:To>{url}</wsa:To>
+    <wsa:Action>http://schemas.microsoft.com/windows/2006/08/wdp/scan/GetScannerElements</wsa:Action>
+    <wsa:MessageID>urn:uuid:{msgid}</wsa:MessageID>
+    <wsa:ReplyTo>
+      <wsa:Address>http://schemas.xmlsoap.org/ws/2004/08/addressing/role/anonymous</wsa:Address>
+    </wsa:ReplyTo>
+    <wsa:From>
+      <wsa:Address>urn:uuid:{fromid}</wsa:Address>
+    </wsa:From>
+  </soap:Header>
+  <soap:Body>
+    <sca:GetScannerElementsRequest>
+      <sca:RequestedElements>{elements}
+      </sca:RequestedElements>
+    </sca:GetScannerElementsRequest>
+  </soap:Body>
+</soap:Envelope>
+""")
+
+
+def requested_elements(*names: str) -> str:
+    return "".join(f"\n        <sca:Name>sca:{name}</sca:Name>" for name in names)
+
+
+GET_SCANNER_STATUS = GET_SCANNER_ELEMENTS.bind(
+    elements=requested_elements("ScannerStatus")
+)
+GET_SCANNER_CONFIGURATION = GET_SCANNER_ELEMENTS.bind(
+    elements=requested_elements("ScannerConfiguration")
+)
+# Everything the capability registry needs in one round trip
+GET_SCANNER_CAPABILITIES = GET_SCANNER_ELEMENTS.bind(
+    elements=requested_elements("ScannerDescription", "ScannerConfiguration")
+)
+
+CREATE_SCAN_JOB = Envelope("""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"
+               xmlns:wsa="http://schemas.xmlsoap.org/ws/2004/08/addressing"
+               xmlns:sca="http://schemas.microsoft.com/windows/2006/08/wdp/scan">
+  <soap:Header>
+    <wsa:To>{url}</wsa:To>
+    <wsa:Action>http://schemas.microsoft.com/windows/2006/08/wdp/scan/CreateScanJob</wsa:Action>
+    <wsa:MessageID>urn:uuid:{msgid}</wsa:MessageID>
+    <wsa:ReplyTo>
+      <wsa:Address>http://schemas.xmlsoap.org/ws/2004/08/addressing/role/anonymous</wsa:Address>
+    </wsa:ReplyTo>
+    <wsa:From>
+      <wsa:Address>urn:uuid:python-client</wsa:Address>
+    </wsa:From>
+  </soap:Header>
+  <soap:Body>
+    <sca:CreateScanJobRequest>{destination}
+      <sca:ScanTicket>
+        <sca:JobDescription>
+          <sca:JobName>Python Scan Job</sca:JobName>
+          <sca:JobOriginatingUserName>Python Client</sca:JobOriginatingUserName>
+          <sca:JobInformation>Scanning in auto mode..</sca:JobInformation>
+        </sca:JobDescription>
+        <sca:DocumentParameters>
+{parameters}
+        </sca:DocumentParameters>
+      </sca:ScanTicket>
+    </sca:CreateScanJobRequest>
+  </soap:Body>
+</soap:Envelope>
+""")
+
+RETRIEVE_IMAGE = Envelope("""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"
+               xmlns:wsa="http://schemas.xmlsoap.org/ws/2004/08/addressing"
+               xmlns:sca="http://schemas.microsoft.com/windows/2006/08/wdp/scan">
+  <soap:Header>
+    <wsa:To>{url}</wsa:To>
+    <wsa:Action>http://schemas.microsoft.com/windows/2006/08/wdp/scan/RetrieveImage</wsa:Action>
+    <wsa:MessageID>urn:uuid:{msgid}</wsa:MessageID>
+    <wsa:ReplyTo>
+      <wsa:Address>http://schemas.xmlsoap.org/ws/2004/08/addressing/role/anonymous</wsa:Address>
+    </wsa:ReplyTo>
+    <wsa:From>
+      <wsa:Address>urn:uuid:python-client</wsa:Address>
+    </wsa:From>
+  </soap:Header>
+  <soap:Body>
+    <sca:RetrieveImageRequest>
+      <sca:JobId>{jobid}</sca:JobId>
+      <sca:JobToken>{jobtoken}</sca:JobToken>
+      <sca:DocumentDescription>
+        <sca:DocumentName>Python Scan</sca:DocumentName>
+      </sca:DocumentDescription>
+    </sca:RetrieveImageRequest>
+  </soap:Body>
+</soap:Envelope>
+""")
+
+
+CANCEL_JOB = Envelope("""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"
+               xmlns:wsa="http://schemas.xmlsoap.org/ws/2004/08/addressing"
+               xmlns:sca="http://schemas.microsoft.com/windows/2006/08/wdp/scan">
+  <soap:Header>
+    <wsa:To>{url}</wsa:To>
+    <wsa:Action>http://schemas.microsoft.com/windows/2006/08/wdp/scan/CancelJob</wsa:Action>
+    <wsa:MessageID>urn:uuid:{msgid}</wsa:MessageID>
+    <wsa:ReplyTo>
+      <wsa:Address>http://schemas.xmlsoap.org/ws/2004/08/addressing/role/anonymous</wsa:Address>
+    </wsa:ReplyTo>
+    <wsa:From>
+      <wsa:Address>urn:uuid:python-client</wsa:Address>
+    </wsa:From>
+  </soap:Header>
+  <soap:Body>
+    <sca:CancelJobRequest>
+      <sca:JobId>{jobid}</sca:JobId>
+    </sca:CancelJobRequest>
+  </soap:Body>
+</soap:Envelope>
+""")
+
+# --- Responses ---
+class SoapFault(Exception):
+    """SOAP fault returned by the device."""
+
+    def __init__(self, code: str, subcode: str, reason: str):
+        name = subcode or code
+        super().__init__(f"{name}: {reason}" if reason else name)
+        self.code = code
+        self.subcode = subcode
+        self.reason = reason
+
+    @property
+    def no_images_available(self) -> bool:
+        """True when RetrieveImage has no further page to deliver."""
+        return self.subcode.endswith("ClientErrorNoImagesAvailable")
+
+
+@dataclass(frozen=True)
+class ScannerStatus:
+    state: str
+    state_reasons: tuple[str, ...] = ()
+    active_conditions: tuple[str, ...] = ()
+
+    @property
+    def is_idle(self) -> bool:
+        return self.state.lower() == "idle"
+
+
+@dataclass(frozen=True)
+class ScannerDescription:
+    name: str = ""
+    info: str = ""
+    location: str = ""
+
+
+@dataclass(frozen=True)
+class CreateScanJobResponse:
+    job_id: str
+    job_token: str
+    pixels_per_line: int | None = None
+    number_of_lines: int | None = None
+    bytes_per_line: int | None = None
+
+
+def _scan(name: str) -> str:
+    return f"{{{SCAN_NS}}}{name}"
+
+
+def _soap(name: str) -> str:
+    return f"{{{SOAP_NS}}}{name}"
+
+
+FAULT = _soap("Fault")
+FAULT_CODE = _soap("Code")
+FAULT_SUBCODE = _soap("Subcode")
+FAULT_VALUE = _soap("Value")
+FAULT_TEXT = _soap("Text")
+SCANNER_STATE = _scan("ScannerState")
+SCANNER_STATE_REASON = _scan("ScannerStateReason")
+DEVICE_CONDITION = _scan("DeviceCondition")
+CONDITION_NAME = _scan("Name")
+JOB_ID = _scan("JobId")
+JOB_TOKEN = _scan("JobToken")
+PIXELS_PER_LINE = _scan("PixelsPerLine")
+NUMBER_OF_LINES = _scan("NumberOfLines")
+BYTES_PER_LINE = _scan("BytesPerLine")
+FORMAT_VALUE = _scan("FormatValue")
+COMPRESSION_QUALITY_SUPPORTED = _scan("CompressionQualityFactorSupported")
+PLATEN = _scan("Platen")
+ADF_FRONT = _scan("ADFFront")
+ADF_SUPPORTS_DUPLEX = _scan("ADFSupportsDuplex")
+SCANNER_NAME = _scan("ScannerName")
+SCANNER_INFO = _scan("ScannerInfo")
+SCANNER_LOCATION = _scan("ScannerLocation")
+
+
+def iter_elements(data: bytes):
+    """Yield (tag, text, element) for every closed element, in document order.
+
+    Tags are namespace-qualified ("{uri}local"), so matching does not depend
+    on the prefixes the device picked. The body is fed in PARSE_CHUNK_SIZE
+    slices and elements are yielded as they close, so a caller that stops
+    early leaves the rest unparsed.
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    view = memoryview(data)
+    for start in range(0, len(view), PARSE_CHUNK_SIZE):
+        parser.feed(view[start : start + PARSE_CHUNK_SIZE])
+        for _, elem in parser.read_events():
+            yield elem.tag, (elem.text or "").strip(), elem
+    parser.close()
+    for _, elem in parser.read_events():
+        yield elem.tag, (elem.text or "").strip(), elem
+
+
+def parse_scanner_status(data: bytes) -> ScannerStatus:
+    state = "Unknown"
+    reasons = []
+    conditions = []
+    for tag, text, elem in iter_elements(data):
+        if tag == SCANNER_STATE:
+            state = text
+        elif tag == SCANNER_STATE_REASON:
+            if text and text.lower() != "none":
+                reasons.append(text)
+        elif tag == DEVICE_CONDITION:
+            name = elem.findtext(CONDITION_NAME)
+            if name:
+                conditions.append(name.strip())
+    return ScannerStatus(state, tuple(reasons), tuple(conditions))
+
+
+def parse_fault(data: bytes) -> SoapFault | None:
+    """Return the SOAP fault in a response body, if there is one."""
+    code = subcode = reason = ""
+    found = False
+    try:
+        for tag, text, elem in iter_elements(data):
+            if tag == FAULT:
+                found = True
+            elif tag == FAULT_CODE:
+                code = elem.findtext(FAULT_VALUE, "").strip()
+                subcode = elem.findtext(f"{FAULT_SUBCODE}/{FAULT_VALUE}", "").strip()
+            elif tag == FAULT_TEXT and not reason:
+                reason = text
+    except ET.ParseError:
+        return None
+    return SoapFault(code, subcode, reason) if found else None
+
+
+def _int(text: str) -> int | None:
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+def parse_create_scan_job_response(data: bytes) -> CreateScanJobResponse:
+    values = {}
+    for tag, text, _ in iter_elements(data):
+        # Front side info comes first; don't let the back side override it
+        if tag in (
+            JOB_ID,
+            JOB_TOKEN,
+            PIXELS_PER_LINE,
+            NUMBER_OF_LINES,
+            BYTES_PER_LINE,
+        ):
+            values.setdefault(tag, text)
+    if not values.get(JOB_ID) or not values.get(JOB_TOKEN):
+        raise Exception("Failed to create scan job")
+    return CreateScanJobResponse(
+        job_id=values[JOB_ID],
+        job_token=values[JOB_TOKEN],
+        pixels_per_line=_int(values.get(PIXELS_PER_LINE, "")),
+        number_of_lines=_int(values.get(NUMBER_OF_LINES, "")),
+        bytes_per_line=_int(values.get(BYTES_PER_LINE, "")),
+    )
+
+
+def _caps(elem: ET.Element, prefix: str) -> InputSourceCaps:
+    widths = elem.iterfind(f"{_scan(prefix + 'Resolutions')}/{_scan('Widths')}/*")
+    colors = elem.iterfind(f"{_scan(prefix + 'Color')}/*")
+    max_width = max_height = None
+    if (size := elem.find(_scan(prefix + "MaximumSize"))) is not None:
+        max_width = _int(size.findtext(_scan("Width"), ""))
+        max_height = _int(size.findtext(_scan("Height"), ""))
+    return InputSourceCaps(
+        resolutions=tuple(
+            sorted({r for w in widths if (r := _int((w.text or "").strip()))})
+        ),
+        color_modes=tuple((c.text or "").strip() for c in colors),
+        max_width=max_width,
+        max_height=max_height,
+    )
+
+
+def parse_scanner_configuration(data: bytes) -> ScannerConfiguration:
+    formats = []
+    quality = None
+    platen = adf = None
+    duplex = False
+    for tag, text, elem in iter_elements(data):
+        if tag == FORMAT_VALUE:
+            formats.append(text)
+        elif tag == COMPRESSION_QUALITY_SUPPORTED:
+            low = _int(elem.findtext(_scan("MinValue"), ""))
+            high = _int(elem.findtext(_scan("MaxValue"), ""))
+            if low is not None and high is not None:
+                quality = (low, high)
+        elif tag == PLATEN:
+            platen = _caps(elem, "Platen")
+        elif tag == ADF_FRONT:
+            adf = _caps(elem, "ADF")
+        elif tag == ADF_SUPPORTS_DUPLEX:
+            duplex = text.lower() in ("true", "1")
+    return ScannerConfiguration(tuple(formats), quality, platen, adf, duplex)
+
+
+def parse_scanner_description(data: bytes) -> ScannerDescription:
+    # Each field may repeat per language, the first one wins
+    fields = {}
+    for tag, text, _ in iter_elements(data):
+        if tag in (SCANNER_NAME, SCANNER_INFO, SCANNER_LOCATION) and text:
+            fields.setdefault(tag, text)
+    return ScannerDescription(
+        fields.get(SCANNER_NAME, ""),
+        fields.get(SCANNER_INFO, ""),
+        fields.get(SCANNER_LOCATION, ""),
+    )
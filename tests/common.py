@@ -0,0 +1,108 @@
+"""Run the integration in a real Home Assistant, without the test plugin."""
+
+import asyncio
+import contextlib
+import os
+import socket
+from homeassistant import auth, bootstrap, config_entries, loader
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+DOMAIN = "brother_scanner"
+CUSTOM_COMPONENTS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "custom_components"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.asynccontextmanager
+async def async_test_home_assistant(config_dir):
+    """A Home Assistant with http and this integration set up.
+
+    Home Assistant itself is never started, but the http server listens
+    on 127.0.0.1 so fake devices can push their event notifications.
+    """
+    os.symlink(CUSTOM_COMPONENTS, os.path.join(config_dir, "custom_components"))
+    hass = HomeAssistant(str(config_dir))
+    hass.config.skip_pip = True
+    loader.async_setup(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await bootstrap.async_load_base_functionality(hass)
+    hass.auth = await auth.auth_manager_from_config(
+        hass, [{"type": "homeassistant"}], []
+    )
+    port = _free_port()
+    http = {"server_host": ["127.0.0.1"], "server_port": port}
+    assert await async_setup_component(hass, "http", {"http": http})
+    hass.config.internal_url = f"http://127.0.0.1:{port}"
+    await hass.http.start()
+    assert await async_setup_component(hass, DOMAIN, {})
+    try:
+        yield hass
+    finally:
+        for entry in hass.config_entries.async_entries(DOMAIN):
+            await hass.config_entries.async_unload(entry.entry_id)
+        await hass.http.stop()
+        await hass.async_stop(force=True)
+
+
+async def async_add_scanner(hass, address: str, options: dict | None = None):
+    """Add and set up an entry for the device at address ("host:port")."""
+    entry = config_entries.ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title=f"Scanner ({address})",
+        data={"ip": address, "hostname": address},
+        source=config_entries.SOURCE_USER,
+        options=options or {},
+        unique_id=address,
+    )
+    await hass.config_entries.async_add(entry)
+    await hass.async_block_till_done()
+    assert entry.state is config_entries.ConfigEntryState.LOADED
+    return entry
+
+
+async def async_snapshot(hass, address: str, **data) -> dict:
+    """Call the snapshot service and return its response."""
+    return await hass.services.async_call(
+        DOMAIN,
+        "snapshot",
+        {"ip": address, **data},
+        blocking=True,
+        return_response=True,
+    )
+
+
+@contextlib.contextmanager
+def running(loop, context):
+    """Enter an async context manager on loop, for sync benchmark tests."""
+    value = loop.run_until_complete(context.__aenter__())
+    try:
+        yield value
+    finally:
+        loop.run_until_complete(context.__aexit__(None, None, None))
+
+
+@contextlib.asynccontextmanager
+async def async_silent_device():
+    """A device that accepts connections and never answers, like one asleep."""
+    writers = []
+
+    async def accept(reader, writer):
+        writers.append(writer)
+
+    server = await asyncio.start_server(accept, "127.0.0.1", 0)
+    try:
+        yield f"127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    finally:
+        for writer in writers:
+            writer.close()
+        server.close()
+        await server.wait_closed()
@@ -0,0 +1,24 @@
+import asyncio
+import inspect
+import pytest
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """Run async tests in a fresh event loop, no plugin needed."""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    kwargs = {
+        name: pyfuncitem.funcargs[name]
+        for name in pyfuncitem._fixtureinfo.argnames
+    }
+    asyncio.run(pyfuncitem.obj(**kwargs))
+    return True
+
+
+@pytest.fixture
+def loop():
+    """An event loop for benchmarks, which pytest-benchmark runs sync."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
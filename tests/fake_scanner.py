@@ -0,0 +1,482 @@
+"""A WS-Scan device on localhost, answering like a Brother DCP-1610W.
+
+Implements GetScannerElements, CreateScanJob, RetrieveImage (MTOM),
+CancelJob and the WS-Eventing Subscribe, Renew and Unsubscribe on
+/WebServices/ScannerService, and pushes status and ScanAvailable events
+to subscribers on request. Image size, chunking, latency and the scanner
+state can be set per device. Responses use the wscn prefix like the real
+device, not the sca prefix of the requests.
+"""
+
+import asyncio
+import io
+import itertools
+import re
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from xml.sax.saxutils import escape
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from PIL import Image, ImageDraw
+
+SOAP_NS = "http://www.w3.org/2003/05/soap-envelope"
+WSA_NS = "http://schemas.xmlsoap.org/ws/2004/08/addressing"
+SCAN_NS = "http://schemas.microsoft.com/windows/2006/08/wdp/scan"
+WSE_NS = "http://schemas.xmlsoap.org/ws/2004/08/eventing"
+SERVICE_PATH = "/WebServices/ScannerService"
+BOUNDARY = "MIMEBoundaryurn_uuid_fake"
+
+ENVELOPE = f"""<?xml version="1.0" encoding="UTF-8"?>
+<SOAP-ENV:Envelope xmlns:SOAP-ENV="{SOAP_NS}" xmlns:wsa="{WSA_NS}"
+    xmlns:wscn="{SCAN_NS}">
+<SOAP-ENV:Header>
+<wsa:Action>{{action}}</wsa:Action>
+</SOAP-ENV:Header>
+<SOAP-ENV:Body>{{body}}</SOAP-ENV:Body>
+</SOAP-ENV:Envelope>"""
+
+FAULT = """<SOAP-ENV:Fault>
+<SOAP-ENV:Code><SOAP-ENV:Value>SOAP-ENV:{code}</SOAP-ENV:Value>
+<SOAP-ENV:Subcode><SOAP-ENV:Value>wscn:{subcode}</SOAP-ENV:Value></SOAP-ENV:Subcode>
+</SOAP-ENV:Code>
+<SOAP-ENV:Reason><SOAP-ENV:Text xml:lang="en">{reason}</SOAP-ENV:Text></SOAP-ENV:Reason>
+</SOAP-ENV:Fault>"""
+
+STATUS = """<wscn:ElementData Name="wscn:ScannerStatus" Valid="true">
+<wscn:ScannerStatus>
+<wscn:ScannerCurrentTime>2024-01-01T00:00:00Z</wscn:ScannerCurrentTime>
+<wscn:ScannerState>{state}</wscn:ScannerState>
+<wscn:ScannerStateReasons>
+<wscn:ScannerStateReason>None</wscn:ScannerStateReason>
+</wscn:ScannerStateReasons>
+</wscn:ScannerStatus>
+</wscn:ElementData>"""
+
+DESCRIPTION = """<wscn:ElementData Name="wscn:ScannerDescription" Valid="true">
+<wscn:ScannerDescription>
+<wscn:ScannerName xml:lang="en">Brother {model} series</wscn:ScannerName>
+<wscn:ScannerInfo xml:lang="en">Fake scanner</wscn:ScannerInfo>
+<wscn:ScannerLocation xml:lang="en">Test</wscn:ScannerLocation>
+</wscn:ScannerDescription>
+</wscn:ElementData>"""
+
+CONFIGURATION = """<wscn:ElementData Name="wscn:ScannerConfiguration" Valid="true">
+<wscn:ScannerConfiguration>
+<wscn:DeviceSettings>
+<wscn:FormatsSupported>
+<wscn:FormatValue>jfif</wscn:FormatValue>
+<wscn:FormatValue>exif</wscn:FormatValue>
+</wscn:FormatsSupported>
+<wscn:CompressionQualityFactorSupported>
+<wscn:MinValue>1</wscn:MinValue>
+<wscn:MaxValue>100</wscn:MaxValue>
+</wscn:CompressionQualityFactorSupported>
+</wscn:DeviceSettings>
+<wscn:Platen>
+<wscn:PlatenColor>
+<wscn:ColorEntry>BlackAndWhite1</wscn:ColorEntry>
+<wscn:ColorEntry>Grayscale8</wscn:ColorEntry>
+<wscn:ColorEntry>RGB24</wscn:ColorEntry>
+</wscn:PlatenColor>
+<wscn:PlatenMaximumSize>
+<wscn:Width>8500</wscn:Width>
+<wscn:Height>11690</wscn:Height>
+</wscn:PlatenMaximumSize>
+<wscn:PlatenResolutions>
+<wscn:Widths>
+<wscn:Width>100</wscn:Width>
+<wscn:Width>200</wscn:Width>
+<wscn:Width>300</wscn:Width>
+<wscn:Width>600</wscn:Width>
+</wscn:Widths>
+<wscn:Heights>
+<wscn:Height>100</wscn:Height>
+<wscn:Height>200</wscn:Height>
+<wscn:Height>300</wscn:Height>
+<wscn:Height>600</wscn:Height>
+</wscn:Heights>
+</wscn:PlatenResolutions>
+</wscn:Platen>{adf}
+</wscn:ScannerConfiguration>
+</wscn:ElementData>"""
+
+ADF = """
+<wscn:ADF>
+<wscn:ADFSupportsDuplex>false</wscn:ADFSupportsDuplex>
+<wscn:ADFFront>
+<wscn:ADFColor>
+<wscn:ColorEntry>Grayscale8</wscn:ColorEntry>
+<wscn:ColorEntry>RGB24</wscn:ColorEntry>
+</wscn:ADFColor>
+<wscn:ADFMaximumSize>
+<wscn:Width>8500</wscn:Width>
+<wscn:Height>14000</wscn:Height>
+</wscn:ADFMaximumSize>
+<wscn:ADFResolutions>
+<wscn:Widths>
+<wscn:Width>100</wscn:Width>
+<wscn:Width>200</wscn:Width>
+<wscn:Width>300</wscn:Width>
+</wscn:Widths>
+<wscn:Heights>
+<wscn:Height>100</wscn:Height>
+<wscn:Height>200</wscn:Height>
+<wscn:Height>300</wscn:Height>
+</wscn:Heights>
+</wscn:ADFResolutions>
+</wscn:ADFFront>
+</wscn:ADF>"""
+
+CREATE_SCAN_JOB_RESPONSE = """<wscn:CreateScanJobResponse>
+<wscn:JobId>{job_id}</wscn:JobId>
+<wscn:JobToken>token{job_id}</wscn:JobToken>
+<wscn:ImageInformation>
+<wscn:MediaFrontImageInfo>
+<wscn:PixelsPerLine>{width}</wscn:PixelsPerLine>
+<wscn:NumberOfLines>{height}</wscn:NumberOfLines>
+<wscn:BytesPerLine>{bytes_per_line}</wscn:BytesPerLine>
+</wscn:MediaFrontImageInfo>
+</wscn:ImageInformation>
+</wscn:CreateScanJobResponse>"""
+
+RETRIEVE_IMAGE_RESPONSE = """<wscn:RetrieveImageResponse>
+<wscn:ScanData><xop:Include xmlns:xop="http://www.w3.org/2004/08/xop/include"
+    href="cid:image"/></wscn:ScanData>
+</wscn:RetrieveImageResponse>"""
+
+SUBSCRIBE_RESPONSE = f"""<wse:SubscribeResponse xmlns:wse="{WSE_NS}">
+<wse:SubscriptionManager>
+<wsa:Address>{{manager_url}}</wsa:Address>
+<wsa:ReferenceParameters>
+<wse:Identifier>{{manager_id}}</wse:Identifier>
+</wsa:ReferenceParameters>
+</wse:SubscriptionManager>
+<wse:Expires>{{expires}}</wse:Expires>
+<wscn:DestinationResponses>
+<wscn:DestinationResponse>
+<wscn:ClientContext>{{context}}</wscn:ClientContext>
+<wscn:DestinationToken>{{token}}</wscn:DestinationToken>
+</wscn:DestinationResponse>
+</wscn:DestinationResponses>
+</wse:SubscribeResponse>"""
+
+RENEW_RESPONSE = f"""<wse:RenewResponse xmlns:wse="{WSE_NS}">
+<wse:Expires>{{expires}}</wse:Expires>
+</wse:RenewResponse>"""
+
+NOTIFICATION = f"""<?xml version="1.0" encoding="UTF-8"?>
+<SOAP-ENV:Envelope xmlns:SOAP-ENV="{SOAP_NS}" xmlns:wsa="{WSA_NS}"
+    xmlns:wse="{WSE_NS}" xmlns:wscn="{SCAN_NS}">
+<SOAP-ENV:Header>
+<wsa:To>{{notify_to}}</wsa:To>
+<wsa:Action>{SCAN_NS}/{{event}}</wsa:Action>
+<wse:Identifier>{{identifier}}</wse:Identifier>
+</SOAP-ENV:Header>
+<SOAP-ENV:Body>{{body}}</SOAP-ENV:Body>
+</SOAP-ENV:Envelope>"""
+
+STATUS_SUMMARY_EVENT = """<wscn:ScannerStatusSummaryEvent>
+<wscn:StatusSummary>
+<wscn:ScannerState>{state}</wscn:ScannerState>
+<wscn:ScannerStateReasons>
+<wscn:ScannerStateReason>None</wscn:ScannerStateReason>
+</wscn:ScannerStateReasons>
+</wscn:StatusSummary>
+</wscn:ScannerStatusSummaryEvent>"""
+
+SCAN_AVAILABLE_EVENT = """<wscn:ScanAvailableEvent>
+<wscn:ClientContext>{context}</wscn:ClientContext>
+<wscn:ScanIdentifier>{scan_identifier}</wscn:ScanIdentifier>
+</wscn:ScanAvailableEvent>"""
+
+_ACTION_RE = re.compile(rb"<wsa:Action>[^<]*/(\w+)</wsa:Action>")
+
+
+def make_jpeg(width: int, height: int, seed: int = 0) -> bytes:
+    """A page with lines of "text", different for every seed."""
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    line = max(height // 40, 4)
+    for i, y in enumerate(range(line * 3, height - line * 3, line * 2)):
+        length = width // 4 + (i * 37 + seed * 101) % (width // 2)
+        draw.rectangle((width // 10, y, width // 10 + length, y + line), "black")
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+def mtom_response(jpeg: bytes, job_id: str) -> tuple[bytes, bytes]:
+    """Return the (head, tail) around the image of a RetrieveImage reply."""
+    soap = ENVELOPE.format(
+        action=f"{SCAN_NS}/RetrieveImageResponse", body=RETRIEVE_IMAGE_RESPONSE
+    )
+    head = (
+        f"--{BOUNDARY}\r\n"
+        "Content-Type: application/xop+xml; charset=UTF-8; "
+        'type="application/soap+xml"\r\n'
+        "Content-ID: <soap>\r\n\r\n"
+        f"{soap}\r\n"
+        f"--{BOUNDARY}\r\n"
+        "Content-Type: image/jpeg\r\n"
+        "Content-Transfer-Encoding: binary\r\n"
+        f"Content-ID: <image{job_id}>\r\n\r\n"
+    ).encode()
+    return head, f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+@dataclass
+class FakeSubscription:
+    notify_to: str
+    # Echoed back in every notification
+    identifier: str
+    context: str
+    token: str
+
+
+class FakeScanner:
+    """One fake device, use as an async context manager.
+
+    latency is waited before every reply and between image chunks.
+    pages is how many images a job delivers before ClientErrorNoImagesAvailable.
+    settle is how long the device stays busy after the last image.
+    adf adds a document feeder to the configuration.
+    expires is the xs:duration (or dateTime) granted to subscriptions.
+    """
+
+    def __init__(
+        self,
+        width: int = 850,
+        height: int = 1169,
+        chunk_size: int = 16 * 1024,
+        latency: float = 0.0,
+        state: str = "Idle",
+        model: str = "DCP-1610W",
+        pages: int = 1,
+        settle: float = 0.0,
+        adf: bool = False,
+        expires: str = "PT3600S",
+    ):
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.latency = latency
+        self.state = state
+        self.model = model
+        self.pages = pages
+        self.settle = settle
+        self.adf = adf
+        self.expires = expires
+        # Current subscriptions by subscription manager id
+        self.subscriptions: dict[str, FakeSubscription] = {}
+        self._subscription_ids = itertools.count(1)
+        # A new image per job unless the test sets one
+        self.image: bytes | None = None
+        self.sent: list[bytes] = []
+        self.requests: list[tuple[str, bytes]] = []
+        # Image transfers in progress, and the most at the same time
+        self.active = 0
+        self.max_active = 0
+        # (start, end) of every image transfer, monotonic
+        self.transfers: list[tuple[float, float]] = []
+        self._job_ids = itertools.count(1)
+        self._remaining: dict[str, int] = {}
+        self._server: TestServer | None = None
+        self.address = ""
+
+    def actions(self, name: str) -> list[bytes]:
+        return [body for action, body in self.requests if action == name]
+
+    async def __aenter__(self) -> "FakeScanner":
+        app = web.Application()
+        app.router.add_post(SERVICE_PATH, self._handle)
+        self._server = TestServer(app, host="127.0.0.1")
+        await self._server.start_server()
+        self.address = f"127.0.0.1:{self._server.port}"
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._server.close()
+
+    def _reply(self, action: str, body: str, status: int = 200) -> web.Response:
+        return web.Response(
+            status=status,
+            body=ENVELOPE.format(action=f"{SCAN_NS}/{action}", body=body).encode(),
+            content_type="application/soap+xml",
+        )
+
+    def _fault(self, subcode: str, reason: str) -> web.Response:
+        body = FAULT.format(code="Sender", subcode=subcode, reason=reason)
+        return self._reply("Fault", body, 400)
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        data = await request.read()
+        m = _ACTION_RE.search(data)
+        action = m.group(1).decode() if m else ""
+        self.requests.append((action, data))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if action == "GetScannerElements":
+            return self._get_scanner_elements(data)
+        if action == "CreateScanJob":
+            return self._create_scan_job()
+        if action == "RetrieveImage":
+            return await self._retrieve_image(request, data)
+        if action == "CancelJob":
+            self.state = "Idle"
+            return self._reply("CancelJobResponse", "<wscn:CancelJobResponse/>")
+        if action == "Subscribe":
+            return self._subscribe(data)
+        if action == "Renew":
+            if self._manager_id(data) not in self.subscriptions:
+                return self._fault("InvalidMessage", "Unknown subscription")
+            body = RENEW_RESPONSE.format(expires=self.expires)
+            return self._reply("RenewResponse", body)
+        if action == "Unsubscribe":
+            self.subscriptions.pop(self._manager_id(data), None)
+            return self._reply("UnsubscribeResponse", "")
+        return self._fault("InvalidAction", f"Unknown action {action}")
+
+    @staticmethod
+    def _manager_id(data: bytes) -> str:
+        header = ET.fromstring(data).find(f"{{{SOAP_NS}}}Header")
+        return header.findtext(f"{{{WSE_NS}}}Identifier", "")
+
+    def _subscribe(self, data: bytes) -> web.Response:
+        root = ET.fromstring(data)
+        notify_to = root.find(f".//{{{WSE_NS}}}NotifyTo")
+        subscription = FakeSubscription(
+            notify_to=notify_to.findtext(f"{{{WSA_NS}}}Address", ""),
+            identifier=notify_to.findtext(f".//{{{WSE_NS}}}Identifier", ""),
+            context=root.findtext(f".//{{{SCAN_NS}}}ClientContext", ""),
+            token=f"token-{next(self._subscription_ids)}",
+        )
+        manager_id = f"urn:uuid:subscription-{subscription.token}"
+        self.subscriptions[manager_id] = subscription
+        body = SUBSCRIBE_RESPONSE.format(
+            manager_url=f"http://{self.address}{SERVICE_PATH}",
+            manager_id=manager_id,
+            expires=self.expires,
+            context=escape(subscription.context),
+            token=subscription.token,
+        )
+        return self._reply("SubscribeResponse", body)
+
+    async def _notify(self, event: str, body) -> list[int]:
+        """Push an event to every subscriber, return the HTTP statuses.
+
+        body is called with each subscription for the event body.
+        """
+        statuses = []
+        async with aiohttp.ClientSession() as session:
+            for subscription in list(self.subscriptions.values()):
+                data = NOTIFICATION.format(
+                    notify_to=escape(subscription.notify_to),
+                    event=event,
+                    identifier=escape(subscription.identifier),
+                    body=body(subscription),
+                )
+                async with session.post(
+                    subscription.notify_to,
+                    data=data.encode(),
+                    headers={"Content-Type": "application/soap+xml"},
+                ) as resp:
+                    statuses.append(resp.status)
+        return statuses
+
+    async def notify_status(self, state: str) -> list[int]:
+        self.state = state
+        body = STATUS_SUMMARY_EVENT.format(state=state)
+        return await self._notify("ScannerStatusSummaryEvent", lambda _: body)
+
+    async def notify_scan_available(self, scan_identifier: str) -> list[int]:
+        """Like choosing a destination and pressing scan on the device."""
+        return await self._notify(
+            "ScanAvailableEvent",
+            lambda subscription: SCAN_AVAILABLE_EVENT.format(
+                context=escape(subscription.context),
+                scan_identifier=escape(scan_identifier),
+            ),
+        )
+
+    def _get_scanner_elements(self, data: bytes) -> web.Response:
+        root = ET.fromstring(data)
+        names = [n.text for n in root.iter(f"{{{SCAN_NS}}}Name")]
+        elements = []
+        if "sca:ScannerStatus" in names:
+            elements.append(STATUS.format(state=self.state))
+        if "sca:ScannerDescription" in names:
+            elements.append(DESCRIPTION.format(model=self.model))
+        if "sca:ScannerConfiguration" in names:
+            elements.append(CONFIGURATION.format(adf=ADF if self.adf else ""))
+        body = (
+            "<wscn:GetScannerElementsResponse><wscn:ScannerElements>"
+            + "".join(elements)
+            + "</wscn:ScannerElements></wscn:GetScannerElementsResponse>"
+        )
+        return self._reply("GetScannerElementsResponse", body)
+
+    def _create_scan_job(self) -> web.Response:
+        if self.state != "Idle":
+            return self._fault("ServerErrorNotAcceptingJobs", "Scanner busy")
+        job_id = str(next(self._job_ids))
+        self._remaining[job_id] = self.pages
+        self.state = "Processing"
+        body = CREATE_SCAN_JOB_RESPONSE.format(
+            job_id=job_id,
+            width=self.width,
+            height=self.height,
+            bytes_per_line=self.width * 3,
+        )
+        return self._reply("CreateScanJobResponse", body)
+
+    async def _retrieve_image(
+        self, request: web.Request, data: bytes
+    ) -> web.StreamResponse:
+        job_id = ET.fromstring(data).findtext(f".//{{{SCAN_NS}}}JobId", "")
+        if not self._remaining.get(job_id):
+            self._remaining.pop(job_id, None)
+            self.state = "Idle"
+            return self._fault("ClientErrorNoImagesAvailable", "No images")
+        self._remaining[job_id] -= 1
+
+        image = self.image or make_jpeg(self.width, self.height, len(self.sent))
+        self.sent.append(image)
+        head, tail = mtom_response(image, job_id)
+        resp = web.StreamResponse(
+            headers={
+                "Content-Type": (
+                    'multipart/related; type="application/xop+xml"; '
+                    f'boundary="{BOUNDARY}"; start="<soap>"'
+                )
+            }
+        )
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        began = time.monotonic()
+        try:
+            await resp.prepare(request)
+            await resp.write(head)
+            for start in range(0, len(image), self.chunk_size):
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                await resp.write(image[start : start + self.chunk_size])
+            await resp.write(tail)
+            await resp.write_eof()
+        finally:
+            self.active -= 1
+            self.transfers.append((began, time.monotonic()))
+            if not self._remaining.get(job_id):
+                self._finish_job()
+        return resp
+
+    def _finish_job(self) -> None:
+        if not self.settle:
+            self.state = "Idle"
+            return
+
+        def idle():
+            self.state = "Idle"
+
+        asyncio.get_running_loop().call_later(self.settle, idle)
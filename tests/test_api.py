@@ -0,0 +1,200 @@
+import asyncio
+import contextlib
+import tracemalloc
+import pytest
+from custom_components.brother_scanner.api import (
+    BrotherScannerClient,
+    async_iter_mtom_jpeg,
+)
+from custom_components.brother_scanner.wsscan import (
+    CreateScanJobResponse,
+    ScanTicket,
+    SoapFault,
+)
+from .common import running
+from .fake_scanner import BOUNDARY, FakeScanner, make_jpeg, mtom_response
+
+
+async def test_status_and_capabilities():
+    async with FakeScanner(model="DCP-L2530DW") as device:
+        async with BrotherScannerClient(device.address) as client:
+            status = await client.async_get_scanner_status()
+            capabilities = await client.async_get_capabilities()
+    assert status.is_idle
+    assert status.state_reasons == ()
+    assert capabilities.model == "DCP-L2530DW"
+    assert capabilities.configuration.platen.resolutions == (100, 200, 300, 600)
+    assert capabilities.configuration.adf is None
+
+
+async def test_scan_jpeg():
+    async with FakeScanner(chunk_size=1000) as device:
+        async with BrotherScannerClient(device.address) as client:
+            ticket = ScanTicket(resolution=300, color_mode="Grayscale8")
+            data = await client.scan_jpeg(ticket=ticket)
+    assert data == device.sent[0]
+    create = device.actions("CreateScanJob")[0]
+    assert b"<sca:ColorProcessing" in create and b">Grayscale8<" in create
+    assert device.state == "Idle"
+
+
+async def test_scan_pages():
+    async with FakeScanner(pages=3) as device:
+        async with BrotherScannerClient(device.address) as client:
+            pages = [page async for page in client.scan_pages()]
+    assert pages == device.sent
+    assert len(pages) == 3
+
+
+async def test_busy_scanner_is_not_scanned():
+    async with FakeScanner(state="Processing") as device:
+        async with BrotherScannerClient(device.address) as client:
+            with pytest.raises(Exception, match="not idle"):
+                await client.scan_jpeg()
+    assert not device.actions("CreateScanJob")
+
+
+async def test_wait_idle():
+    async with FakeScanner(state="Processing") as device:
+        async with BrotherScannerClient(device.address) as client:
+            assert not await client.async_wait_idle(0.2, 0.05)
+            asyncio.get_running_loop().call_later(0.1, setattr, device, "state", "Idle")
+            assert await client.async_wait_idle(1, 0.05)
+
+
+async def test_stopping_early_cancels_the_job():
+    async with FakeScanner(chunk_size=1000, latency=0.01) as device:
+        async with BrotherScannerClient(device.address) as client:
+            stream = client.scan_jpeg_stream()
+            async with contextlib.aclosing(stream):
+                await stream.__anext__()
+    assert len(device.actions("CancelJob")) == 1
+
+
+async def test_fault_is_raised():
+    async with FakeScanner() as device:
+        async with BrotherScannerClient(device.address) as client:
+            job = await client.async_create_scan_job()
+            with pytest.raises(SoapFault, match="NotAcceptingJobs"):
+                await client.async_create_scan_job()
+            await client.async_cancel_job(job)
+
+
+async def test_closed_client_refuses_requests():
+    async with FakeScanner() as device:
+        client = BrotherScannerClient(device.address)
+        await client.async_close()
+        with pytest.raises(Exception, match="closed"):
+            await client.async_get_scanner_status()
+    assert not device.requests
+
+
+async def _chunks(head: bytes, chunk: bytes, count: int, tail: bytes):
+    yield head
+    for _ in range(count):
+        yield chunk
+        # Let the consumer drop what it has seen
+        await asyncio.sleep(0)
+    yield tail
+
+
+@pytest.mark.parametrize(
+    ("size", "latency"),
+    [((850, 1169), 0), ((2480, 3508), 0), ((2480, 3508), 0.002)],
+    ids=["100dpi", "300dpi", "300dpi-slow-link"],
+)
+def test_benchmark_scan_jpeg(benchmark, loop, size, latency):
+    """Status, CreateScanJob and a streamed RetrieveImage of one page."""
+    device = FakeScanner(*size, chunk_size=64 * 1024, latency=latency)
+    device.image = make_jpeg(*size)
+    with running(loop, device), running(
+        loop, BrotherScannerClient(device.address)
+    ) as client:
+        data = benchmark.pedantic(
+            lambda: loop.run_until_complete(client.scan_jpeg()),
+            rounds=10,
+            warmup_rounds=1,
+        )
+    assert data == device.image
+
+
+def test_benchmark_concurrent_scans(benchmark, loop):
+    """One page from each of three devices at the same time."""
+    devices = [FakeScanner(chunk_size=16 * 1024, latency=0.001) for _ in range(3)]
+    with contextlib.ExitStack() as stack:
+        clients = []
+        for device in devices:
+            stack.enter_context(running(loop, device))
+            client = BrotherScannerClient(device.address)
+            clients.append(stack.enter_context(running(loop, client)))
+
+        async def scan_all():
+            return await asyncio.gather(*(c.scan_jpeg() for c in clients))
+
+        pages = benchmark.pedantic(
+            lambda: loop.run_until_complete(scan_all()), rounds=5, warmup_rounds=1
+        )
+    assert pages == [d.sent[-1] for d in devices]
+
+
+def test_benchmark_mtom_streaming(benchmark, loop):
+    """Extract a 10 MB image from a reply arriving in 64 kB chunks."""
+    chunk = bytes(range(256)) * 256
+    count = 10 * 1024 * 1024 // len(chunk)
+    head, tail = mtom_response(b"", "1")
+
+    async def extract():
+        received = 0
+        async for part in async_iter_mtom_jpeg(
+            _chunks(head, chunk, count, tail), BOUNDARY.encode()
+        ):
+            received += len(part)
+        return received
+
+    received = benchmark.pedantic(
+        lambda: loop.run_until_complete(extract()), rounds=5, warmup_rounds=1
+    )
+    assert received == count * len(chunk)
+
+
+@pytest.mark.parametrize("megabytes", [1, 10, 50])
+async def test_mtom_extraction_memory(megabytes):
+    """Peak memory stays a few chunks, whatever the size of the image."""
+    chunk = bytes(range(256)) * 256
+    count = megabytes * 1024 * 1024 // len(chunk)
+    head, tail = mtom_response(b"", "1")
+    received = 0
+    tracemalloc.start()
+    try:
+        async for part in async_iter_mtom_jpeg(
+            _chunks(head, chunk, count, tail), BOUNDARY.encode()
+        ):
+            received += len(part)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert received == count * len(chunk)
+    assert peak < 8 * len(chunk)
+
+
+async def test_scan_identifiers_are_escaped():
+    async with FakeScanner() as device:
+        async with BrotherScannerClient(device.address) as client:
+            await client.async_create_scan_job(
+                scan_identifier="a<b&c", destination_token="d>e"
+            )
+    create = device.actions("CreateScanJob")[0]
+    assert b"a&lt;b&amp;c" in create and b"d&gt;e" in create
+
+
+async def test_job_token_is_escaped():
+    job = CreateScanJobResponse("1&2", "a<b&c")
+    async with FakeScanner() as device:
+        async with BrotherScannerClient(device.address) as client:
+            with pytest.raises(SoapFault):
+                async for _ in client.async_retrieve_image(job):
+                    pass
+            await client.async_cancel_job(job)
+    retrieve = device.actions("RetrieveImage")[0]
+    assert b"a&lt;b&amp;c" in retrieve and b">1&amp;2<" in retrieve
+    assert b">1&amp;2<" in device.actions("CancelJob")[0]
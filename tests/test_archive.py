@@ -0,0 +1,105 @@
+import os
+import time
+from custom_components.brother_scanner.archive import (
+    ArchiveEntry,
+    Retention,
+    ScanArchive,
+)
+from custom_components.brother_scanner.const import CONF_RETENTION_COUNT
+from .common import (
+    DOMAIN,
+    async_add_scanner,
+    async_snapshot,
+    async_test_home_assistant,
+)
+from .fake_scanner import FakeScanner
+
+
+def _entry(path: str, timestamp: float, size: int = 10) -> ArchiveEntry:
+    return ArchiveEntry(path=path, size=size, timestamp=timestamp, duration=1.0)
+
+
+async def _recent_scans(hass, address: str, **data) -> dict:
+    return await hass.services.async_call(
+        DOMAIN,
+        "recent_scans",
+        {"ip": address, **data},
+        blocking=True,
+        return_response=True,
+    )
+
+
+async def test_index(tmp_path):
+    async with async_test_home_assistant(tmp_path) as hass:
+        archive = ScanArchive(hass, "entry", str(tmp_path / "scans"))
+        for i, name in enumerate(["a", "b", "c", "a"]):
+            await archive.async_add(_entry(f"/{name}.jpg", 100.0 + i), Retention())
+
+        # Saving over a.jpg replaced its entry, so it is now the newest
+        assert [e.path for e in archive.recent(10)] == ["/a.jpg", "/c.jpg", "/b.jpg"]
+        assert [e.path for e in archive.recent(1, offset=1)] == ["/c.jpg"]
+        assert archive.recent(5, offset=3) == []
+        assert archive.total_bytes == 30
+        assert archive.get(102.0).path == "/c.jpg"
+        assert archive.get(100.0) is None
+
+
+async def test_load_keeps_the_newest_entry_of_a_path(tmp_path):
+    async with async_test_home_assistant(tmp_path) as hass:
+        archive = ScanArchive(hass, "entry", str(tmp_path / "scans"))
+        entries = [_entry("/a.jpg", 1.0), _entry("/b.jpg", 2.0), _entry("/a.jpg", 3.0)]
+        await archive._store.async_save({"entries": [e.as_dict() for e in entries]})
+        await archive.async_load()
+
+    assert [e.timestamp for e in archive.entries] == [2.0, 3.0]
+    assert archive.total_bytes == 20
+
+
+async def test_retention_removes_managed_files_only(tmp_path):
+    managed = tmp_path / "scans"
+    managed.mkdir()
+    paths = [str(managed / "old.jpg"), str(tmp_path / "custom.jpg")]
+    paths += [str(managed / f"{name}.jpg") for name in ("new", "newer")]
+    for path in paths:
+        with open(path, "wb") as f:
+            f.write(b"0123456789")
+    now = time.time()
+
+    async with async_test_home_assistant(tmp_path) as hass:
+        archive = ScanArchive(hass, "entry", str(managed))
+        await archive.async_add(_entry(paths[0], now - 3 * 86400), Retention())
+        await archive.async_add(_entry(paths[1], now - 2 * 86400), Retention())
+        await archive.async_add(_entry(paths[2], now - 1), Retention())
+        await archive.async_enforce(Retention(max_age=86400))
+        assert [e.path for e in archive.entries] == [paths[2]]
+
+        await archive.async_add(_entry(paths[3], now), Retention(max_bytes=15))
+        assert [e.path for e in archive.entries] == [paths[3]]
+        assert archive.total_bytes == 10
+
+    # Scans saved outside the scans directory are only dropped from the index
+    assert [os.path.exists(p) for p in paths] == [False, True, False, True]
+
+
+async def test_recent_scans_service(tmp_path):
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        await async_add_scanner(hass, device.address, {CONF_RETENTION_COUNT: 2})
+        scans = [
+            await async_snapshot(hass, device.address, filename=f"scans/{name}.jpg")
+            for name in ("a", "b", "c")
+        ]
+        await hass.async_block_till_done()
+        response = await _recent_scans(hass, device.address)
+        older = await _recent_scans(hass, device.address, count=1, offset=1)
+
+    assert response["total"] == 2
+    assert [s["path"] for s in response["scans"]] == [
+        scans[2]["filename"],
+        scans[1]["filename"],
+    ]
+    scan = response["scans"][0]
+    assert scan["size"] == os.path.getsize(scan["path"])
+    assert scan["timestamp"] >= response["scans"][1]["timestamp"]
+    assert [s["path"] for s in older["scans"]] == [scans[1]["filename"]]
+    # The oldest scan went with retention
+    assert not os.path.exists(scans[0]["filename"])
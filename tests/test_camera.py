@@ -0,0 +1,121 @@
+import io
+from unittest.mock import patch
+import pytest
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from PIL import Image
+from custom_components.brother_scanner.const import (
+    CONF_LIVE_PREVIEW,
+    PREVIEW_SIZE,
+    SIGNAL_SCAN_FRAME,
+)
+from custom_components.brother_scanner.imaging import ProgressiveJpeg
+from .common import (
+    DOMAIN,
+    async_add_scanner,
+    async_snapshot,
+    async_test_home_assistant,
+    running,
+)
+from .fake_scanner import FakeScanner, make_jpeg
+
+
+def _camera(hass):
+    (entity_id,) = hass.states.async_entity_ids("camera")
+    return hass.data["camera"].get_entity(entity_id)
+
+
+@pytest.mark.parametrize(
+    ("width", "height"),
+    [(320, 240), (1280, 960)],
+    ids=["from-preview", "from-scan"],
+)
+def test_benchmark_camera_resize(benchmark, loop, tmp_path, width, height):
+    """async_camera_image for a size not in the cache, after an A4 scan.
+
+    Sizes up to the preview are rendered from it, larger ones from the
+    full 300 dpi page.
+    """
+    device = FakeScanner(2480, 3508, chunk_size=64 * 1024)
+    device.image = make_jpeg(2480, 3508)
+    with running(loop, device), running(
+        loop, async_test_home_assistant(tmp_path)
+    ) as hass:
+        loop.run_until_complete(async_add_scanner(hass, device.address))
+        loop.run_until_complete(async_snapshot(hass, device.address))
+        camera = _camera(hass)
+
+        def resize():
+            camera._image_cache.invalidate(camera._file_path)
+            return loop.run_until_complete(camera.async_camera_image(width, height))
+
+        data = benchmark.pedantic(resize, rounds=10, warmup_rounds=1)
+
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.width <= width and img.height <= height
+        assert max(img.width / width, img.height / height) > 0.9
+
+
+def test_progressive_jpeg():
+    data = make_jpeg(850, 1169)
+    progressive = ProgressiveJpeg(64, 64)
+    progressive.feed(data[:100])
+    assert not progressive.ready
+    assert progressive.render(data[:100]) is None
+
+    progressive.feed(data[100 : len(data) // 2])
+    assert progressive.ready
+    frame = progressive.render(data[: len(data) // 2])
+    with Image.open(io.BytesIO(frame)) as img:
+        assert img.height == 64 and img.width < 64
+    assert progressive.frames == 1
+
+
+async def test_live_preview(tmp_path):
+    async with FakeScanner(latency=0.05) as device, async_test_home_assistant(
+        tmp_path
+    ) as hass:
+        entry = await async_add_scanner(hass, device.address)
+        camera = _camera(hass)
+        frames = []
+        live = []
+
+        @callback
+        def on_frame(frame):
+            frames.append(frame)
+            # Served by the camera while the scan is still coming in
+            live.append(hass.async_create_task(camera.async_camera_image()))
+
+        async_dispatcher_connect(
+            hass, SIGNAL_SCAN_FRAME.format(entry_id=entry.entry_id), on_frame
+        )
+        with patch(f"custom_components.{DOMAIN}.LIVE_PREVIEW_INTERVAL", 0):
+            scan = await async_snapshot(hass, device.address)
+        served = [await task for task in live]
+        final = await camera.async_camera_image()
+
+    assert len(frames) > 1
+    assert served == frames
+    for frame in frames:
+        with Image.open(io.BytesIO(frame)) as img:
+            assert img.width <= PREVIEW_SIZE[0] and img.height <= PREVIEW_SIZE[1]
+    # The finished scan replaces the partial page
+    with open(scan["filename"], "rb") as f:
+        assert final == f.read()
+
+
+async def test_live_preview_off(tmp_path):
+    async with FakeScanner(latency=0.05) as device, async_test_home_assistant(
+        tmp_path
+    ) as hass:
+        entry = await async_add_scanner(
+            hass, device.address, {CONF_LIVE_PREVIEW: False}
+        )
+        frames = []
+        async_dispatcher_connect(
+            hass, SIGNAL_SCAN_FRAME.format(entry_id=entry.entry_id), frames.append
+        )
+        with patch(f"custom_components.{DOMAIN}.LIVE_PREVIEW_INTERVAL", 0):
+            await async_snapshot(hass, device.address)
+
+    assert frames == []
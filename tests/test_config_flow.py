@@ -0,0 +1,134 @@
+import time
+from ipaddress import ip_address
+from unittest.mock import patch
+from homeassistant import config_entries
+from homeassistant.components.zeroconf import ZeroconfServiceInfo
+from homeassistant.data_entry_flow import FlowResultType
+from custom_components.brother_scanner import config_flow
+from custom_components.brother_scanner.api import BrotherScannerClient
+from custom_components.brother_scanner.discovery import BrotherDiscovery
+from custom_components.brother_scanner.const import (
+    CONF_CAPABILITIES,
+    CONF_PRESET,
+    CONF_RETENTION_COUNT,
+    CONF_TIMELAPSE_INTERVAL,
+)
+from .common import (
+    DOMAIN,
+    async_add_scanner,
+    async_silent_device,
+    async_test_home_assistant,
+)
+from .fake_scanner import FakeScanner
+
+
+async def test_options_flow(tmp_path):
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        entry = await async_add_scanner(
+            hass, device.address, {CONF_RETENTION_COUNT: 5}
+        )
+        result = await hass.config_entries.options.async_init(entry.entry_id)
+        assert result["type"] is FlowResultType.FORM
+        assert result["step_id"] == "init"
+        defaults = {
+            str(key): key.default() for key in result["data_schema"].schema
+        }
+        assert defaults[CONF_RETENTION_COUNT] == 5
+
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"], {CONF_PRESET: "fast-preview", CONF_TIMELAPSE_INTERVAL: 0}
+        )
+        await hass.async_block_till_done()
+
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    assert entry.options[CONF_PRESET] == "fast-preview"
+    assert entry.options[CONF_RETENTION_COUNT] == 5
+
+
+async def _async_add_by_address(hass, address: str):
+    # The form takes a bare IP or hostname, the fake devices need a port
+    with patch.object(config_flow, "normalize_address", lambda value: value):
+        return await hass.config_entries.flow.async_init(
+            DOMAIN,
+            context={"source": config_entries.SOURCE_USER},
+            data={"ip": address},
+        )
+
+
+async def test_user_step_reads_the_capabilities(tmp_path):
+    async with FakeScanner(model="DCP-L2530DW") as device, async_test_home_assistant(
+        tmp_path
+    ) as hass:
+        result = await _async_add_by_address(hass, device.address)
+        await hass.async_block_till_done()
+
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    assert result["title"] == f"Brother DCP-L2530DW Scanner ({device.address})"
+    assert result["data"][CONF_CAPABILITIES]["model"] == "DCP-L2530DW"
+
+
+async def test_user_step_tries_a_silent_device_once(tmp_path):
+    """The form doesn't wait for retries, setup does them."""
+    with patch.object(config_flow, "PROBE_TIMEOUT", 0.2):
+        async with async_silent_device() as address, async_test_home_assistant(
+            tmp_path
+        ) as hass:
+            start = time.monotonic()
+            result = await _async_add_by_address(hass, address)
+            elapsed = time.monotonic() - start
+            await hass.async_block_till_done()
+
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    assert CONF_CAPABILITIES not in result["data"]
+    assert elapsed < 1
+
+
+def _zeroconf_info(ip: str, model: str) -> ZeroconfServiceInfo:
+    return ZeroconfServiceInfo(
+        ip_address=ip_address(ip),
+        ip_addresses=[ip_address("fe80::1"), ip_address(ip)],
+        port=631,
+        hostname=f"{model}.local.",
+        type="_printer._tcp.local.",
+        name=f"Brother {model} series._printer._tcp.local.",
+        properties={"ty": f"Brother {model} series"},
+    )
+
+
+async def test_zeroconf_discovery_fills_the_user_form(tmp_path):
+    """The form lists what discovery flows found, without browsing first."""
+    probes = {"192.0.2.7": True, "192.0.2.8": False}
+
+    async def probe(client, timeout):
+        return probes[client.ip]
+
+    with patch.object(BrotherScannerClient, "async_probe", probe), patch.object(
+        BrotherDiscovery, "async_start"
+    ) as browse:
+        async with async_test_home_assistant(tmp_path) as hass:
+            zeroconf = {"source": config_entries.SOURCE_ZEROCONF}
+            scanner = _zeroconf_info("192.0.2.7", "DCP-L2530DW")
+            found = await hass.config_entries.flow.async_init(
+                DOMAIN, context=zeroconf, data=scanner
+            )
+            printer = await hass.config_entries.flow.async_init(
+                DOMAIN, context=zeroconf, data=_zeroconf_info("192.0.2.8", "HL-L2350DW")
+            )
+            start = time.monotonic()
+            form = await hass.config_entries.flow.async_init(
+                DOMAIN, context={"source": config_entries.SOURCE_USER}
+            )
+            elapsed = time.monotonic() - start
+            await hass.async_block_till_done()
+
+    assert found["step_id"] == "zeroconf_confirm"
+    assert found["description_placeholders"]["host"] == "192.0.2.7"
+    assert printer["type"] is FlowResultType.ABORT
+    assert browse.called
+    assert elapsed < 0.5
+    (field,) = form["data_schema"].schema
+    assert field.default() == "192.0.2.7"
+    selector = form["data_schema"].schema[field].config
+    assert [o["label"] for o in selector["options"]] == [
+        "Brother DCP-L2530DW series (192.0.2.7)"
+    ]
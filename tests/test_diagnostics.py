@@ -0,0 +1,25 @@
+from homeassistant.components.diagnostics import REDACTED
+from custom_components.brother_scanner.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from .common import async_add_scanner, async_snapshot, async_test_home_assistant
+from .fake_scanner import FakeScanner
+
+
+async def test_diagnostics(tmp_path):
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        entry = await async_add_scanner(hass, device.address)
+        await async_snapshot(hass, device.address)
+        await hass.async_block_till_done()
+        diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+
+    data = diagnostics["entry"]["data"]
+    assert (data["ip"], data["hostname"]) == (REDACTED, REDACTED)
+    assert data["capabilities"]["model"] == "DCP-1610W"
+    assert device.address not in repr(diagnostics)
+    assert diagnostics["status"]["state"] == "Idle"
+    assert diagnostics["configuration"] is not None
+    assert diagnostics["queue"]["processed"] == 1
+    assert diagnostics["queue"]["depth"] == 0
+    assert diagnostics["circuit"]
+    assert diagnostics["timings"]
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from unittest.mock import patch
+import aiohttp
+from homeassistant.exceptions import HomeAssistantError
+from custom_components.brother_scanner import eventing
+from .common import DOMAIN, async_add_scanner, async_test_home_assistant
+from .fake_scanner import FakeScanner
+
+
+async def _async_until(condition, timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def _async_subscribed(hass, device: FakeScanner):
+    """Set up an entry for device and wait for its event subscription."""
+    entry = await async_add_scanner(hass, device.address)
+    device_data = hass.data[DOMAIN][entry.entry_id]
+    await _async_until(lambda: device_data["events"].active)
+    return entry, device_data
+
+
+async def test_subscribe_and_unsubscribe(tmp_path):
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        entry, device_data = await _async_subscribed(hass, device)
+        (subscription,) = device.subscriptions.values()
+        assert subscription.notify_to == (
+            f"{hass.config.internal_url}/api/brother_scanner/events/{entry.entry_id}"
+        )
+        assert b"<wse:Expires>PT3600S</wse:Expires>" in device.actions("Subscribe")[0]
+        # Pushed status replaces polling
+        assert device_data["coordinator"].update_interval is None
+
+        await hass.config_entries.async_unload(entry.entry_id)
+
+    assert device.subscriptions == {}
+    assert len(device.actions("Unsubscribe")) == 1
+
+
+async def test_status_notification_updates_the_coordinator(tmp_path):
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        _, device_data = await _async_subscribed(hass, device)
+        polled = len(device.actions("GetScannerElements"))
+        assert await device.notify_status("Processing") == [202]
+        await hass.async_block_till_done()
+        coordinator = device_data["coordinator"]
+
+        assert coordinator.data.state == "Processing"
+        assert device_data["client"].status.state == "Processing"
+        assert len(device.actions("GetScannerElements")) == polled
+
+
+async def test_notification_for_another_subscription_is_refused(tmp_path):
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        _, device_data = await _async_subscribed(hass, device)
+        (subscription,) = device.subscriptions.values()
+        subscription.identifier = "urn:uuid:someone-else"
+        assert await device.notify_status("Processing") == [400]
+        assert device_data["coordinator"].data.state == "Idle"
+
+
+async def test_scan_available_queues_a_scan(tmp_path):
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        _, device_data = await _async_subscribed(hass, device)
+        (subscription,) = device.subscriptions.values()
+        assert await device.notify_scan_available("scan-1") == [202]
+        await _async_until(lambda: device_data.get("last_snapshot"))
+        await hass.async_block_till_done()
+
+    create = device.actions("CreateScanJob")[0]
+    assert b"<sca:ScanIdentifier>scan-1</sca:ScanIdentifier>" in create
+    assert f">{subscription.token}</sca:DestinationToken>".encode() in create
+    with open(device_data["last_snapshot"], "rb") as f:
+        assert f.read() == device.sent[0]
+
+
+async def test_scan_available_with_an_invalid_ticket_is_dropped(tmp_path, caplog):
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        await _async_subscribed(hass, device)
+        with patch(
+            "custom_components.brother_scanner.async_build_ticket",
+            side_effect=HomeAssistantError("Invalid scan settings"),
+        ), caplog.at_level(logging.WARNING):
+            assert await device.notify_scan_available("scan-1") == [202]
+            await hass.async_block_till_done()
+
+    assert "Dropped scan started on" in caplog.text
+    assert not device.actions("CreateScanJob")
+
+
+async def test_renew(tmp_path):
+    with patch.object(eventing, "EVENT_MIN_RENEW_DELAY", 0.1):
+        async with FakeScanner(expires="PT1S") as device, async_test_home_assistant(
+            tmp_path
+        ) as hass:
+            _, device_data = await _async_subscribed(hass, device)
+            await _async_until(lambda: len(device.actions("Renew")) >= 2)
+            assert device_data["events"].active
+
+            # The device forgot the subscription: subscribe again
+            device.subscriptions.clear()
+            subscribes = len(device.actions("Subscribe"))
+            await _async_until(lambda: len(device.actions("Subscribe")) > subscribes)
+            await _async_until(lambda: device_data["events"].active)
+            assert len(device.subscriptions) == 1
+
+
+async def test_expired_subscription_is_not_renewed(tmp_path):
+    async with FakeScanner(expires="PT0S") as device, async_test_home_assistant(
+        tmp_path
+    ) as hass:
+        entry = await async_add_scanner(hass, device.address)
+        device_data = hass.data[DOMAIN][entry.entry_id]
+        await _async_until(lambda: device.actions("Subscribe"))
+        await asyncio.sleep(0.3)
+        await hass.async_block_till_done()
+
+        assert not device_data["events"].active
+        assert not device.actions("Renew")
+        assert device_data["coordinator"].update_interval is not None
+
+
+async def test_notifications_need_no_authentication(tmp_path):
+    """The device can't log in; anything else is still refused."""
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        entry, _ = await _async_subscribed(hass, device)
+        url = device.subscriptions[next(iter(device.subscriptions))].notify_to
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, data=b"<not-xml") as resp:
+                assert resp.status == 400
+            async with session.post(url.replace(entry.entry_id, "x"), data=b"") as resp:
+                assert resp.status == 404
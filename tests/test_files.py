@@ -0,0 +1,82 @@
+import os
+import stat
+import pytest
+from custom_components.brother_scanner.const import CONF_DEDUPE, DEDUPE_SKIP
+from custom_components.brother_scanner.files import (
+    FILE_MODE,
+    link_atomic,
+    write_atomic,
+)
+from .common import async_add_scanner, async_snapshot, async_test_home_assistant
+from .fake_scanner import FakeScanner, make_jpeg
+
+
+def _umask() -> int:
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+def test_write_atomic(tmp_path):
+    path = str(tmp_path / "scan.jpg")
+    write_atomic(path, b"one")
+    write_atomic(path, b"two", fsync=True)
+    with open(path, "rb") as f:
+        assert f.read() == b"two"
+    assert os.listdir(tmp_path) == ["scan.jpg"]
+    # Readable like any file open() creates, not mkstemp's 0600
+    assert stat.S_IMODE(os.stat(path).st_mode) == FILE_MODE == 0o666 & ~_umask()
+
+
+def test_failed_write_leaves_the_old_file(tmp_path):
+    path = str(tmp_path / "scan.jpg")
+    write_atomic(path, b"one")
+    with pytest.raises(TypeError):
+        write_atomic(path, "not bytes")
+    with open(path, "rb") as f:
+        assert f.read() == b"one"
+    assert os.listdir(tmp_path) == ["scan.jpg"]
+
+
+def test_link_atomic(tmp_path):
+    source, path = str(tmp_path / "a.jpg"), str(tmp_path / "b.jpg")
+    write_atomic(source, b"one")
+    write_atomic(path, b"two")
+    link_atomic(source, path)
+    link_atomic(source, path)
+    assert os.path.samefile(source, path)
+    assert sorted(os.listdir(tmp_path)) == ["a.jpg", "b.jpg"]
+    with pytest.raises(OSError):
+        link_atomic(str(tmp_path / "gone.jpg"), path)
+
+
+async def test_identical_scans_are_linked(tmp_path):
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        await async_add_scanner(hass, device.address)
+        device.image = make_jpeg(200, 300)
+        first = await async_snapshot(hass, device.address, filename="a.jpg")
+        second = await async_snapshot(hass, device.address, filename="b.jpg")
+        # Overwritten since it was archived (both names, they are one file),
+        # so no longer a duplicate
+        with open(first["filename"], "wb") as f:
+            f.write(b"edited")
+        third = await async_snapshot(hass, device.address, filename="c.jpg")
+        await hass.async_block_till_done()
+
+    assert os.path.samefile(first["filename"], second["filename"])
+    assert not os.path.samefile(first["filename"], third["filename"])
+    with open(third["filename"], "rb") as f:
+        assert f.read() == device.image
+    assert stat.S_IMODE(os.stat(second["filename"]).st_mode) == FILE_MODE
+
+
+async def test_skip_stores_identical_scans_once(tmp_path):
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        await async_add_scanner(hass, device.address, {CONF_DEDUPE: DEDUPE_SKIP})
+        device.image = make_jpeg(200, 300)
+        first = await async_snapshot(hass, device.address, filename="a.jpg")
+        second = await async_snapshot(hass, device.address, filename="b.jpg")
+        await hass.async_block_till_done()
+
+    assert second["filename"] == first["filename"]
+    assert not os.path.exists(tmp_path / "www" / "b.jpg")
@@ -0,0 +1,223 @@
+import asyncio
+import contextlib
+import logging
+import os
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+import pytest
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.entity import Entity
+from custom_components.brother_scanner import _import_scan_modules
+from custom_components.brother_scanner.const import (
+    CONF_CAPABILITIES,
+    CONF_PROCESSING_STAGES,
+)
+from .common import (
+    DOMAIN,
+    async_add_scanner,
+    async_silent_device,
+    async_snapshot,
+    async_test_home_assistant,
+)
+from .fake_scanner import FakeScanner, make_jpeg
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_leaves_out_pillow_and_zeroconf():
+    code = (
+        "import sys, custom_components.brother_scanner; "
+        "print(sorted(m for m in ('PIL', 'zeroconf') if m in sys.modules))"
+    )
+    start = time.monotonic()
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    print(f"import took {time.monotonic() - start:.2f}s including Home Assistant")
+    assert out.stdout.strip() == "[]"
+
+
+async def test_setup_does_not_wait_for_the_device(tmp_path):
+    async with async_silent_device() as address, async_test_home_assistant(
+        tmp_path
+    ) as hass:
+        start = time.monotonic()
+        await async_add_scanner(hass, address)
+        elapsed = time.monotonic() - start
+        print(f"entry setup took {elapsed * 1000:.0f}ms")
+        assert elapsed < 2
+        states = hass.states.async_all("sensor")
+        assert states
+        assert {s.state for s in states} <= {"unknown", "0"}
+
+
+async def test_snapshot_service(tmp_path):
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        await async_add_scanner(hass, device.address)
+        saved = []
+        hass.bus.async_listen(f"{DOMAIN}_snapshot_saved", saved.append)
+        response = await async_snapshot(hass, device.address, filename="a.jpg")
+        await hass.async_block_till_done()
+
+    filename = response["filename"]
+    assert filename == str(tmp_path / "www" / "a.jpg")
+    with open(filename, "rb") as f:
+        assert f.read() == device.sent[0]
+    assert [e.data["filename"] for e in saved] == [filename]
+
+
+async def test_device_takes_the_fetched_model(tmp_path):
+    async with FakeScanner(model="DCP-L2530DW") as device, async_test_home_assistant(
+        tmp_path
+    ) as hass:
+        entry = await async_add_scanner(hass, device.address)
+        for _ in range(100):
+            if CONF_CAPABILITIES in entry.data:
+                break
+            await asyncio.sleep(0.01)
+        await hass.async_block_till_done()
+        registry = dr.async_get(hass)
+        (info,) = dr.async_entries_for_config_entry(registry, entry.entry_id)
+
+    assert info.model == "DCP-L2530DW"
+    assert info.name == f"DCP-L2530DW {device.address}"
+
+
+async def test_jobs_across_scanners(tmp_path):
+    """50 jobs over 3 devices: one scan per device at a time, devices in
+    parallel, nothing lost."""
+    devices = [FakeScanner(latency=0.002, chunk_size=8 * 1024) for _ in range(3)]
+    async with contextlib.AsyncExitStack() as stack:
+        for device in devices:
+            await stack.enter_async_context(device)
+        hass = await stack.enter_async_context(async_test_home_assistant(tmp_path))
+        for device in devices:
+            await async_add_scanner(hass, device.address)
+
+        start = time.monotonic()
+        responses = await asyncio.gather(
+            *(
+                async_snapshot(
+                    hass, devices[i % 3].address, filename=f"scan{i}.jpg"
+                )
+                for i in range(50)
+            )
+        )
+        elapsed = time.monotonic() - start
+        await hass.async_block_till_done()
+
+    print(f"50 scans on 3 devices took {elapsed:.2f}s")
+    assert len({r["filename"] for r in responses}) == 50
+    assert [len(d.sent) for d in devices] == [17, 17, 16]
+    assert all(d.max_active == 1 for d in devices)
+    first, second = devices[0].transfers, devices[1].transfers
+    assert any(a < d and c < b for a, b in first for c, d in second)
+    assert all(os.path.exists(r["filename"]) for r in responses)
+
+
+async def test_timelapse_waits_for_the_device(tmp_path):
+    """The full scan follows the preview while the device is still busy."""
+    async with FakeScanner(settle=0.3) as device, async_test_home_assistant(
+        tmp_path
+    ) as hass:
+        entry = await async_add_scanner(hass, device.address)
+        queue = hass.data[DOMAIN][entry.entry_id]["queue"]
+        filename = await queue.enqueue({"timelapse": True}).future
+
+    assert len(device.sent) == 2
+    with open(filename, "rb") as f:
+        assert f.read() == device.sent[1]
+
+
+class _SlowCallbacks(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith("Executing"):
+            self.messages.append(message)
+
+
+@pytest.mark.parametrize(
+    ("stages", "threshold"),
+    [
+        ([], 0.02),
+        # Pillow holds the GIL while it encodes a JPEG (about 10ms per 64kB
+        # of output, the whole page when optimizing), so the processing
+        # threads may hold up the loop a little longer
+        (["blank", "deskew", "crop", "recompress"], 0.05),
+    ],
+)
+async def test_scan_does_not_block_the_event_loop(tmp_path, stages, threshold):
+    # Imported by the warm up once Home Assistant has started
+    _import_scan_modules()
+    options = {CONF_PROCESSING_STAGES: stages}
+    async with FakeScanner(chunk_size=64 * 1024) as device, async_test_home_assistant(
+        tmp_path
+    ) as hass:
+        device.image = make_jpeg(2480, 3508)
+        await async_add_scanner(hass, device.address, options)
+        # First call setup, not what is measured
+        await async_snapshot(hass, device.address, filename="warm.jpg")
+
+        images = [make_jpeg(2480, 3508, i) for i in range(1, 4)]
+        slow = _SlowCallbacks()
+        loop = asyncio.get_running_loop()
+        logging.getLogger("asyncio").addHandler(slow)
+        loop.slow_callback_duration = threshold
+        loop.set_debug(True)
+        try:
+            for i, device.image in enumerate(images):
+                await async_snapshot(hass, device.address, filename=f"{i}.jpg")
+            await hass.async_block_till_done()
+        finally:
+            loop.set_debug(False)
+            logging.getLogger("asyncio").removeHandler(slow)
+
+    assert slow.messages == [], "\n".join(slow.messages)
+
+
+async def _async_changes_per_scan(tmp_path, count: int) -> dict[str, int]:
+    """State writes per entity for one scan, with count scanners set up."""
+    devices = [FakeScanner() for _ in range(count)]
+    async with contextlib.AsyncExitStack() as stack:
+        for device in devices:
+            await stack.enter_async_context(device)
+        hass = await stack.enter_async_context(async_test_home_assistant(tmp_path))
+        for device in devices:
+            await async_add_scanner(hass, device.address)
+        await async_snapshot(hass, devices[0].address, filename="warm.jpg")
+        await hass.async_block_till_done()
+
+        writes = {}
+        write = Entity.async_write_ha_state
+
+        def counting_write(entity):
+            writes[entity.entity_id] = writes.get(entity.entity_id, 0) + 1
+            write(entity)
+
+        with patch.object(Entity, "async_write_ha_state", counting_write):
+            await async_snapshot(hass, devices[0].address, filename="scan.jpg")
+            await hass.async_block_till_done()
+
+    # Entity ids hold the device address, the port tells devices apart
+    port = "_" + devices[0].address.rsplit(":", 1)[1] + "_"
+    assert all(port in entity_id for entity_id in writes), writes
+    return {entity_id.replace(port, "_"): n for entity_id, n in writes.items()}
+
+
+async def test_work_per_scan_does_not_grow_with_scanners(tmp_path):
+    (tmp_path / "one").mkdir()
+    (tmp_path / "four").mkdir()
+    one = await _async_changes_per_scan(tmp_path / "one", 1)
+    four = await _async_changes_per_scan(tmp_path / "four", 4)
+    assert one["camera.dcp_1610w_127_0_0_1_last_snapshot"] == 1
+    assert one == four
@@ -0,0 +1,106 @@
+import datetime
+import io
+import os
+from unittest.mock import patch
+import aiohttp
+import pytest
+from homeassistant.components import media_source
+from homeassistant.components.http.auth import async_sign_path
+from homeassistant.setup import async_setup_component
+from PIL import Image
+from custom_components.brother_scanner.const import THUMBNAIL_SIZE
+from custom_components.brother_scanner.imaging import thumbnail_path
+from .common import (
+    DOMAIN,
+    async_add_scanner,
+    async_snapshot,
+    async_test_home_assistant,
+)
+from .fake_scanner import FakeScanner
+
+ROOT = f"media-source://{DOMAIN}"
+
+
+async def _get(hass, path: str) -> tuple[int, str | None, bytes]:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(hass.config.internal_url + path) as resp:
+            return resp.status, resp.content_type, await resp.read()
+
+
+async def test_browse_and_resolve(tmp_path):
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        assert await async_setup_component(hass, "media_source", {})
+        entry = await async_add_scanner(hass, device.address)
+        scans = [
+            await async_snapshot(hass, device.address, filename=f"scans/{name}.jpg")
+            for name in ("a", "b")
+        ]
+        await hass.async_block_till_done()
+
+        root = await media_source.async_browse_media(hass, ROOT)
+        assert [(c.identifier, c.title) for c in root.children] == [
+            (entry.entry_id, entry.title)
+        ]
+        with patch(f"custom_components.{DOMAIN}.media_source.MEDIA_PAGE_SIZE", 1):
+            first = await media_source.async_browse_media(
+                hass, f"{ROOT}/{entry.entry_id}"
+            )
+            newest, older = first.children
+            assert older.identifier == f"{entry.entry_id}/page/1"
+            last = await media_source.async_browse_media(
+                hass, f"{ROOT}/{older.identifier}"
+            )
+            assert len(last.children) == 1
+
+        assert newest.media_content_type == "image/jpeg"
+        assert newest.thumbnail
+        resolved = await media_source.async_resolve_media(
+            hass, f"{ROOT}/{last.children[0].identifier}", None
+        )
+        assert resolved.mime_type == "image/jpeg"
+        status, content_type, body = await _get(hass, resolved.url)
+
+        with pytest.raises(media_source.Unresolvable):
+            await media_source.async_resolve_media(
+                hass, f"{ROOT}/{entry.entry_id}/scan/1.0", None
+            )
+        with pytest.raises(media_source.Unresolvable):
+            await media_source.async_browse_media(hass, f"{ROOT}/unknown")
+
+    assert (status, content_type) == (200, "image/jpeg")
+    with open(scans[0]["filename"], "rb") as f:
+        assert body == f.read()
+
+
+async def test_thumbnail_view(tmp_path):
+    async with FakeScanner() as device, async_test_home_assistant(tmp_path) as hass:
+        assert await async_setup_component(hass, "media_source", {})
+        entry = await async_add_scanner(hass, device.address)
+        scan = await async_snapshot(hass, device.address, filename="scans/a.jpg")
+        await hass.async_block_till_done()
+
+        folder = await media_source.async_browse_media(
+            hass, f"{ROOT}/{entry.entry_id}"
+        )
+        url = folder.children[0].thumbnail
+        status, content_type, body = await _get(hass, url)
+        thumb = thumbnail_path(scan["filename"])
+        rendered = os.stat(thumb).st_mtime_ns
+        # Served from disk the second time
+        assert (await _get(hass, url))[2] == body
+        assert os.stat(thumb).st_mtime_ns == rendered
+
+        unsigned = (await _get(hass, url.partition("?")[0]))[0]
+        unknown = async_sign_path(
+            hass,
+            f"/api/{DOMAIN}/thumbnails/{entry.entry_id}/1.0",
+            datetime.timedelta(minutes=1),
+        )
+        missing = (await _get(hass, unknown))[0]
+
+    assert (status, content_type) == (200, "image/jpeg")
+    with Image.open(io.BytesIO(body)) as img:
+        assert max(img.size) == max(THUMBNAIL_SIZE)
+        assert img.size[0] <= THUMBNAIL_SIZE[0] and img.size[1] <= THUMBNAIL_SIZE[1]
+    assert unsigned == 401
+    assert missing == 404
@@ -0,0 +1,71 @@
+import io
+import re
+from PIL import Image
+from custom_components.brother_scanner.pdf import StreamingPdfWriter, jpeg_info
+from .common import async_add_scanner, async_snapshot, async_test_home_assistant
+from .fake_scanner import FakeScanner
+
+_MEDIA_BOX = re.compile(rb"/MediaBox \[0 0 ([\d.]+) ([\d.]+)\]")
+
+
+def _jpeg(**save) -> bytes:
+    buf = io.BytesIO()
+    Image.new("L", (300, 600), "white").save(buf, "JPEG", **save)
+    return buf.getvalue()
+
+
+def _exif(resolution: int, unit: int) -> bytes:
+    exif = Image.Exif()
+    exif[0x011A] = resolution
+    exif[0x011B] = resolution
+    exif[0x0128] = unit
+    return exif.tobytes()
+
+
+def test_jpeg_info_resolution():
+    assert jpeg_info(_jpeg(dpi=(150, 150))) == (300, 600, 1, 150)
+    assert jpeg_info(_jpeg(exif=_exif(200, 2)))[3] == 200
+    # Dots per centimetre
+    assert jpeg_info(_jpeg(exif=_exif(40, 3)))[3] == 102
+    assert jpeg_info(_jpeg())[3] == 300
+    assert jpeg_info(_jpeg(), 150)[3] == 150
+
+
+def test_pdf_writer():
+    f = io.BytesIO()
+    writer = StreamingPdfWriter(f)
+    writer.add_jpeg_page(_jpeg(dpi=(150, 150)))
+    writer.add_jpeg_page(_jpeg(), dpi=100)
+    writer.close()
+    data = f.getvalue()
+    assert data.startswith(b"%PDF-1.4") and data.endswith(b"%%EOF\n")
+    assert _MEDIA_BOX.findall(data) == [
+        (b"144.00", b"288.00"),
+        (b"216.00", b"432.00"),
+    ]
+    assert b"/Count 2" in data
+    assert writer.size == len(data)
+
+
+async def test_batch_scan_page_size(tmp_path):
+    """Pages from the feeder go into one PDF sized by the scan resolution."""
+    async with FakeScanner(pages=3, adf=True) as device, async_test_home_assistant(
+        tmp_path
+    ) as hass:
+        await async_add_scanner(hass, device.address)
+        progress = []
+        hass.bus.async_listen(
+            "brother_scanner_scan_progress", lambda e: progress.append(e.data["page"])
+        )
+        response = await async_snapshot(
+            hass, device.address, batch=True, resolution=200, filename="doc.pdf"
+        )
+        await hass.async_block_till_done()
+
+    with open(response["filename"], "rb") as f:
+        data = f.read()
+    assert progress == [1, 2, 3]
+    # 850x1169 pixels at 200 dpi
+    assert _MEDIA_BOX.findall(data) == [(b"306.00", b"420.84")] * 3
+    for page in device.sent:
+        assert page in data
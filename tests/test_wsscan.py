@@ -0,0 +1,109 @@
+import re
+import timeit
+from custom_components.brother_scanner import wsscan
+from custom_components.brother_scanner.wsscan import (
+    CREATE_SCAN_JOB,
+    Envelope,
+    ScanTicket,
+    parse_create_scan_job_response,
+    parse_fault,
+    parse_scanner_status,
+)
+from .fake_scanner import (
+    CREATE_SCAN_JOB_RESPONSE,
+    ENVELOPE,
+    FAULT,
+    SCAN_NS,
+    STATUS,
+)
+
+STATUS_RESPONSE = ENVELOPE.format(
+    action="GetScannerElementsResponse", body=STATUS.format(state="Processing")
+).encode()
+
+# The regex parsing this replaced, for the comparison below
+_OLD_STATE_RE = re.compile(rb"<wscn:ScannerState>(.*?)</wscn:ScannerState>")
+
+
+def _template(env: Envelope) -> str:
+    """The str.format template an envelope was made from."""
+    parts = [env._segments[0].decode()]
+    for name, segment in zip(env._fields, env._segments[1:]):
+        parts += [f"{{{name}}}", segment.decode()]
+    return "".join(parts)
+
+
+def test_parse_status_any_prefix():
+    assert parse_scanner_status(STATUS_RESPONSE).state == "Processing"
+    renamed = STATUS_RESPONSE.replace(b"wscn", b"x")
+    assert parse_scanner_status(renamed).state == "Processing"
+
+
+def test_parse_in_chunks(monkeypatch):
+    """Elements split across the parser's chunks parse the same."""
+    monkeypatch.setattr(wsscan, "PARSE_CHUNK_SIZE", 7)
+    assert parse_scanner_status(STATUS_RESPONSE).state == "Processing"
+
+
+def test_parse_create_scan_job_response():
+    body = CREATE_SCAN_JOB_RESPONSE.format(
+        job_id="7", width=850, height=1169, bytes_per_line=2550
+    )
+    job = parse_create_scan_job_response(
+        ENVELOPE.format(action="CreateScanJobResponse", body=body).encode()
+    )
+    assert (job.job_id, job.job_token) == ("7", "token7")
+    assert (job.pixels_per_line, job.number_of_lines) == (850, 1169)
+
+
+def test_parse_fault():
+    body = FAULT.format(
+        code="Sender", subcode="ClientErrorNoImagesAvailable", reason="No images"
+    )
+    fault = parse_fault(ENVELOPE.format(action="Fault", body=body).encode())
+    assert fault.no_images_available
+    assert parse_fault(STATUS_RESPONSE) is None
+
+
+def test_envelope_renders_like_format():
+    template = "<a>{one}</a>{two}<b>{one}</b>"
+    env = Envelope(template, two="fixed")
+    assert env.render(one="x") == template.format(one="x", two="fixed").encode()
+    bound = CREATE_SCAN_JOB.bind(url="http://scanner/")
+    xml = bound.render(msgid="id", parameters=ScanTicket().to_xml(), destination="")
+    assert xml.count(f'xmlns:sca="{SCAN_NS}"'.encode()) == 1
+    assert b"<wsa:To>http://scanner/</wsa:To>" in xml
+
+
+def test_benchmark_envelopes_and_parsing():
+    """Compare with str.format + encode and the old regex parsing.
+
+    Rendering must beat formatting; the parser is namespace aware and may
+    cost more than a regex, but not enough to matter per request.
+    """
+    template = _template(CREATE_SCAN_JOB)
+    env = CREATE_SCAN_JOB.bind(url="http://scanner/")
+    params = ScanTicket(resolution=300).to_xml()
+    values = {"msgid": "id", "parameters": params, "destination": ""}
+    number = 2000
+    render = min(timeit.repeat(lambda: env.render(**values), number=number))
+    formatted = min(
+        timeit.repeat(
+            lambda: template.format(url="http://scanner/", **values).encode(),
+            number=number,
+        )
+    )
+    parse = min(
+        timeit.repeat(lambda: parse_scanner_status(STATUS_RESPONSE), number=number)
+    )
+    regex = min(
+        timeit.repeat(lambda: _OLD_STATE_RE.search(STATUS_RESPONSE), number=number)
+    )
+    print(
+        f"per call: render {render / number * 1e6:.1f}us, "
+        f"format {formatted / number * 1e6:.1f}us, "
+        f"parse {parse / number * 1e6:.1f}us, regex {regex / number * 1e6:.1f}us"
+    )
+    assert render < formatted
+    assert parse / number < 0.001
+